@@ -0,0 +1,79 @@
+# Heap needed to hold a whole crawl ready for parsing: every artifact read into
+# BytesIO, as the README used to suggest, versus memory mapped from an
+# ArtifactStore. Then parse time for each, since mapped pages come from the page
+# cache rather than the heap.
+#
+#   python -m benchmarks.bench_artifacts --rows 50000
+import argparse
+import io
+import tempfile
+import time
+import tracemalloc
+
+from chargemaster_parsers.artifacts import ArtifactStore
+from chargemaster_parsers.parsers import ChargeMasterParser
+
+from .synthetic import GENERATORS
+
+
+def held(open_crawl):
+    tracemalloc.start()
+    crawl = open_crawl()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return crawl, retained
+
+
+def parse(crawl):
+    start = time.perf_counter()
+    count = 0
+    for institution, artifacts in crawl.items():
+        for _ in ChargeMasterParser.build(institution).parse_artifacts(artifacts):
+            count += 1
+    return count, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=50000)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ArtifactStore(directory)
+        urls = {}
+        for institution, generate in GENERATORS.items():
+            artifacts = generate(args.rows)
+            for url, data in artifacts.items():
+                store.put(url, data)
+            urls[institution] = list(artifacts)
+        print(f"{store.size() / 2**20:.1f} MiB across {len(store)} artifacts")
+
+        def in_memory():
+            crawl = {}
+            for institution, institution_urls in urls.items():
+                crawl[institution] = {}
+                for url in institution_urls:
+                    with open(store.path(url), "rb") as f:
+                        crawl[institution][url] = io.BytesIO(f.read())
+            return crawl
+
+        def mapped():
+            return {
+                institution: store.open_artifacts(institution_urls)
+                for institution, institution_urls in urls.items()
+            }
+
+        for name, open_crawl in (("BytesIO", in_memory), ("mmap", mapped)):
+            crawl, retained = held(open_crawl)
+            count, elapsed = parse(crawl)
+            print(
+                f"{name:>8}: {retained / 2**20:.1f} MiB heap to hold the crawl, "
+                f"{count:,} entries parsed in {elapsed:.2f}s"
+            )
+            for artifacts in crawl.values():
+                for artifact in artifacts.values():
+                    artifact.close()
+
+
+if __name__ == "__main__":
+    main()
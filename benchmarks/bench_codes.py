@@ -0,0 +1,64 @@
+# Classifying medical codes with the shared memoized classifier versus running
+# re.match on raw pattern strings for every row, as the parsers used to.
+#
+#   python -m benchmarks.bench_codes --rows 1000000
+import argparse
+import random
+import re
+import time
+
+from chargemaster_parsers.parsers.codes import classify_code
+
+LEGACY_CODE_MATCHERS = (
+    ("CPT", r"^CPT.+?([0-9]{4}[0-9A-Z])$"),
+    ("HCPCS", r"^HCPCS\s+(.+)$"),
+    ("DRG", r"^MS-DRG\s+V[0-9]+\s+\(FY [0-9]+\)\s+(.+?)$"),
+)
+
+
+def legacy_classify(code):
+    for code_type, code_matcher in LEGACY_CODE_MATCHERS:
+        match = re.match(code_matcher, code)
+        if match:
+            return code_type, match.groups()[0]
+    return None, None
+
+
+def make_codes(rows, distinct):
+    generator = random.Random(0)
+    pool = []
+    for i in range(distinct):
+        kind = i % 4
+        if kind == 0:
+            pool.append(f"CPT® {10000 + i}")
+        elif kind == 1:
+            pool.append(f"HCPCS J{1000 + i % 9000}")
+        elif kind == 2:
+            pool.append(f"MS-DRG V37 (FY 2020) {i % 999:03d}")
+        else:
+            pool.append(f"ICD10 Z{i % 100:02d}.00")
+    return [generator.choice(pool) for _ in range(rows)]
+
+
+def measure(name, function, codes):
+    start = time.perf_counter()
+    for code in codes:
+        function(code)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>12}: {elapsed:.2f}s, {len(codes) / elapsed:,.0f} codes/s")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=1000000)
+    arg_parser.add_argument("--distinct", type=int, default=5000)
+    args = arg_parser.parse_args()
+
+    codes = make_codes(args.rows, args.distinct)
+    measure("re.match", legacy_classify, codes)
+    classify_code.cache_clear()
+    measure("classifier", classify_code, codes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Compare the per-object and columnar output paths on a synthetic Tri-City style file:
+# producing the output, aggregating over it as it streams, and holding all of it.
+#
+#   python -m benchmarks.bench_columnar --rows 20000
+import argparse
+import io
+import time
+import tracemalloc
+
+from chargemaster_parsers.parsers import TriCityChargeMasterParser
+
+from .synthetic import PAYERS, make_tricity_artifact
+
+
+def per_object(parser, data):
+    totals = {}
+    for entry in parser.parse_artifacts({parser.ARTIFACT_URL: io.BytesIO(data)}):
+        if entry.expected_reimbursement is not None:
+            totals[entry.payer] = (
+                totals.get(entry.payer, 0.0) + entry.expected_reimbursement
+            )
+        elif entry.gross_charge is not None:
+            totals[entry.payer] = totals.get(entry.payer, 0.0) + entry.gross_charge
+    return totals
+
+
+def columnar(parser, data):
+    totals = {}
+    for batch in parser.parse_artifacts_columnar(
+        {parser.ARTIFACT_URL: io.BytesIO(data)}
+    ):
+        payer = batch["payer"]
+        indices = payer.indices
+        expected = batch["expected_reimbursement"]
+        gross = batch["gross_charge"]
+        sums = {}
+        for index, value, fallback in zip(indices, expected, gross):
+            if value != value:
+                value = fallback
+            if value == value:
+                sums[index] = sums.get(index, 0.0) + value
+        for index, value in sums.items():
+            name = payer.dictionary[index]
+            totals[name] = totals.get(name, 0.0) + value
+    return totals
+
+
+def produce(parser, data, columnar_output):
+    # Seconds to parse the whole file into entries or batches
+    artifacts = {parser.ARTIFACT_URL: io.BytesIO(data)}
+    start = time.perf_counter()
+    if columnar_output:
+        for batch in parser.parse_artifacts_columnar(artifacts):
+            pass
+    else:
+        for entry in parser.parse_artifacts(artifacts):
+            pass
+    return time.perf_counter() - start
+
+
+def retained(parser, data, columnar_output):
+    # Peak traced memory while holding the complete output of a run
+    tracemalloc.start()
+    artifacts = {parser.ARTIFACT_URL: io.BytesIO(data)}
+    if columnar_output:
+        held = list(parser.parse_artifacts_columnar(artifacts))
+    else:
+        held = list(parser.parse_artifacts(artifacts))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    parser = TriCityChargeMasterParser()
+    data = make_tricity_artifact(args.rows)
+    entries = args.rows * (len(PAYERS) + 1)
+
+    for name, columnar_output in (("per-object", False), ("columnar", True)):
+        elapsed = produce(parser, data, columnar_output)
+        print(f"{name:>10}: {elapsed:.2f}s parse, {entries / elapsed:,.0f} entries/s")
+
+    for name, function in (("per-object", per_object), ("columnar", columnar)):
+        start = time.perf_counter()
+        totals = function(parser, data)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>10}: {elapsed:.2f}s aggregate, {entries / elapsed:,.0f} entries/s, {len(totals)} payers"
+        )
+
+    for name, columnar_output in (("per-object", False), ("columnar", True)):
+        peak = retained(parser, data, columnar_output)
+        print(f"{name:>10}: {peak / 2**20:.1f} MiB to hold the full output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Rows per second turning Scripps-shaped csv rows - nine price cells, about half of
+# them "NA" or blank - into typed values: a try/float per cell on a dict row the way
+# the parsers started out, parse_price by column name on a dict row, and a
+# ConverterTable resolved once from the header.
+#
+#   python -m benchmarks.bench_converters --rows 1000000
+import argparse
+import random
+import time
+
+from chargemaster_parsers.parsers import ChargeMasterParser
+from chargemaster_parsers.parsers.converters import ConverterTable, price, raw, text
+
+from .synthetic import SCRIPPS_HEADER
+
+HEADER = SCRIPPS_HEADER.split("|")
+PRICE_COLUMNS = HEADER[5:]
+
+
+def make_rows(rows, distinct, missing):
+    generator = random.Random(0)
+    pool = [f"{generator.uniform(1, 250000):.2f}" for _ in range(distinct)]
+    fillers = ["NA", ""]
+    return [
+        [
+            "Scripps Green Hospital ",
+            str(50400000 + i // 40),
+            f"PROCEDURE DESCRIPTION {i // 40}",
+            "PAYER [1]",
+            "PLAN [101]",
+        ]
+        + [
+            (
+                generator.choice(fillers)
+                if generator.random() < missing
+                else generator.choice(pool)
+            )
+            for _ in PRICE_COLUMNS
+        ]
+        for i in range(rows)
+    ]
+
+
+def legacy_float(price):
+    try:
+        return float(price)
+    except ValueError:
+        return None
+
+
+def try_float(rows):
+    for row in rows:
+        row = dict(zip(HEADER, row))
+        location = row["LOCATION"].strip()
+        procedure_identifier = row["PROCEDURE CODE"]
+        prices = [legacy_float(row[column]) for column in PRICE_COLUMNS]
+
+
+def by_name(rows):
+    parse_price = ChargeMasterParser().parse_price
+    for row in rows:
+        row = dict(zip(HEADER, row))
+        location = row["LOCATION"].strip()
+        procedure_identifier = row["PROCEDURE CODE"]
+        prices = [parse_price(row[column]) for column in PRICE_COLUMNS]
+
+
+def converter_table(rows):
+    columns = [("LOCATION", text, "location"), ("PROCEDURE CODE", raw, "code")]
+    columns += [(column, price, column) for column in PRICE_COLUMNS]
+    convert = ConverterTable.resolve(HEADER, columns).convert
+    for row in rows:
+        location, procedure_identifier, *prices = convert(row)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=1000000)
+    arg_parser.add_argument("--distinct", type=int, default=20000)
+    arg_parser.add_argument("--missing", type=float, default=0.5)
+    args = arg_parser.parse_args()
+
+    rows = make_rows(args.rows, args.distinct, args.missing)
+    for name, convert in (
+        ("try/float", try_float),
+        ("by name", by_name),
+        ("ConverterTable", converter_table),
+    ):
+        start = time.perf_counter()
+        convert(rows)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>14}: {elapsed:.2f}s, {len(rows) / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
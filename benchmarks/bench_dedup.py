@@ -0,0 +1,65 @@
+# Keys per second and the memory each cash dedup strategy reports holding for
+# Scripps-shaped input - every procedure repeated once per payer, grouped by
+# procedure like the published files - next to the set the parser used to keep.
+#
+#   python -m benchmarks.bench_dedup --procedures 1000000
+import argparse
+import sys
+import time
+
+from chargemaster_parsers.parsers import ExactDedup, FingerprintDedup, GroupedDedup
+
+
+def keys(procedures, payers):
+    for procedure in range(procedures):
+        key = str(50400000 + procedure)
+        for _ in range(payers):
+            yield key
+
+
+def plain_set(keys):
+    seen = set()
+    key_bytes = 0
+    for key in keys:
+        if key not in seen:
+            seen.add(key)
+            key_bytes += sys.getsizeof(key)
+    return sys.getsizeof(seen) + key_bytes
+
+
+def strategy(dedup_class):
+    def run(keys):
+        dedup = dedup_class()
+        add = dedup.add
+        for key in keys:
+            add(key)
+        return dedup.stats().peak_memory
+
+    return run
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--procedures", type=int, default=1000000)
+    arg_parser.add_argument("--payers", type=int, default=40)
+    args = arg_parser.parse_args()
+
+    total = args.procedures * args.payers
+    print(f"{args.procedures:,} procedures x {args.payers} payers")
+    for name, run in (
+        ("set", plain_set),
+        ("ExactDedup", strategy(ExactDedup)),
+        ("FingerprintDedup", strategy(FingerprintDedup)),
+        ("GroupedDedup", strategy(GroupedDedup)),
+    ):
+        start = time.perf_counter()
+        memory = run(keys(args.procedures, args.payers))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>16}: {total / elapsed:,.0f} keys/s, "
+            f"{memory / 2**20:.1f} MiB ({memory / args.procedures:.1f} bytes a key)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Fetching a Sharp-sized crawl (many files on one host) from a local server that
+# adds a fixed latency per request: a fresh urllib connection per file one after
+# another, as the README used to suggest, versus the pooled Downloader. Then a
+# second Downloader run, where every file is revalidated with its ETag.
+#
+#   python -m benchmarks.bench_download --files 200 --latency 0.02
+import argparse
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chargemaster_parsers.artifacts import ArtifactStore
+from chargemaster_parsers.download import Downloader
+
+ETAG = '"1"'
+
+
+def serve(body, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.headers["If-None-Match"] == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--files", type=int, default=200)
+    arg_parser.add_argument("--size", type=int, default=64 * 1024)
+    arg_parser.add_argument("--latency", type=float, default=0.02)
+    arg_parser.add_argument("--per-host", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    server = serve(b"x" * args.size, args.latency)
+    port = server.server_address[1]
+    urls = [f"http://127.0.0.1:{port}/{i}.xlsx" for i in range(args.files)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ArtifactStore(directory)
+        start = time.perf_counter()
+        for url in urls:
+            with urllib.request.urlopen(url) as response:
+                store.put(url, response)
+        serial = time.perf_counter() - start
+        print(f"  serial urllib: {serial:.2f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ArtifactStore(directory)
+        start = time.perf_counter()
+        with Downloader(store, max_per_host=args.per_host) as downloader:
+            results = downloader.download(urls)
+            opened = downloader.pool(urls[0]).connections_opened
+        pooled = time.perf_counter() - start
+        assert all(result.ok for result in results.values())
+        print(
+            f"     Downloader: {pooled:.2f}s over {opened} connections "
+            f"({serial / pooled:.1f}x)"
+        )
+
+        start = time.perf_counter()
+        with Downloader(store, max_per_host=args.per_host) as downloader:
+            results = downloader.download(urls)
+        revalidated = time.perf_counter() - start
+        unchanged = sum(result.unchanged for result in results.values())
+        print(f"   revalidation: {revalidated:.2f}s, {unchanged} unchanged")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
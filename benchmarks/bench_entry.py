@@ -0,0 +1,70 @@
+# Micro-benchmark for ChargeMasterEntry construction.
+#
+#   python -m benchmarks.bench_entry --entries 200000
+import argparse
+import time
+
+from chargemaster_parsers.parsers import ChargeMasterEntry
+
+FIELDS = dict(
+    location="Scripps Green Hospital",
+    procedure_identifier="MS940",
+    procedure_description="O.R. Procedures With Diagnoses Of Other Contact",
+    ms_drg_code="940",
+    max_reimbursement=101685.89,
+    min_reimbursement=9000.0,
+    expected_reimbursement=18463.8,
+    in_patient=True,
+    payer="AETNA MEDICARE ADVANTAGE",
+    plan="AETNA MCR ADV HMO - HEALTH EXCEL IPA",
+    gross_charge=105058.34,
+)
+
+
+def legacy_init(self, **kwargs):
+    # ChargeMasterEntry.__init__ as it was before the fast path, kept as the baseline
+    for key in ChargeMasterEntry.__slots__:
+        value = None
+        try:
+            value = kwargs.pop(key)
+        except KeyError:
+            pass
+        setattr(self, key, value)
+
+
+def legacy_entry(**kwargs):
+    entry = object.__new__(ChargeMasterEntry)
+    legacy_init(entry, **kwargs)
+    return entry
+
+
+def measure(name, function, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>22}: {count / elapsed:>12,.0f} entries/s")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--entries", type=int, default=200000)
+    args = arg_parser.parse_args()
+
+    make_entry = ChargeMasterEntry.builder()
+    build_positional = ChargeMasterEntry.builder(*FIELDS)
+    values = tuple(FIELDS.values())
+
+    expected = repr(ChargeMasterEntry(**FIELDS))
+    assert repr(legacy_entry(**FIELDS)) == expected
+    assert repr(make_entry(**FIELDS)) == expected
+    assert repr(build_positional(*values)) == expected
+
+    measure("legacy __init__", lambda: legacy_entry(**FIELDS), args.entries)
+    measure("__init__", lambda: ChargeMasterEntry(**FIELDS), args.entries)
+    measure("builder() keywords", lambda: make_entry(**FIELDS), args.entries)
+    measure("builder(*fields)", lambda: build_positional(*values), args.entries)
+
+
+if __name__ == "__main__":
+    main()
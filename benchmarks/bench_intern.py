@@ -0,0 +1,55 @@
+# Memory needed to hold a full run's output with and without a StringPool, on a
+# synthetic Scripps style file where every procedure repeats across payer rows.
+#
+#   python -m benchmarks.bench_intern --rows 50000
+import argparse
+import gc
+import io
+import time
+import tracemalloc
+
+from chargemaster_parsers.parsers import StringPool, ScrippsChargeMasterParser
+
+from .synthetic import make_scripps_artifact
+
+
+def artifacts(data):
+    return {
+        url: io.BytesIO(data if i == 0 else b"")
+        for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+    }
+
+
+def hold(parser, data):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    entries = list(parser.parse_artifacts(artifacts(data)))
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(entries), retained, elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=50000)
+    args = arg_parser.parse_args()
+
+    data = make_scripps_artifact(args.rows)
+    pool = StringPool()
+    for name, parser in (
+        ("no pool", ScrippsChargeMasterParser()),
+        ("string pool", ScrippsChargeMasterParser(string_pool=pool)),
+    ):
+        count, retained, elapsed = hold(parser, data)
+        print(
+            f"{name:>12}: {count} entries, {retained / 2**20:.1f} MiB retained, {elapsed:.2f}s"
+        )
+
+    stats = pool.stats()
+    print(f"{stats.total} strings interned, {stats.unique} unique")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Time and peak traced memory to walk Stanford's and UCI's sectioned documents,
+# loading the whole document up front the way the parsers used to versus reading
+# it a section and a row at a time, plus each parser end to end.
+#
+#   python -m benchmarks.bench_json_sections --rows 100000
+import argparse
+import io
+import json
+import time
+import tracemalloc
+
+from chargemaster_parsers.parsers import (
+    StanfordChargeMasterParser,
+    UCIChargeMasterParser,
+)
+from chargemaster_parsers.parsers.json_stream import decode_chunks, iter_sections
+
+from .synthetic import make_stanford, make_uci
+
+
+def whole_document(data):
+    for rows in json.loads(data).values():
+        for _ in rows:
+            pass
+
+
+def sections(data):
+    # Like the parsers, only reads the sections with rows it uses
+    for name, rows in iter_sections(decode_chunks(io.BytesIO(data))):
+        if name in ("Gross Charges", "Professional Charges"):
+            for _ in rows:
+                pass
+
+
+def measure(parse, data):
+    start = time.perf_counter()
+    parse(data)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    parse(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    args = arg_parser.parse_args()
+
+    for parser_class, make in (
+        (StanfordChargeMasterParser, make_stanford),
+        (UCIChargeMasterParser, make_uci),
+    ):
+        ((url, data),) = make(args.rows).items()
+
+        def parser(data):
+            for _ in parser_class().parse_artifacts({url: io.BytesIO(data)}):
+                pass
+
+        print(f"{parser_class.INSTITUTION_NAME}: {len(data) / 2**20:.1f} MiB document")
+        for name, parse in (
+            ("whole document", whole_document),
+            ("sections", sections),
+            ("parser", parser),
+        ):
+            elapsed, peak = measure(parse, data)
+            print(f"{name:>16}: {elapsed:.2f}s, peak {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Time to the first entry, total time and peak traced memory for UCSD's artifact,
+# parsed incrementally versus repairing and decoding the whole document up front
+# the way the parser used to.
+#
+#   python -m benchmarks.bench_json_stream --rows 50000
+import argparse
+import io
+import json
+import time
+import tracemalloc
+
+from chargemaster_parsers.parsers import UCSDChargeMasterParser
+from chargemaster_parsers.parsers.json_stream import (
+    decode_chunks,
+    iter_array,
+    repair_chunks,
+)
+
+from .synthetic import make_ucsd
+
+
+def whole_document(data):
+    decoded = data.decode("utf-8", errors="replace")
+    for old, new in UCSDChargeMasterParser._REPAIRS:
+        decoded = decoded.replace(old, new)
+    for _ in json.loads(decoded):
+        yield
+
+
+def streaming_document(data):
+    text = decode_chunks(io.BytesIO(data), errors="replace")
+    return iter_array(repair_chunks(text, UCSDChargeMasterParser._REPAIRS))
+
+
+def streaming(data):
+    parser = UCSDChargeMasterParser()
+    artifacts = {parser.ARTIFACT_URL: io.BytesIO(data)}
+    return parser.parse_artifacts(artifacts)
+
+
+def measure(parse, data):
+    start = time.perf_counter()
+    items = parse(data)
+    next(items)
+    first = time.perf_counter() - start
+    for _ in items:
+        pass
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in parse(data):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first, elapsed, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=50000)
+    args = arg_parser.parse_args()
+
+    (data,) = make_ucsd(args.rows).values()
+    print(f"{args.rows:,} rows, {len(data) / 2**20:.1f} MiB document")
+    for name, parse in (
+        ("whole document (decode only)", whole_document),
+        ("streaming (decode only)", streaming_document),
+        ("streaming parser", streaming),
+    ):
+        first, elapsed, peak = measure(parse, data)
+        print(
+            f"{name:>28}: first item {first * 1000:.1f}ms, total {elapsed:.2f}s, "
+            f"peak {peak / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
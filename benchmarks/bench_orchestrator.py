@@ -0,0 +1,72 @@
+# Wall time to parse every institution one after another versus all at once with
+# the process pool orchestrator, on synthetic artifacts written to a temp dir.
+#
+#   python -m benchmarks.bench_orchestrator --rows 100000
+import argparse
+import os
+import tempfile
+import time
+
+from chargemaster_parsers.orchestrator import ParallelRun
+from chargemaster_parsers.parsers import ChargeMasterParser
+
+from .synthetic import GENERATORS
+
+
+def write_jobs(rows, directory):
+    jobs = {}
+    for institution, generate in GENERATORS.items():
+        artifacts = {}
+        for i, (url, data) in enumerate(generate(rows).items()):
+            path = os.path.join(directory, f"{institution}_{i}")
+            with open(path, "wb") as f:
+                f.write(data)
+            artifacts[url] = path
+        jobs[institution] = artifacts
+    return jobs
+
+
+def sequential(jobs):
+    timings = {}
+    for institution, artifacts in jobs.items():
+        start = time.perf_counter()
+        parser = ChargeMasterParser.build(institution)
+        files = {url: open(path, "rb") for url, path in artifacts.items()}
+        for _ in parser.parse_artifacts(files):
+            pass
+        for f in files.values():
+            f.close()
+        timings[institution] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    arg_parser.add_argument("--workers", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        jobs = write_jobs(args.rows, directory)
+
+        timings = sequential(jobs)
+        slowest = max(timings, key=timings.get)
+        print(f"  sequential: {sum(timings.values()):.2f}s")
+        print(f"     slowest: {timings[slowest]:.2f}s ({slowest})")
+
+        for name, options in (
+            ("unordered", {}),
+            ("ordered", {"ordered": True}),
+            ("tuples", {"as_tuples": True}),
+        ):
+            start = time.perf_counter()
+            run = ParallelRun(jobs, max_workers=args.workers, **options)
+            count = sum(1 for _ in run)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>12}: {elapsed:.2f}s, {count:,} entries, {len(run.failures)} failures"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Re-running the Sharp parser over a set of unchanged workbooks: parsing them
+# again versus replaying the output a ParseCache saved on the first run.
+#
+#   python -m benchmarks.bench_parse_cache --workbooks 10 --rows 10000
+import argparse
+import io
+import tempfile
+import time
+
+from chargemaster_parsers.parse_cache import ParseCache
+from chargemaster_parsers.parsers import SharpChargeMasterParser
+
+from .synthetic import make_sharp
+
+
+def timed(entries):
+    start = time.perf_counter()
+    count = sum(1 for _ in entries)
+    return count, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--workbooks", type=int, default=10)
+    arg_parser.add_argument("--rows", type=int, default=10000)
+    args = arg_parser.parse_args()
+
+    (workbook,) = make_sharp(args.rows).values()
+    urls = SharpChargeMasterParser.ARTIFACT_URLS[: args.workbooks]
+    parser = SharpChargeMasterParser()
+
+    def artifacts():
+        return {url: io.BytesIO(workbook) for url in urls}
+
+    count, parsed = timed(parser.parse_artifacts(artifacts()))
+    print(f"      parse: {parsed:.2f}s for {count:,} entries")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache(directory)
+        _, first = timed(cache.parse_artifacts(parser, artifacts()))
+        print(f" first run: {first:.2f}s, {cache.size() / 2**20:.1f} MiB cached")
+        _, replayed = timed(cache.parse_artifacts(parser, artifacts()))
+        print(f"    replay: {replayed:.2f}s ({parsed / replayed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Parsing price columns with the memoized, exception-free parse_price/parse_prices
+# versus the replace/float/try-except dance the parsers used to do per cell.
+#
+#   python -m benchmarks.bench_prices --rows 1000000
+import argparse
+import random
+import time
+
+from chargemaster_parsers.parsers import ChargeMasterParser
+
+
+def legacy_parse_price(price):
+    try:
+        return float(price.replace("$", "").replace(",", ""))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def make_prices(rows, distinct, missing):
+    generator = random.Random(0)
+    pool = [f"{generator.uniform(1, 250000):,.2f}" for _ in range(distinct)]
+    pool += [f"${price}" for price in pool[: distinct // 4]]
+    fillers = ["NA", "N/A", "Variable", ""]
+    return [
+        (
+            generator.choice(fillers)
+            if generator.random() < missing
+            else generator.choice(pool)
+        )
+        for _ in range(rows)
+    ]
+
+
+def measure(name, function, prices):
+    start = time.perf_counter()
+    function(prices)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>12}: {elapsed:.2f}s, {len(prices) / elapsed:,.0f} prices/s")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=1000000)
+    arg_parser.add_argument("--distinct", type=int, default=20000)
+    arg_parser.add_argument("--missing", type=float, default=0.3)
+    args = arg_parser.parse_args()
+
+    prices = make_prices(args.rows, args.distinct, args.missing)
+    parser = ChargeMasterParser()
+    parse_price = parser.parse_price
+
+    measure("try/float", lambda prices: [legacy_parse_price(p) for p in prices], prices)
+    measure("parse_price", lambda prices: [parse_price(p) for p in prices], prices)
+    measure("parse_prices", parser.parse_prices, prices)
+
+
+if __name__ == "__main__":
+    main()
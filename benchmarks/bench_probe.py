@@ -0,0 +1,91 @@
+# Sweeping candidate artifact urls on a local server that adds a fixed latency per
+# request: one GET after another (as find_artifacts used to, minus its one second
+# sleep), versus the Prober's concurrent HEADs, versus a second Prober sweep
+# answered from its results cache.
+#
+#   python -m benchmarks.bench_probe --candidates 400 --latency 0.02
+import argparse
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chargemaster_parsers.probe import Prober
+
+
+def serve(latency, size):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def respond(self, with_body):
+            time.sleep(latency)
+            # Every tenth candidate exists
+            if int(self.path.strip("/").split(".")[0]) % 10:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            if with_body:
+                self.wfile.write(b"x" * size)
+
+        def do_HEAD(self):
+            self.respond(False)
+
+        def do_GET(self):
+            self.respond(True)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--candidates", type=int, default=400)
+    arg_parser.add_argument("--latency", type=float, default=0.02)
+    arg_parser.add_argument("--size", type=int, default=1 << 20)
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--rate", type=float, default=200.0)
+    args = arg_parser.parse_args()
+
+    server = serve(args.latency, args.size)
+    port = server.server_address[1]
+    urls = [f"http://127.0.0.1:{port}/{i}.xlsx" for i in range(args.candidates)]
+
+    start = time.perf_counter()
+    found = []
+    for url in urls:
+        try:
+            with urllib.request.urlopen(url) as response:
+                response.read()
+                found.append(url)
+        except urllib.error.HTTPError:
+            pass
+    serial = time.perf_counter() - start
+    print(f"     serial GET: {serial:.2f}s, {len(found)} found")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "probe.json")
+        for name in ("Prober", "cached Prober"):
+            prober = Prober(cache_path, concurrency=args.concurrency, rate=args.rate)
+            start = time.perf_counter()
+            found = prober.find(urls)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>15}: {elapsed:.2f}s, {len(found)} found, "
+                f"{prober.requests} requests"
+            )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
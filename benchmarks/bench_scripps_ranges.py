@@ -0,0 +1,77 @@
+# Rows per second parsing one large synthetic Scripps file on disk, serially with
+# parse_artifacts and split into byte ranges across increasing numbers of worker
+# processes with parse_artifacts_ranged. Speedup is relative to the serial parse.
+#
+#   python -m benchmarks.bench_scripps_ranges --mib 4096
+import argparse
+import os
+import tempfile
+import time
+
+from chargemaster_parsers.parsers import ScrippsChargeMasterParser
+
+from .synthetic import SCRIPPS_HEADER, scripps_lines
+
+# Rows written at a time while generating the file
+BATCH_ROWS = 100000
+
+
+def write_file(path, mib):
+    rows = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(SCRIPPS_HEADER + "\n")
+        while f.tell() < mib * 2**20:
+            f.write("\n".join(scripps_lines(rows, rows + BATCH_ROWS)) + "\n")
+            rows += BATCH_ROWS
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--mib", type=int, default=2048)
+    arg_parser.add_argument("--range-mib", type=int, default=None)
+    arg_parser.add_argument("--workers", type=int, nargs="*", default=None)
+    args = arg_parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    range_size = args.range_mib and args.range_mib * 2**20
+
+    parser = ScrippsChargeMasterParser()
+    urls = parser.ARTIFACT_URLS
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {url: os.path.join(directory, f"{i}.csv") for i, url in enumerate(urls)}
+        rows = write_file(paths[urls[0]], args.mib)
+        for url in urls[1:]:
+            with open(paths[url], "w") as f:
+                f.write(SCRIPPS_HEADER)
+        print(f"{rows:,} rows, {os.path.getsize(paths[urls[0]]) / 2**20:,.0f} MiB")
+
+        def run(parse, **kwargs):
+            files = {url: open(path, "rb") for url, path in paths.items()}
+            try:
+                start = time.perf_counter()
+                entries = sum(1 for _ in parse(files, **kwargs))
+                return entries, time.perf_counter() - start
+            finally:
+                for f in files.values():
+                    f.close()
+
+        entries, baseline = run(parser.parse_artifacts)
+        print(
+            f"{'serial':>10}: {baseline:.1f}s, {rows / baseline:,.0f} rows/s, "
+            f"{entries:,} entries"
+        )
+        for count in workers:
+            ranged_entries, elapsed = run(
+                parser.parse_artifacts_ranged, workers=count, range_size=range_size
+            )
+            assert ranged_entries == entries
+            print(
+                f"{count:>2} workers: {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s, "
+                f"{baseline / elapsed:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
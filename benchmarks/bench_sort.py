@@ -0,0 +1,70 @@
+# Sorting and de-duplicating entries through the cached sort key.
+#
+#   python -m benchmarks.bench_sort --entries 200000
+import argparse
+import functools
+import random
+import time
+
+from chargemaster_parsers.parsers import ChargeMasterEntry
+
+
+def legacy_compare(left_entry, right_entry):
+    # The per-slot __lt__ walk from before the cached key, as a cmp function
+    for key in ChargeMasterEntry.__slots__:
+        left = getattr(left_entry, key)
+        right = getattr(right_entry, key)
+        if left == right:
+            continue
+        elif left is not None and right is not None:
+            return -1 if left < right else 1
+        elif left is None:
+            return -1
+        else:
+            return 1
+    return 0
+
+
+def make_entries(count):
+    make_entry = ChargeMasterEntry.builder()
+    generator = random.Random(0)
+    payers = [f"Payer {i}" for i in range(40)]
+    return [
+        make_entry(
+            location="Scripps Green Hospital",
+            procedure_identifier=str(generator.randrange(count // 10 + 1)),
+            procedure_description="PROCEDURE",
+            payer=generator.choice(payers),
+            gross_charge=float(generator.randrange(100000)),
+            in_patient=generator.random() < 0.5,
+        )
+        for _ in range(count)
+    ]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--entries", type=int, default=200000)
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    sorted(make_entries(args.entries), key=functools.cmp_to_key(legacy_compare))
+    print(f"legacy per-slot sort: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    sorted(make_entries(args.entries))
+    print(f"  cached key __lt__ : {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    sorted(make_entries(args.entries), key=ChargeMasterEntry.sort_key)
+    print(f"  key=sort_key      : {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    unique = set(make_entries(args.entries))
+    print(
+        f"  set de-duplication: {time.perf_counter() - start:.2f}s ({len(unique)} unique)"
+    )
+
+
+if __name__ == "__main__":
+    main()
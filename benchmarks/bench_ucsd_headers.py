@@ -0,0 +1,78 @@
+# Rows per second turning UCSD's decoded rows into fields, insurance prices and
+# plan names - normalizing every key of every row the way the parser used to,
+# versus applying a plan worked out once per distinct set of keys. Prices aren't
+# parsed by either, so only the header handling is compared.
+#
+#   python -m benchmarks.bench_ucsd_headers --rows 1000000
+import argparse
+import itertools
+import time
+
+from chargemaster_parsers.parsers import UCSDChargeMasterParser
+from chargemaster_parsers.parsers.ucsd import _clean_value
+
+from .synthetic import ucsd_records
+
+# Distinct records cycled through - building a million dicts up front would
+# measure the allocator rather than either approach
+POOL_SIZE = 10000
+
+
+def per_row(rows):
+    for row in rows:
+        filtered_row = {}
+        for key, value in row.items():
+            filtered_key = (
+                key.encode("ascii", errors="ignore")
+                .decode()
+                .replace("_", " ")
+                .strip()
+                .upper()
+            )
+            filtered_value = None
+            if value:
+                filtered_value = value.encode("ascii", errors="ignore").decode().strip()
+            filtered_row[filtered_key] = filtered_value
+        for name in UCSDChargeMasterParser._FIELDS:
+            filtered_row.pop(name, None)
+        for insurance_providers, value in filtered_row.items():
+            for insurance_provider in insurance_providers.split(";"):
+                plan = insurance_provider.strip()
+
+
+def header_plan(rows):
+    header_plans = {}
+    for row in rows:
+        keys = tuple(row)
+        plan = header_plans.get(keys)
+        if plan is None:
+            plan = header_plans[keys] = UCSDChargeMasterParser._header_plan(keys)
+        fields, insurance = plan
+        filtered_row = {name: _clean_value(row[key]) for name, key in fields}
+        values = [_clean_value(row[key]) for key, _ in insurance]
+        for (_, plans), value in zip(insurance, values):
+            for plan in plans:
+                pass
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=1000000)
+    args = arg_parser.parse_args()
+
+    pool = list(ucsd_records(min(args.rows, POOL_SIZE)))
+    print(f"{args.rows:,} rows of {len(pool[0])} columns")
+    baseline = None
+    for name, run in (("per row", per_row), ("header plan", header_plan)):
+        start = time.perf_counter()
+        run(itertools.islice(itertools.cycle(pool), args.rows))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"{name:>11}: {elapsed:.2f}s, {args.rows / elapsed:,.0f} rows/s, "
+            f"{baseline / elapsed:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Wall time for one multi-file institution - Sharp's workbooks - parsed with
+# parse_artifacts versus parse_artifacts_parallel with its work units spread over
+# worker processes. The speedup is bounded by the number of cores.
+#
+#   python -m benchmarks.bench_work_units --workbooks 16 --rows 20000
+import argparse
+import os
+import tempfile
+import time
+
+from chargemaster_parsers.parsers import SharpChargeMasterParser
+
+from .synthetic import make_sharp
+
+
+def timed(entries):
+    start = time.perf_counter()
+    count = sum(1 for _ in entries)
+    return count, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--workbooks", type=int, default=16)
+    arg_parser.add_argument("--rows", type=int, default=20000)
+    arg_parser.add_argument("--workers", type=int, action="append")
+    args = arg_parser.parse_args()
+    workers = args.workers or sorted({1, 2, os.cpu_count() or 1})
+
+    (workbook,) = make_sharp(args.rows).values()
+    urls = SharpChargeMasterParser.ARTIFACT_URLS[: args.workbooks]
+    parser = SharpChargeMasterParser()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workbook.xlsx")
+        with open(path, "wb") as f:
+            f.write(workbook)
+
+        def artifacts():
+            return {url: open(path, "rb") for url in urls}
+
+        count, serial = timed(parser.parse_artifacts(artifacts()))
+        print(f"       serial: {serial:.2f}s for {count:,} entries")
+        for worker_count in workers:
+            _, elapsed = timed(
+                parser.parse_artifacts_parallel(artifacts(), workers=worker_count)
+            )
+            print(
+                f"{worker_count:>3} workers: {elapsed:.2f}s ({serial / elapsed:.2f}x) "
+                f"on {os.cpu_count()} cores"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Time and peak traced memory to read every row of a workbook with openpyxl's
+# object model, the streaming XlsxReader the xlsx parsers use, and an XlsxRowCache
+# replaying the workbook's transcoded rows.
+#
+#   python -m benchmarks.bench_xlsx --rows 200000
+import argparse
+import io
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+
+from chargemaster_parsers.parsers.xlsx import XlsxReader, XlsxRowCache
+
+from .synthetic import make_cedars
+
+
+def read_openpyxl(data):
+    workbook = openpyxl.load_workbook(io.BytesIO(data))
+    return sum(1 for _ in workbook.worksheets[0].iter_rows(values_only=True))
+
+
+def read_streaming(data):
+    with XlsxReader(io.BytesIO(data)) as reader:
+        return sum(1 for _ in reader.iter_rows())
+
+
+def measure(read, data):
+    # Timed untraced - tracemalloc slows allocation-heavy code down several times
+    start = time.perf_counter()
+    rows = read(data)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    read(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=200000)
+    args = arg_parser.parse_args()
+
+    (data,) = make_cedars(args.rows).values()
+    print(f"{args.rows:,} rows, {len(data) / 2**20:.1f} MiB workbook")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = XlsxRowCache(directory)
+        # Transcoded up front so every measured read is a replay
+        for _ in cache.iter_rows(io.BytesIO(data)):
+            pass
+
+        def read_cached(data):
+            return sum(1 for _ in cache.iter_rows(io.BytesIO(data)))
+
+        for name, read in (
+            ("openpyxl", read_openpyxl),
+            ("streaming", read_streaming),
+            ("row cache", read_cached),
+        ):
+            rows, elapsed, peak = measure(read, data)
+            print(
+                f"{name:>10}: {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s, "
+                f"peak {peak / 2**20:.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Runs every parser over synthetic artifacts of a configurable size and reports
+# throughput and peak memory. Each parser runs in its own interpreter so peak RSS
+# isn't polluted by whichever parser ran before it. Nothing touches the network.
+#
+#   python -m benchmarks.suite --rows 1000000
+#   python -m benchmarks.suite --rows 200000 --parser UCSD --parser Tri-City
+#   python -m benchmarks.suite --rows 200000 --instrument
+import argparse
+from contextlib import nullcontext
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from chargemaster_parsers.parsers import ChargeMasterParser
+
+from .synthetic import GENERATORS
+
+
+def peak_rss():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def write_artifacts(institution, rows, directory):
+    artifacts = GENERATORS[institution](rows)
+    paths = {}
+    for i, (url, data) in enumerate(artifacts.items()):
+        path = os.path.join(directory, f"artifact_{i}")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths[url] = path
+    manifest = os.path.join(directory, "manifest.json")
+    with open(manifest, "w") as f:
+        json.dump({"institution": institution, "rows": rows, "artifacts": paths}, f)
+    return manifest, sum(len(data) for data in artifacts.values())
+
+
+def run_worker(manifest, instrument):
+    # Runs in the child - parse everything, count the output and report as JSON
+    with open(manifest) as f:
+        manifest = json.load(f)
+
+    parser = ChargeMasterParser.build(manifest["institution"])
+    artifacts = {url: open(path, "rb") for url, path in manifest["artifacts"].items()}
+    baseline = peak_rss()
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    entries = 0
+    with parser.instrument() if instrument else nullcontext() as metrics:
+        for _ in parser.parse_artifacts(artifacts):
+            entries += 1
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    for artifact in artifacts.values():
+        artifact.close()
+
+    result = {
+        "rows": manifest["rows"],
+        "entries": entries,
+        "elapsed": elapsed,
+        "cpu": cpu,
+        "baseline_rss": baseline,
+        "peak_rss": peak_rss(),
+    }
+    if metrics is not None:
+        totals = metrics.totals()
+        result["stages"] = {
+            "io": totals.io_time,
+            "decode": totals.decode_time,
+            "build": totals.build_time,
+            "skipped": totals.rows_skipped,
+        }
+    print(json.dumps(result))
+
+
+def run_parser(institution, rows, instrument):
+    with tempfile.TemporaryDirectory() as directory:
+        manifest, size = write_artifacts(institution, rows, directory)
+        command = [sys.executable, "-m", "benchmarks.suite", "--worker", manifest]
+        if instrument:
+            command.append("--instrument")
+        completed = subprocess.run(
+            command,
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+    result = json.loads(completed.stdout.decode().strip().splitlines()[-1])
+    result["bytes"] = size
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    arg_parser.add_argument(
+        "--parser",
+        action="append",
+        choices=sorted(GENERATORS),
+        help="Institution to benchmark, may be repeated. Defaults to all of them.",
+    )
+    arg_parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="Also report the io/decode/build split from ChargeMasterParser.instrument()",
+    )
+    arg_parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.instrument)
+        return
+
+    print(
+        f"{'parser':>12} {'rows':>10} {'entries':>10} {'MiB in':>8} {'seconds':>8} {'rows/s':>10} {'entries/s':>10} {'peak RSS':>9} {'parse RSS':>9}"
+    )
+    for institution in args.parser or sorted(GENERATORS):
+        result = run_parser(institution, args.rows, args.instrument)
+        elapsed = result["elapsed"]
+        print(
+            f"{institution:>12} {result['rows']:>10,} {result['entries']:>10,} "
+            f"{result['bytes'] / 2**20:>8.1f} {elapsed:>8.2f} "
+            f"{result['rows'] / elapsed:>10,.0f} {result['entries'] / elapsed:>10,.0f} "
+            f"{result['peak_rss'] / 2**20:>6.0f} MiB "
+            f"{(result['peak_rss'] - result['baseline_rss']) / 2**20:>5.0f} MiB"
+        )
+        stages = result.get("stages")
+        if stages:
+            print(
+                f"{'':>12} io {stages['io']:.2f}s, decode {stages['decode']:.2f}s, "
+                f"build {stages['build']:.2f}s, {stages['skipped']:,} rows skipped"
+            )
+
+
+if __name__ == "__main__":
+    main()
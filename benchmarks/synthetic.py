@@ -0,0 +1,416 @@
+# Generators for synthetic artifacts in each institution's published format. Every
+# generator takes the number of source rows to produce and returns a dict of
+# {artifact url: bytes} ready to be wrapped in BytesIO (or written to disk) and
+# handed to the parser's parse_artifacts. Values cycle through a limited set of
+# procedures, codes and prices so the output repeats the way real files do.
+import io
+import json
+import zipfile
+
+from openpyxl import Workbook
+
+from chargemaster_parsers.parsers import (
+    CedarsSinaiChargeMasterParser,
+    KaiserChargeMasterParser,
+    LLUHChargeMasterParser,
+    PalomarChargeMasterParser,
+    RadyChargeMasterParser,
+    ScrippsChargeMasterParser,
+    SharpChargeMasterParser,
+    SouthwestChargeMasterParser,
+    StanfordChargeMasterParser,
+    TriCityChargeMasterParser,
+    UCIChargeMasterParser,
+    UCSDChargeMasterParser,
+)
+
+PAYERS = [f"Payer {i}" for i in range(30)]
+
+SCRIPPS_HEADER = "LOCATION|PROCEDURE CODE|PROCEDURE DESCRIPTION|PAYER|PLAN|GROSS CHARGES IP|IP_EXPECTED_REIMBURSMENT|GROSS CHARGES OP|OP_EXPECTED_REIMBURSMENT|IP_MIN|IP_MAX|OP_MIN|OP_MAX|CASH/SELF PAY"
+
+
+def _code(i):
+    # Rotates through the labelled code styles the JSON and CSV files use
+    kind = i % 4
+    if kind == 0:
+        return f"CPT® {10000 + i % 9000}"
+    elif kind == 1:
+        return f"HCPCS J{1000 + i % 9000}"
+    elif kind == 2:
+        return f"MS-DRG V37 (FY 2020) {i % 999:03d}"
+    else:
+        return f"ICD10 Z{i % 100:02d}.00"
+
+
+def _xlsx(rows):
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    for row in rows:
+        worksheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def scripps_lines(start, stop, payers=40):
+    for i in range(start, stop):
+        procedure = i // payers
+        payer = i % payers
+        yield f"Scripps Green Hospital|{50400000 + procedure}|PROCEDURE DESCRIPTION {procedure}|PAYER {payer} [{payer}]|PLAN {payer} [{payer}01]|{1000 + procedure}.00|{500 + payer}.00|{900 + procedure}.00|{400 + payer}.00|10.00|2000.00|10.00|2000.00|{300 + procedure}.00"
+
+
+def make_scripps_artifact(rows, payers=40):
+    lines = [SCRIPPS_HEADER]
+    lines.extend(scripps_lines(0, rows, payers))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def make_scripps(rows):
+    urls = ScrippsChargeMasterParser.ARTIFACT_URLS
+    return {
+        url: make_scripps_artifact(rows) if i == 0 else SCRIPPS_HEADER.encode()
+        for i, url in enumerate(urls)
+    }
+
+
+def make_tricity_artifact(rows, payers=PAYERS):
+    lines = [
+        '"Price Transparency Machine Readable file as of July 1, 2022"',
+        "",
+        "Code Type,Code,Description,Patient Type,Rev Code,Gross Charge,Cash Price,"
+        + ",".join(f'"{payer}"' for payer in payers)
+        + ",Min ($),Max ($)",
+    ]
+    for i in range(rows):
+        prices = ",".join(f'"${(i % 500) * 3 + j}.25"' for j in range(len(payers)))
+        lines.append(
+            f'CDM,{10000 + i % 9000},PROCEDURE {i},OP,0{300 + i % 50},"$1,{i % 1000}.00","$5{i % 100}.00",{prices},$1.00,"$9,999.00"'
+        )
+    return ("\n".join(lines) + "\n").encode("cp1252")
+
+
+def make_tricity(rows):
+    # Real headers group several payers into one cell separated by newlines
+    payers = [
+        "\n".join(PAYERS[i : i + 3]) if i % 2 else PAYERS[i]
+        for i in range(0, len(PAYERS), 3)
+    ]
+    return {TriCityChargeMasterParser.ARTIFACT_URL: make_tricity_artifact(rows, payers)}
+
+
+def make_southwest(rows):
+    lines = [
+        "Southwest Healthcare System Standard Charges",
+        "Facility,Description,CDM,Code Type,DRG (If Applicable),CPT/HCPCS (If Applicable),EAPG (If Applicable),APC (If Applicable),Rev Code (If Applicable),Gross Charge,Cash Price,Minimum,Maximum,"
+        + ",".join(PAYERS),
+    ]
+    for i in range(rows):
+        # About a third of contract rates are "-1" meaning not applicable
+        prices = ",".join(
+            "-1" if (i + j) % 3 == 0 else f'"${(i % 500) * 3 + j}.25"'
+            for j in range(len(PAYERS))
+        )
+        cpt = f"{10000 + i % 9000}" if i % 2 else f"J{1000 + i % 9000}"
+        lines.append(
+            f'Inland Valley,PROCEDURE {i % 20000},{i},CDM,,{cpt},,,0{300 + i % 50},"1,{i % 1000}.00",5{i % 100}.00,1.00,"9,999.00",{prices}'
+        )
+    return {
+        SouthwestChargeMasterParser.ARTIFACT_URL: ("\n".join(lines) + "\n").encode()
+    }
+
+
+def make_lluh(rows):
+    urls = list(LLUHChargeMasterParser.URL_TO_INSTITUTION)
+    header = (
+        "procedure,code,description,gross_pay,cash_pay,minimum,maximum,"
+        + ",".join(payer.replace(" ", "_") for payer in PAYERS)
+    )
+    artifacts = {}
+    for index, url in enumerate(urls):
+        lines = ["Loma Linda University Health Standard Charges", header]
+        for i in range(index, rows, len(urls)):
+            prices = ",".join(
+                "N/A" if (i + j) % 4 == 0 else f"{(i % 500) * 3 + j}.25"
+                for j in range(len(PAYERS))
+            )
+            lines.append(
+                f'{i},"{_code(i)}",PROCEDURE {i % 20000},"1,{i % 1000}.00",5{i % 100}.00,1.00,9999.00,{prices}'
+            )
+        artifacts[url] = ("\n".join(lines) + "\n").encode("cp1252")
+    return artifacts
+
+
+def make_kaiser(rows):
+    plans = ("COMMERCIAL", "MEDICAID", "MEDICARE")
+    lines = [
+        "Kaiser Foundation Hospital – San Diego Medical Center",
+        "Prices effective February 2023",
+        "HOSPITAL SERVICES AND PROCEDURES",
+        "",
+        '"Charge # \n(Px Code)",Procedure Code (CPT / HCPCS),Default Modifier,Rev code,Procedure Name,Gross Charge,Discounted Cash Charge,Hospital Inpatient / Outpatient / Both,'
+        + ",".join(
+            f'"{plan} {setting} - KAISER FOUNDATION HEALTH PLAN, INC. PRICE"'
+            for plan in plans
+            for setting in ("INPATIENT", "OUTPATIENT")
+        )
+        + ", De-identified Minimum Negotiated $ , De-identified Maximum Negotiated $ ",
+    ]
+    for i in range(rows):
+        cpt = f"{10000 + i % 9000}" if i % 2 else f"J{1000 + i % 9000}"
+        lines.append(
+            f'{6000 + i},{cpt},,0{200 + i % 50},PROCEDURE {i % 20000}," $1{i % 1000},834 "," $4,142 ",BOTH,'
+            + ",".join(" Not applicable " for _ in range(len(plans) * 2))
+            + ", None , None "
+        )
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(
+            "941105628_KaiserSanDiegoChargeDescriptionMaster.csv",
+            ("\n".join(lines) + "\n").encode(),
+        )
+    return {KaiserChargeMasterParser.SAN_DIEGO_ARTIFACT_URL: output.getvalue()}
+
+
+def ucsd_records(rows):
+    payers = [
+        " ; ".join(PAYERS[i : i + 3]) if i % 2 else PAYERS[i]
+        for i in range(0, len(PAYERS), 3)
+    ]
+    for i in range(rows):
+        record = {
+            "PROCEDURE": str(100 + i),
+            "Code Type": "ERX" if i % 3 == 0 else "SUP",
+            "Code": _code(i),
+            "NDC": (
+                f"00121-{i % 10000:04d}-11"
+                if i % 3 == 0
+                else "0250 - PHARMACY - GENERAL CLASSIFICATION"
+            ),
+            "Rev Code": "0250 - PHARMACY - GENERAL CLASSIFICATION",
+            "PROCEDURE_DESCRIPTION": f"PROCEDURE {i % 20000}",
+            "QUANTITY": "10.15 mL",
+            "IP_PRICE": f"{i % 1000}.87",
+            "REIMB_MIN": "Variable" if i % 5 == 0 else f"{i % 100}.25",
+            "REIMB_MAX": "Variable" if i % 5 == 0 else f"{i % 100 + 500}.25",
+        }
+        for j, payer in enumerate(payers):
+            record[payer] = "Variable" if (i + j) % 4 == 0 else f"{(i + j) % 700}.42"
+        yield record
+
+
+def make_ucsd(rows):
+    records = list(ucsd_records(rows))
+
+    # Reproduce the damage the real file has - an unescaped quoted word inside a
+    # string and quotes wrapped in invalid UTF-8
+    records[0]["PROCEDURE_DESCRIPTION"] = "@VARIABLE@ the price is negotiated"
+    for record in records[1::1000]:
+        record["PROCEDURE_DESCRIPTION"] += " @BROKEN@"
+    data = json.dumps(records).encode("utf-8")
+    data = data.replace(b"@VARIABLE@", b'Where "Variable" exists,')
+    data = data.replace(b"@BROKEN@", b'\xff"\xff')
+    return {UCSDChargeMasterParser.ARTIFACT_URL: data}
+
+
+def make_stanford(rows):
+    # Split the rows across the sections the parser reads, plus the ones it skips
+    gross = [
+        {
+            "Procedure": 300000 + i,
+            "Code": _code(i),
+            "Rev Code": f"0{250 + i % 50}",
+            "Procedure Description": f"PROCEDURE {i % 20000}",
+            "Quantity": "N/A",
+            "Price": float(100 + i % 5000),
+            "Discount Cash Price": float(40 + i % 2000),
+            "NDC": None,
+        }
+        for i in range(rows // 2)
+    ]
+    professional = [
+        {
+            "CDM - Standard Gross Charge": float(1000 + i % 3000),
+            "Description": f"PROFESSIONAL SERVICE {i % 5000}",
+            "Discounted Cash Price": float(500 + i % 1500),
+            "Facility": "FACILITY",
+            "HCPCS": str(10000 + i % 9000),
+            "Item Code": f"{10000 + i % 9000}_{i % 10}",
+            "Location": "Stanford Hospital Clinics",
+            "Payer": PAYERS[i % len(PAYERS)].replace(" ", "_"),
+            "Payer Source": "Fee Schedule",
+            "Payer Specific Negotiated Charge": float(800 + i % 2000),
+            "Payer Specific Negotiated Charge - Max": float(1800 + i % 2000),
+            "Payer Specific Negotiated Charge - Min": float(90 + i % 200),
+        }
+        for i in range(rows // 4)
+    ]
+    remaining = rows - len(gross) - len(professional)
+    inpatient = [
+        {
+            "Payer": PAYERS[i % len(PAYERS)],
+            "MS-DRG": f"{i % 999:03d}",
+            "Description": f"DRG DESCRIPTION {i % 999}",
+            "Payer Specific Negotiated Charge": float(50000 + i % 100000),
+        }
+        for i in range(remaining // 2)
+    ]
+    outpatient = [
+        {
+            "Payer": PAYERS[i % len(PAYERS)],
+            "APC": f"N{900 + i % 99}",
+            "Description": "Packaged Services",
+            "Payer Specific Negotiated Charge": float(100 + i % 1000),
+        }
+        for i in range(remaining - len(inpatient))
+    ]
+    document = {
+        "File Summary": [{"Prices Posted And Effective": "12/22/2022 12:00:00 AM"}],
+        "Gross Charges": gross,
+        "Professional Charges": professional,
+        "Inpatient De-identified Minimum Negotiated Charge": [
+            {
+                "MS-DRG": f"{i:03d}",
+                "Description": f"DRG DESCRIPTION {i}",
+                "De-Identified Minimum Negotiated Charge": float(1000 + i),
+            }
+            for i in range(999)
+        ],
+        "Inpatient De-identified Maximum Negotiated Charge": [
+            {
+                "MS-DRG": f"{i:03d}",
+                "Description": f"DRG DESCRIPTION {i}",
+                "De-Identified Maximum Negotiated Charge": float(200000 + i),
+            }
+            for i in range(999)
+        ],
+        "Inpatient Payer Specific Charge": inpatient,
+        "Outpatient De-identified Minimum Negotiated Charge": [
+            {
+                "APC": f"N{900 + i}",
+                "Description": "Packaged Services",
+                "De-Identified Minimum Negotiated Charge": float(10 + i),
+            }
+            for i in range(99)
+        ],
+        "Outpatient De-identified Maximum Negotiated Charge": [
+            {
+                "APC": f"N{900 + i}",
+                "Description": "Packaged Services",
+                "De-Identified Maximum Negotiated Charge": float(2000 + i),
+            }
+            for i in range(99)
+        ],
+        "Outpatient Payer Specific Charge": outpatient,
+    }
+    return {StanfordChargeMasterParser.ARTIFACT_URL: json.dumps(document).encode()}
+
+
+def make_uci(rows):
+    document = {
+        "File Summary": [
+            {
+                "Hospital Name": "University of California Irvine Medical Center",
+                "Prices Posted And Effective": "8/1/2022 12:00:00 AM",
+            }
+        ],
+        "Gross Charges": [
+            {
+                "Itemcode": str(1000000 + i),
+                "Description": f"PROCEDURE {i % 20000}",
+                "CDM HCPCS": str(10000 + i % 9000),
+                "CDM Revenue Code": f"0{250 + i % 50}",
+                "UCI HB OUTPATIENT RATE Price": (
+                    "N/A" if i % 7 == 0 else f"{1 + i % 9},{i % 1000:03d}.00"
+                ),
+                "UCI HB OUTPATIENT RATE Discounted Cash Price": (
+                    "N/A" if i % 5 == 0 else f"{i % 1000}.00"
+                ),
+            }
+            for i in range(rows)
+        ],
+    }
+    return {UCIChargeMasterParser.ARTIFACT_URL: json.dumps(document).encode()}
+
+
+def make_sharp(rows):
+    # Each Sharp workbook is one department - a title row, the header and charges
+    url = SharpChargeMasterParser.ARTIFACT_URLS[0]
+    sheet = [
+        ("Radiology-Ultrasound",),
+        ("ChargeCode", "ChargeCode Description", "Charge"),
+    ]
+    sheet.extend(
+        (
+            str(414300000 + i),
+            f"PROCEDURE {i % 20000}",
+            f"${1 + i % 9},{i % 1000:03d}.00",
+        )
+        for i in range(rows)
+    )
+    return {url: _xlsx(sheet)}
+
+
+def make_cedars(rows):
+    sheet = [("Cedars-Sinai Chargemaster",), (), (), ()]
+    sheet.append(
+        (
+            "EAP PROC CODE",
+            "EAP PROC NAME",
+            "DEFAULT CPT/ HCPCS CODE",
+            "DEFAULT OP FEE SCHEDULE",
+            "IP/ED FEE SCHEDULE",
+        )
+    )
+    sheet.extend(
+        (
+            2600000 + i,
+            f"PROCEDURE {i % 20000}",
+            10000 + i % 9000 if i % 2 else f"J{1000 + i % 9000}",
+            f"${1000 + i % 5000}.71",
+            None if i % 3 == 0 else f"${2000 + i % 5000}.15",
+        )
+        for i in range(rows)
+    )
+    return {CedarsSinaiChargeMasterParser.ARTIFACT_URL: _xlsx(sheet)}
+
+
+def make_rady(rows):
+    sheet = [("Itemcode", "Item Description", "Load Price")]
+    sheet.extend(
+        (
+            str(10000000 + i),
+            (
+                f"({10000 + i % 9000}) RCH PROCEDURE {i % 20000}"
+                if i % 2
+                else f"RCH SUPPLY {i % 20000}"
+            ),
+            float(100 + i % 5000) if i % 10 else "$1,234.00",
+        )
+        for i in range(rows)
+    )
+    return {RadyChargeMasterParser.ARTIFACT_URL: _xlsx(sheet)}
+
+
+def make_palomar(rows):
+    sheet = [("CDM", "CDM_DESC", "PRICE")]
+    sheet.extend(
+        (473590000 + i, f"PROCEDURE {i % 20000}", float(100 + i % 5000))
+        for i in range(rows)
+    )
+    return {PalomarChargeMasterParser.ARTIFACT_URL: _xlsx(sheet)}
+
+
+GENERATORS = {
+    "Cedars-Sinai": make_cedars,
+    "Kaiser": make_kaiser,
+    "LLUH": make_lluh,
+    "Palomar": make_palomar,
+    "Rady": make_rady,
+    "Scripps": make_scripps,
+    "Sharp": make_sharp,
+    "Southwest": make_southwest,
+    "Stanford": make_stanford,
+    "Tri-City": make_tricity,
+    "UCI": make_uci,
+    "UCSD": make_ucsd,
+}
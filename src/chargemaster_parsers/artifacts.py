@@ -0,0 +1,319 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+# Size of the pieces put() reads from a file-like source while hashing it
+COPY_CHUNK_SIZE = 1 << 20
+
+INDEX_FILENAME = "index.json"
+
+# HTTP validators kept alongside each url so downloads can be revalidated with
+# conditional requests rather than fetched again
+VALIDATOR_FIELDS = ("etag", "last_modified", "content_length")
+
+
+def content_digest(artifact):
+    # sha256 hex digest of a binary file's whole content, leaving its position alone
+    hasher = hashlib.sha256()
+    getbuffer = getattr(artifact, "getbuffer", None)
+    if getbuffer is not None:
+        # BytesIO and MappedArtifact can be hashed in place
+        hasher.update(getbuffer())
+    else:
+        position = artifact.tell()
+        artifact.seek(0)
+        for chunk in iter(lambda: artifact.read(COPY_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+        artifact.seek(position)
+    return hasher.hexdigest()
+
+
+class MappedArtifact(io.BufferedIOBase):
+    # Read-only binary file over a memory map of a stored artifact. Reads are
+    # served straight from the page cache, so several parsers (or processes) can
+    # share one copy of a large file without it ever being held on the heap.
+    def __init__(self, path):
+        self.name = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # Empty files can't be mapped
+            self._map = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+        self._view = memoryview(self._map)
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def __len__(self):
+        return self._size
+
+    def getbuffer(self):
+        # Zero-copy view of the whole artifact
+        self._checkClosed()
+        return self._view
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._checkClosed()
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if position < 0:
+            raise ValueError(f"negative seek position {position}")
+        self._position = position
+        return position
+
+    def tell(self):
+        self._checkClosed()
+        return self._position
+
+    def read(self, size=-1):
+        self._checkClosed()
+        start = min(self._position, self._size)
+        end = self._size if size is None or size < 0 else min(start + size, self._size)
+        self._position = end
+        return self._view[start:end].tobytes()
+
+    read1 = read
+
+    def readinto(self, buffer):
+        self._checkClosed()
+        start = min(self._position, self._size)
+        with memoryview(buffer) as target:
+            target = target.cast("B")
+            count = min(len(target), self._size - start)
+            target[:count] = self._view[start : start + count]
+        self._position = start + count
+        return count
+
+    readinto1 = readinto
+
+    def readline(self, size=-1):
+        self._checkClosed()
+        start = min(self._position, self._size)
+        end = self._map.find(b"\n", start) + 1 if self._size else 0
+        if end <= 0:
+            end = self._size
+        if size is not None and size >= 0:
+            end = min(end, start + size)
+        self._position = end
+        return self._view[start:end].tobytes()
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            if self._size:
+                self._map.close()
+        super().close()
+
+
+class ArtifactStore:
+    # On-disk cache of downloaded artifacts, stored once per distinct content under
+    # their sha256 and looked up by url:
+    #
+    #   root/index.json          url -> hash and HTTP validators, plus size and
+    #                            last use per object
+    #   root/objects/ab/cdef...  the artifacts themselves
+    #
+    # open() hands back MappedArtifact objects that can go straight into
+    # parse_artifacts. With max_bytes set, the least recently used objects (and the
+    # urls pointing at them) are evicted whenever the store grows past it. Opening
+    # an artifact only records its last use in memory - open_artifacts() and flush()
+    # write it to the index, as does anything that changes the store.
+    def __init__(self, root, max_bytes=None):
+        self.root = os.fspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        self._index_path = os.path.join(self.root, INDEX_FILENAME)
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        self._urls = index.get("urls", {})
+        self._objects = index.get("objects", {})
+        # Whether there are last uses the index on disk doesn't have yet
+        self._unsaved = False
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def _save(self):
+        # Write then rename so a crash never leaves a half written index
+        descriptor, path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as f:
+            json.dump({"urls": self._urls, "objects": self._objects}, f)
+        os.replace(path, self._index_path)
+        self._unsaved = False
+
+    def __contains__(self, url):
+        return url in self._urls
+
+    def __len__(self):
+        return len(self._urls)
+
+    def urls(self):
+        return list(self._urls)
+
+    def digest(self, url):
+        # The sha256 hex digest stored for url, or None
+        entry = self._urls.get(url)
+        return entry["sha256"] if entry else None
+
+    def validators(self, url):
+        # {field: value} of whichever VALIDATOR_FIELDS were recorded for url
+        entry = self._urls.get(url, {})
+        return {field: entry[field] for field in VALIDATOR_FIELDS if field in entry}
+
+    def update_validators(self, url, validators):
+        # Records fresh validators for content that hasn't changed, e.g. from a 304
+        with self._lock:
+            entry = self._urls[url]
+            entry.update(
+                (field, value)
+                for field, value in validators.items()
+                if field in VALIDATOR_FIELDS and value is not None
+            )
+            self._save()
+
+    def path(self, url):
+        # Where url's content lives on disk, e.g. for handing to ParallelRun -
+        # KeyError if it isn't stored
+        return self._object_path(self._urls[url]["sha256"])
+
+    def size(self):
+        # Total bytes of every stored object
+        return sum(entry["size"] for entry in self._objects.values())
+
+    def put(self, url, source, validators=None):
+        # Stores bytes or the rest of a binary file-like object under url and
+        # returns its digest. Content that's already stored isn't written again.
+        # validators replaces the HTTP validators recorded for url; without them,
+        # the old ones are only kept if the content is the same.
+        hasher = hashlib.sha256()
+        size = 0
+        descriptor, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                if isinstance(source, (bytes, bytearray, memoryview)):
+                    chunks = (source,)
+                else:
+                    chunks = iter(lambda: source.read(COPY_CHUNK_SIZE), b"")
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+
+            with self._lock:
+                path = self._object_path(digest)
+                if digest in self._objects and os.path.exists(path):
+                    os.remove(temp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temp_path, path)
+                    self._objects[digest] = {"size": size, "last_used": time.time()}
+
+                previous = self._urls.get(url)
+                if previous and previous["sha256"] == digest and validators is None:
+                    entry = dict(previous)
+                else:
+                    entry = {
+                        field: value
+                        for field, value in (previous or {}).items()
+                        if field not in VALIDATOR_FIELDS
+                    }
+                    entry.update(
+                        (field, value)
+                        for field, value in (validators or {}).items()
+                        if field in VALIDATOR_FIELDS and value is not None
+                    )
+                entry["sha256"] = digest
+                self._urls[url] = entry
+                self._objects[digest]["last_used"] = time.time()
+                if previous and previous["sha256"] != digest:
+                    self._drop_if_unreferenced(previous["sha256"])
+                self._evict(keep=digest)
+                self._save()
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest
+
+    def open(self, url):
+        # Read-only memory mapped file for url - KeyError if it isn't stored
+        with self._lock:
+            digest = self._urls[url]["sha256"]
+            self._objects[digest]["last_used"] = time.time()
+            self._unsaved = True
+        return MappedArtifact(self._object_path(digest))
+
+    def open_artifacts(self, urls):
+        # {url: MappedArtifact} for every url that's stored, ready for
+        # parse_artifacts. The index is written once for the lot.
+        artifacts = {url: self.open(url) for url in urls if url in self._urls}
+        self.flush()
+        return artifacts
+
+    def flush(self):
+        # Writes the last uses recorded by open() to the index, if there are any
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def remove(self, url):
+        with self._lock:
+            entry = self._urls.pop(url)
+            self._drop_if_unreferenced(entry["sha256"])
+            self._save()
+
+    def _drop_if_unreferenced(self, digest):
+        if any(entry["sha256"] == digest for entry in self._urls.values()):
+            return
+        self._delete_object(digest)
+
+    def _delete_object(self, digest):
+        self._objects.pop(digest, None)
+        try:
+            # Already open maps stay readable on POSIX after the unlink
+            os.remove(self._object_path(digest))
+        except OSError:
+            # Missing, or still mapped on Windows - either way it's out of the index
+            pass
+
+    def _evict(self, keep):
+        # keep is the object just stored - it stays even if it's bigger than
+        # max_bytes on its own
+        if self.max_bytes is None:
+            return
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        for digest in sorted(
+            self._objects, key=lambda d: self._objects[d]["last_used"]
+        ):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            total -= self._objects[digest]["size"]
+            self._delete_object(digest)
+            for url in [u for u, e in self._urls.items() if e["sha256"] == digest]:
+                del self._urls[url]
@@ -0,0 +1,357 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+import http.client
+import threading
+import time
+
+# Some institutions refuse anything that doesn't look like a browser
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    # Artifacts go to disk exactly as served
+    "Accept-Encoding": "identity",
+    "Connection": "keep-alive",
+}
+
+DEFAULT_MAX_PER_HOST = 4
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TIMEOUT = 60
+MAX_REDIRECTS = 5
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Failures that mean a kept-alive connection was closed by the server while idle -
+# worth one retry on a fresh connection
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class DownloadResult:
+    # unchanged is set when the stored copy was already current - either the server
+    # answered a conditional request with 304, or it sent the same content again
+    __slots__ = ("url", "digest", "size", "status", "error", "elapsed", "unchanged")
+
+    def __init__(
+        self,
+        url,
+        digest=None,
+        size=0,
+        status=None,
+        error=None,
+        elapsed=0.0,
+        unchanged=False,
+    ):
+        self.url = url
+        self.digest = digest
+        self.size = size
+        self.status = status
+        self.error = error
+        self.elapsed = elapsed
+        self.unchanged = unchanged
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.error:
+            return f"DownloadResult({self.url!r}, error={self.error!r})"
+        if self.unchanged:
+            return f"DownloadResult({self.url!r}, status={self.status}, unchanged)"
+        return f"DownloadResult({self.url!r}, status={self.status}, size={self.size})"
+
+
+def response_validators(response):
+    # The VALIDATOR_FIELDS an ArtifactStore records, from a response's headers
+    content_length = response.getheader("Content-Length")
+    return {
+        "etag": response.getheader("ETag"),
+        "last_modified": response.getheader("Last-Modified"),
+        "content_length": int(content_length) if content_length else None,
+    }
+
+
+def conditional_headers(validators):
+    # Request headers that let the server answer 304 if nothing has changed
+    headers = {}
+    if "etag" in validators:
+        headers["If-None-Match"] = validators["etag"]
+    if "last_modified" in validators:
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+class _SizedReader:
+    # Counts what store.put pulls through from the response
+    def __init__(self, response):
+        self.response = response
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.response.read(size)
+        self.size += len(data)
+        return data
+
+
+class HostPool:
+    # Idle keep-alive connections to one scheme://host:port, with a semaphore
+    # capping how many requests run against it at once
+    def __init__(self, scheme, host, port, max_connections, timeout):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self._idle = []
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connect(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        # Returns (connection, reused)
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.connections_opened += 1
+        return self._connect(), False
+
+    def request(self, method, target, headers):
+        # Sends one request, retrying once if a reused connection turns out to have
+        # been closed by the server. Returns (connection, response) - the
+        # connection goes back through release() once the response has been dealt
+        # with.
+        for attempt in range(2):
+            connection, reused = self.acquire()
+            try:
+                connection.request(method, target, headers=headers)
+                return connection, connection.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                connection.close()
+                if not reused or attempt:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+
+    def release(self, connection, reusable):
+        if reusable:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class HostPools:
+    # A HostPool per scheme://host:port, made on first use
+    def __init__(self, max_per_host, timeout):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported url scheme in {url}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = HostPool(
+                    parts.scheme, parts.hostname, port, self.max_per_host, self.timeout
+                )
+            return pool
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+def request_target(url):
+    # The path and query http.client sends for url
+    parts = urlsplit(url)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    return target
+
+
+class Downloader:
+    # Fetches artifacts into an ArtifactStore over pooled keep-alive connections.
+    # Requests run on a thread pool of max_workers, with at most max_per_host in
+    # flight against any one host, and responses are streamed straight into the
+    # store so nothing is held in memory.
+    #
+    # Urls already in the store are revalidated with If-None-Match and
+    # If-Modified-Since using the ETag and Last-Modified recorded when they were
+    # fetched, so artifacts that haven't changed cost a 304 rather than a download
+    # and come back with result.unchanged set.
+    #
+    #   with Downloader(store) as downloader:
+    #       results = downloader.download(parser.artifact_urls)
+    def __init__(
+        self,
+        store,
+        max_per_host=DEFAULT_MAX_PER_HOST,
+        max_workers=DEFAULT_MAX_WORKERS,
+        headers=None,
+        timeout=DEFAULT_TIMEOUT,
+        max_redirects=MAX_REDIRECTS,
+        revalidate=True,
+    ):
+        self.store = store
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self.headers = dict(BROWSER_HEADERS if headers is None else headers)
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.revalidate = revalidate
+        self.pools = HostPools(max_per_host, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.pools.close()
+
+    def pool(self, url):
+        return self.pools.pool(url)
+
+    def _store_response(self, url, response):
+        # Hook for subclasses that want to look at the response first
+        reader = _SizedReader(response)
+        digest = self.store.put(url, reader, response_validators(response))
+        return digest, reader.size
+
+    def fetch(self, url, headers=None):
+        # Downloads one url into the store under its original url, following
+        # redirects. Errors come back on the result rather than being raised.
+        start = time.perf_counter()
+        request_headers = dict(self.headers)
+        previous = self.store.digest(url)
+        if self.revalidate and previous:
+            request_headers.update(conditional_headers(self.store.validators(url)))
+        if headers:
+            request_headers.update(headers)
+        target_url = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                pool = self.pool(target_url)
+                with pool.slots:
+                    connection, response = pool.request(
+                        "GET", request_target(target_url), request_headers
+                    )
+                    reusable = False
+                    try:
+                        if response.status in REDIRECT_STATUSES:
+                            location = response.getheader("Location")
+                            response.read()
+                            reusable = not response.will_close
+                            if not location:
+                                return DownloadResult(
+                                    url,
+                                    status=response.status,
+                                    error=f"HTTP {response.status} without a Location",
+                                    elapsed=time.perf_counter() - start,
+                                )
+                            target_url = urljoin(target_url, location)
+                            continue
+
+                        result = self._handle_response(url, response, previous, start)
+                        reusable = not response.will_close and response.isclosed()
+                        return result
+                    finally:
+                        pool.release(connection, reusable)
+
+            return DownloadResult(
+                url,
+                error=f"More than {self.max_redirects} redirects",
+                elapsed=time.perf_counter() - start,
+            )
+        except (OSError, http.client.HTTPException, ValueError) as ex:
+            return DownloadResult(
+                url,
+                error=f"{type(ex).__name__}: {ex}",
+                elapsed=time.perf_counter() - start,
+            )
+
+    def _handle_response(self, url, response, previous, start):
+        if response.status == 304 and previous:
+            response.read()
+            self.store.update_validators(url, response_validators(response))
+            return DownloadResult(
+                url,
+                digest=previous,
+                status=response.status,
+                elapsed=time.perf_counter() - start,
+                unchanged=True,
+            )
+        if response.status != 200:
+            response.read()
+            return DownloadResult(
+                url,
+                status=response.status,
+                error=f"HTTP {response.status} {response.reason}",
+                elapsed=time.perf_counter() - start,
+            )
+        digest, size = self._store_response(url, response)
+        return DownloadResult(
+            url,
+            digest=digest,
+            size=size,
+            status=response.status,
+            elapsed=time.perf_counter() - start,
+            unchanged=digest == previous,
+        )
+
+    def iter_download(self, urls):
+        # Yields a DownloadResult per url as each one finishes
+        urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch, url) for url in urls]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def download(self, urls):
+        # {url: DownloadResult} in the order the urls were given. urls is only read
+        # once, so any iterable will do.
+        urls = list(dict.fromkeys(urls))
+        results = {result.url: result for result in self.iter_download(urls)}
+        return {url: results[url] for url in urls}
+
+
+def changed_urls(results):
+    # The urls from download() whose content is new, for the rest of the pipeline
+    # to reparse
+    return [
+        url for url, result in results.items() if result.ok and not result.unchanged
+    ]
+
+
+def download_artifacts(parser, store, **kwargs):
+    # Fetches (or revalidates) every artifact a parser needs into store
+    with Downloader(store, **kwargs) as downloader:
+        return downloader.download(parser.artifact_urls)
@@ -0,0 +1,423 @@
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
+import io
+import mmap
+import multiprocessing
+import os
+import traceback
+
+from .parsers import ChargeMasterEntry, ChargeMasterParser
+from .parsers.csv_ranges import DEFAULT_RANGE_SIZE, record_ranges
+
+# Entries are shipped back from the workers in lists of this many tuples - large
+# enough to amortise pickling and queue overhead, small enough to stream
+DEFAULT_CHUNK_SIZE = 4096
+
+# How often the parent looks for workers that died without reporting back
+POLL_INTERVAL = 0.1
+
+# With ordered output, jobs are only started this many per worker ahead of the
+# one being yielded - everything they send has to wait in the parent until it's
+# their turn
+JOBS_AHEAD_PER_WORKER = 2
+
+_ENTRIES = 0
+_DONE = 1
+
+# Set in each worker process by _initialize_worker
+_queue = None
+_cancel = None
+
+
+class InstitutionFailure:
+    # Why an institution didn't finish. The original exception may not survive
+    # pickling, so only its type name, message and formatted traceback come back.
+    __slots__ = ("institution", "error", "message", "traceback")
+
+    def __init__(self, institution, error, message, traceback):
+        self.institution = institution
+        self.error = error
+        self.message = message
+        self.traceback = traceback
+
+    def __repr__(self):
+        return f"InstitutionFailure({self.institution!r}, {self.error}: {self.message})"
+
+
+def _failure(institution, exception):
+    return InstitutionFailure(
+        institution,
+        type(exception).__name__,
+        str(exception),
+        "".join(
+            traceback.format_exception(
+                type(exception), exception, exception.__traceback__
+            )
+        ),
+    )
+
+
+def _open_artifact(artifact):
+    # Artifacts cross the process boundary as a path or the raw bytes
+    if isinstance(artifact, (bytes, bytearray, memoryview)):
+        return io.BytesIO(artifact)
+    return open(artifact, "rb")
+
+
+def _transportable(artifact):
+    # What to send a worker for an artifact given as an open file - the path it was
+    # opened from where there is one, otherwise its bytes
+    if isinstance(artifact, (bytes, bytearray)):
+        return artifact
+    if isinstance(artifact, memoryview):
+        return artifact.tobytes()
+    if isinstance(artifact, (str, os.PathLike)):
+        return os.fspath(artifact)
+    name = getattr(artifact, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    getbuffer = getattr(artifact, "getbuffer", None)
+    if getbuffer is not None:
+        return bytes(getbuffer())
+    return artifact.read()
+
+
+def _initialize_worker(queue, cancel):
+    global _queue, _cancel
+    _queue = queue
+    _cancel = cancel
+    # Anything still buffered when the pool shuts down was for a cancelled run
+    queue.cancel_join_thread()
+
+
+def _send_entries(key, entries, chunk_size):
+    # Streams entries to the parent as chunks of tuples, stopping early if the run
+    # has been cancelled
+    chunk = []
+    for entry in entries:
+        chunk.append(entry.to_tuple())
+        if len(chunk) == chunk_size:
+            if _cancel.is_set():
+                return
+            _queue.put((_ENTRIES, key, chunk))
+            chunk = []
+    if chunk:
+        _queue.put((_ENTRIES, key, chunk))
+
+
+def _parse_institution(institution, artifacts, chunk_size):
+    files = {}
+    try:
+        parser = ChargeMasterParser.build(institution)
+        for url, artifact in artifacts.items():
+            files[url] = _open_artifact(artifact)
+        _send_entries(institution, parser.parse_artifacts(files), chunk_size)
+    except Exception as ex:
+        _queue.put((_DONE, institution, _failure(institution, ex)))
+    else:
+        _queue.put((_DONE, institution, None))
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def _parse_work_unit(url, parser_class, options, artifact, chunk_size):
+    f = None
+    try:
+        f = _open_artifact(artifact)
+        parser = parser_class(**options)
+        _send_entries(url, parser.parse_artifact(url, f), chunk_size)
+    except Exception as ex:
+        _queue.put((_DONE, url, _failure(url, ex)))
+    else:
+        _queue.put((_DONE, url, None))
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _open_range(source):
+    # A byte range arrives as the header and its records already joined, or as
+    # (path, header_end, start, end) for the worker to read itself
+    if not isinstance(source, tuple):
+        return io.BytesIO(source)
+    path, header_end, start, end = source
+    with open(path, "rb") as f:
+        header = f.read(header_end)
+        f.seek(start)
+        return io.BytesIO(header + f.read(end - start))
+
+
+def _parse_byte_range(key, parser_class, options, source, chunk_size):
+    f = None
+    try:
+        f = _open_range(source)
+        parser = parser_class(**options)
+        _send_entries(key, parser.parse_artifact(key[0], f), chunk_size)
+    except Exception as ex:
+        _queue.put((_DONE, key, _failure(key[0], ex)))
+    else:
+        _queue.put((_DONE, key, None))
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _run_jobs(jobs, max_workers, ordered, window=None):
+    # Runs {key: (function, args)} on a process pool, where each function(key,
+    # *args) reports back over the queue with any number of (_ENTRIES, key, chunk)
+    # messages and then (_DONE, key, failure or None). Yields those messages - with
+    # ordered set, every message for one key before any for the next, in jobs
+    # order. Ordered jobs are started no more than window (by default
+    # JOBS_AHEAD_PER_WORKER per worker) ahead of the one being yielded, which bounds
+    # how much output is held back.
+    if window is None:
+        window = JOBS_AHEAD_PER_WORKER * max_workers
+    window = max(window, 1)
+    context = multiprocessing.get_context()
+    queue = context.Queue()
+    cancel = context.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=context,
+        initializer=_initialize_worker,
+        initargs=(queue, cancel),
+    )
+    try:
+        order = list(jobs)
+        futures = {}
+        submitted = 0
+
+        def submit(limit):
+            nonlocal submitted
+            while submitted < min(limit, len(order)):
+                key = order[submitted]
+                function, args = jobs[key]
+                futures[executor.submit(function, key, *args)] = key
+                submitted += 1
+
+        pending = set(jobs)
+        buffers = {key: [] for key in order}
+        head = 0
+        submit(window if ordered else len(order))
+
+        while pending:
+            try:
+                messages = [queue.get(timeout=POLL_INTERVAL)]
+            except Empty:
+                # Workers report their own exceptions - this only catches ones that
+                # died outright and took the pool down with them
+                messages = []
+                for future, key in futures.items():
+                    if key in pending and future.done():
+                        exception = future.exception()
+                        if exception is not None:
+                            messages.append((_DONE, key, _failure(key, exception)))
+
+            for message in messages:
+                kind, key, _ = message
+                if kind == _DONE:
+                    pending.discard(key)
+                if not ordered or key == order[head]:
+                    yield message
+                else:
+                    buffers[key].append(message)
+
+            # Once the job at the head of the order is finished, everything buffered
+            # for the next one can go out, it becomes the head and the window moves
+            # along to let another job start
+            while ordered and head < len(order) and order[head] not in pending:
+                del buffers[order[head]]
+                head += 1
+                submit(head + window)
+                if head < len(order):
+                    messages = buffers[order[head]]
+                    buffers[order[head]] = []
+                    yield from messages
+    finally:
+        cancel.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        queue.close()
+
+
+def _values(*values):
+    return values
+
+
+class ParallelRun:
+    # Parses several institutions at once, one per worker process, and streams
+    # (institution, ChargeMasterEntry) pairs back as they're produced.
+    #
+    # jobs maps institution names (anything ChargeMasterParser.build accepts) to
+    # their artifacts as {url: path or bytes} - open files can't be sent to another
+    # process. With ordered=True the output is exactly what running each
+    # institution in turn, in jobs order, would produce; otherwise chunks are
+    # yielded in whatever order they finish.
+    #
+    # An institution that raises doesn't stop the others. It's recorded in
+    # failures once iteration finishes, and any entries it produced before failing
+    # are still yielded. entry_counts holds how many entries each institution sent.
+    #
+    # Ordered runs only start an institution once it can go straight to a worker,
+    # so at most max_workers - 1 finished institutions' output waits in the parent
+    # behind a slow one.
+    #
+    # Rebuilding entries costs the parent a few microseconds each, which becomes
+    # the bottleneck with enough workers. Consumers that only write rows out can
+    # pass as_tuples=True to get ChargeMasterEntry.to_tuple() values instead.
+    def __init__(
+        self,
+        jobs,
+        max_workers=None,
+        ordered=False,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        as_tuples=False,
+    ):
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        self.jobs = dict(jobs)
+        self.max_workers = max_workers or min(len(self.jobs), os.cpu_count() or 1)
+        self.ordered = ordered
+        self.chunk_size = chunk_size
+        self.as_tuples = as_tuples
+        self.failures = {}
+        self.entry_counts = {}
+
+    def __iter__(self):
+        if not self.jobs:
+            return
+        if self.as_tuples:
+            convert = _values
+        else:
+            convert = ChargeMasterEntry.builder(*ChargeMasterEntry.__slots__)
+
+        jobs = {
+            institution: (_parse_institution, (artifacts, self.chunk_size))
+            for institution, artifacts in self.jobs.items()
+        }
+        counts = self.entry_counts
+        for kind, institution, payload in _run_jobs(
+            jobs, self.max_workers, self.ordered, self.max_workers
+        ):
+            if kind == _ENTRIES:
+                counts[institution] = counts.get(institution, 0) + len(payload)
+                for values in payload:
+                    yield institution, convert(*values)
+            else:
+                counts.setdefault(institution, 0)
+                if payload is not None:
+                    self.failures[institution] = payload
+
+
+class ArtifactParseError(Exception):
+    # Raised by parse_artifacts_parallel when a work unit fails in its worker. The
+    # original exception may not survive pickling, so this carries its type name,
+    # message and formatted traceback instead.
+    def __init__(self, url, failure):
+        super().__init__(
+            f"Parsing {url} failed with {failure.error}: {failure.message}\n"
+            f"{failure.traceback}"
+        )
+        self.url = url
+        self.error = failure.error
+        self.message = failure.message
+        self.traceback = failure.traceback
+
+
+def parse_work_units(
+    parser,
+    artifacts,
+    max_workers=None,
+    ordered=True,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    # See ChargeMasterParser.parse_artifacts_parallel
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    # Workers read workbooks through the same row cache, if there is one. Entries
+    # are built here, so the string pool stays behind.
+    options = {}
+    if parser.row_cache is not None:
+        options["row_cache"] = parser.row_cache
+    jobs = {
+        url: (
+            _parse_work_unit,
+            (type(parser), options, _transportable(artifact), chunk_size),
+        )
+        for url, artifact in parser.work_units(artifacts)
+    }
+    if not jobs:
+        return
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    # Built in the parent so the parser's string pool and instrumentation apply
+    build = parser.entry_builder(*ChargeMasterEntry.__slots__)
+    for kind, url, payload in _run_jobs(jobs, max_workers, ordered):
+        if kind == _ENTRIES:
+            for values in payload:
+                yield build(*values)
+        elif payload is not None:
+            raise ArtifactParseError(url, payload)
+
+
+def _range_sources(artifact, range_size, delimiter):
+    # What to send a worker for each byte range of a CSV artifact - see _open_range
+    artifact = _transportable(artifact)
+    if isinstance(artifact, str):
+        with open(artifact, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                header_end, ranges = record_ranges(data, range_size, delimiter)
+        return [(artifact, header_end, start, end) for start, end in ranges]
+    header_end, ranges = record_ranges(artifact, range_size, delimiter)
+    header = artifact[:header_end]
+    return [header + artifact[start:end] for start, end in ranges]
+
+
+def parse_byte_ranges(
+    parser,
+    artifacts,
+    max_workers=None,
+    range_size=DEFAULT_RANGE_SIZE,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    delimiter=b",",
+):
+    # Like parse_work_units, but each CSV work unit is split into byte ranges of
+    # whole records that are parsed on their own, with the header in front, by
+    # parser.parse_artifact. Yields (url, entry) pairs in file order. Whatever a
+    # parser only does once per file - like skipping repeats - happens once per
+    # range instead, and it's up to the caller to finish it off.
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    options = {}
+    if parser.row_cache is not None:
+        options["row_cache"] = parser.row_cache
+    jobs = {}
+    for url, artifact in parser.work_units(artifacts):
+        for index, source in enumerate(_range_sources(artifact, range_size, delimiter)):
+            jobs[url, index] = (
+                _parse_byte_range,
+                (type(parser), options, source, chunk_size),
+            )
+    if not jobs:
+        return
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    build = parser.entry_builder(*ChargeMasterEntry.__slots__)
+    for kind, (url, _), payload in _run_jobs(jobs, max_workers, True):
+        if kind == _ENTRIES:
+            for values in payload:
+                yield url, build(*values)
+        elif payload is not None:
+            raise ArtifactParseError(url, payload)
+
+
+def parse_institutions(
+    jobs,
+    max_workers=None,
+    ordered=False,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    as_tuples=False,
+):
+    # Convenience wrapper - returns the ParallelRun so failures can be inspected
+    # after iterating it
+    return ParallelRun(jobs, max_workers, ordered, chunk_size, as_tuples)
@@ -0,0 +1,185 @@
+import hashlib
+import marshal
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from .artifacts import content_digest
+from .parsers import ChargeMasterEntry
+
+# Entries per compressed record in a cache file
+BATCH_SIZE = 4096
+
+COMPRESSION_LEVEL = 1
+
+# Part of every key - bump it whenever the file layout below changes
+FORMAT_VERSION = 1
+
+CACHE_SUFFIX = ".parsed"
+
+_RECORD_LENGTH = struct.Struct("<I")
+
+
+def _touch(path):
+    # Explicit nanosecond times - filesystem clocks can be too coarse to order
+    # files written in quick succession
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+class ParseCache:
+    # Saves each artifact's parsed output on disk and replays it instead of parsing
+    # again when the same parser version sees the same content. Entries are stored
+    # as to_tuple() rows, BATCH_SIZE at a time, each batch marshalled and zlib
+    # compressed behind a 4 byte length:
+    #
+    #   root/<key>.parsed
+    #
+    # where key hashes the parser class, its PARSER_VERSION, the artifact url
+    # (several parsers take the location from it) and the sha256 of the content.
+    # With max_bytes set, the least recently replayed files are evicted whenever the
+    # cache grows past it.
+    #
+    #   cache = ParseCache("parsed", max_bytes=2**30)
+    #   digests = {url: store.digest(url) for url in artifacts}
+    #   for entry in cache.parse_artifacts(parser, artifacts, digests):
+    #       ...
+    def __init__(self, root, max_bytes=None):
+        self.root = os.fspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, parser, url, digest):
+        parser_class = type(parser)
+        identity = "\0".join(
+            (
+                str(FORMAT_VERSION),
+                f"{parser_class.__module__}.{parser_class.__qualname__}",
+                str(parser_class.PARSER_VERSION),
+                url,
+                digest,
+            )
+        )
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + CACHE_SUFFIX)
+
+    def _cache_files(self):
+        # (last used, size, path) for every cache file
+        files = []
+        for name in os.listdir(self.root):
+            if name.endswith(CACHE_SUFFIX):
+                path = os.path.join(self.root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+        return files
+
+    def size(self):
+        return sum(size for _, size, _ in self._cache_files())
+
+    def parse_artifacts(self, parser, artifacts, digests=None):
+        # Same entries as parser.parse_artifacts(artifacts) - the artifacts it
+        # would parse, in the order it would parse them. digests maps urls to
+        # content hashes that are already known, e.g. from ArtifactStore.digest -
+        # anything missing is hashed here.
+        for url, artifact in parser.work_units(artifacts):
+            digest = digests.get(url) if digests else None
+            yield from self.parse_artifact(parser, url, artifact, digest)
+
+    def parse_artifact(self, parser, url, artifact, digest=None):
+        if digest is None:
+            digest = content_digest(artifact)
+        path = self._path(self.key(parser, url, digest))
+        try:
+            cached = open(path, "rb")
+        except FileNotFoundError:
+            self.misses += 1
+            yield from self._parse_and_save(parser, url, artifact, path)
+            return
+
+        self.hits += 1
+        with cached:
+            # Mark it as recently used for eviction
+            _touch(path)
+            build = parser.entry_builder(*ChargeMasterEntry.__slots__)
+            read = cached.read
+            while True:
+                header = read(_RECORD_LENGTH.size)
+                if not header:
+                    break
+                (length,) = _RECORD_LENGTH.unpack(header)
+                for values in marshal.loads(zlib.decompress(read(length))):
+                    yield build(*values)
+
+    def _parse_and_save(self, parser, url, artifact, path):
+        # Yields the parser's entries while writing them to a temporary file, which
+        # only takes path's place once the artifact has been parsed to the end
+        descriptor, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        saved = False
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                cacheable = True
+                batch = []
+                for entry in parser.parse_artifact(url, artifact):
+                    if cacheable:
+                        batch.append(entry.to_tuple())
+                        if len(batch) == BATCH_SIZE:
+                            cacheable = self._write_batch(f, batch)
+                            batch = []
+                    yield entry
+                if cacheable and batch:
+                    cacheable = self._write_batch(f, batch)
+
+            if cacheable:
+                os.replace(temp_path, path)
+                saved = True
+                _touch(path)
+                self._evict(keep=path)
+        finally:
+            if not saved:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def _write_batch(self, f, batch):
+        try:
+            data = marshal.dumps(batch)
+        except ValueError:
+            # A value marshal can't store (say a datetime from a workbook) - the
+            # artifact is parsed every time instead
+            return False
+        data = zlib.compress(data, COMPRESSION_LEVEL)
+        f.write(_RECORD_LENGTH.pack(len(data)))
+        f.write(data)
+        return True
+
+    def _evict(self, keep):
+        # keep is the file just saved - it stays even if it's bigger than max_bytes
+        # on its own
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            files = self._cache_files()
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Gone already, or being replayed on Windows
+                    continue
+                total -= size
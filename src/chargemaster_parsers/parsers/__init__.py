@@ -1,15 +1,54 @@
-from .parsers import ChargeMasterParser, ChargeMasterEntry
-
-# Import the implementations - they will register themselves
-from .kaiser import KaiserChargeMasterParser
-from .cedars_sinai import CedarsSinaiChargeMasterParser
-from .rady import RadyChargeMasterParser
-from .scripps import ScrippsChargeMasterParser
-from .sharp import SharpChargeMasterParser
-from .ucsd import UCSDChargeMasterParser
-from .stanford import StanfordChargeMasterParser
-from .uci import UCIChargeMasterParser
-from .southwest import SouthwestChargeMasterParser
-from .palomar import PalomarChargeMasterParser
-from .tricity import TriCityChargeMasterParser
-from .lluh import LLUHChargeMasterParser
+from .parsers import (
+    ChargeMasterParser,
+    ChargeMasterEntry,
+    ParserRegistry,
+    StringPool,
+    StringPoolStats,
+)
+from .columnar import ChargeMasterBatch, DictionaryColumn
+from .dedup import (
+    DedupLimitError,
+    DedupStats,
+    ExactDedup,
+    FingerprintDedup,
+    GroupedDedup,
+)
+from .instrumentation import ArtifactMetrics, ParserMetrics
+
+# The implementations are registered lazily - each module (and its dependencies,
+# e.g. openpyxl) is only imported the first time its parser is built or the class
+# is accessed from this package
+_BUILTIN_PARSERS = {
+    "KaiserChargeMasterParser": ("Kaiser", "kaiser"),
+    "CedarsSinaiChargeMasterParser": ("Cedars-Sinai", "cedars_sinai"),
+    "RadyChargeMasterParser": ("Rady", "rady"),
+    "ScrippsChargeMasterParser": ("Scripps", "scripps"),
+    "SharpChargeMasterParser": ("Sharp", "sharp"),
+    "UCSDChargeMasterParser": ("UCSD", "ucsd"),
+    "StanfordChargeMasterParser": ("Stanford", "stanford"),
+    "UCIChargeMasterParser": ("UCI", "uci"),
+    "SouthwestChargeMasterParser": ("Southwest", "southwest"),
+    "PalomarChargeMasterParser": ("Palomar", "palomar"),
+    "TriCityChargeMasterParser": ("Tri-City", "tricity"),
+    "LLUHChargeMasterParser": ("LLUH", "lluh"),
+}
+
+for _class_name, (_institution, _module) in _BUILTIN_PARSERS.items():
+    ChargeMasterParser.registered_parsers.register(
+        _institution, f"{__name__}.{_module}:{_class_name}"
+    )
+del _class_name, _institution, _module
+
+
+def __getattr__(name):
+    try:
+        institution, _ = _BUILTIN_PARSERS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    parser_class = ChargeMasterParser.registered_parsers[institution]
+    globals()[name] = parser_class
+    return parser_class
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_BUILTIN_PARSERS))
@@ -1,5 +1,5 @@
+from .codes import CPT, classify_cpt_hcpcs
 from .parsers import ChargeMasterEntry, ChargeMasterParser
-import openpyxl
 
 
 class CedarsSinaiChargeMasterParser(ChargeMasterParser):
@@ -7,22 +7,28 @@ class CedarsSinaiChargeMasterParser(ChargeMasterParser):
     ARTIFACT_URL = "https://www.cedars-sinai.org/content/dam/cedars-sinai/billing-insurance/documents/cedars-sinai-changemaster-july-2022.xlsx"
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
+    def work_units(self, artifacts):
+        # Every artifact given is parsed, whatever its url
+        return list(artifacts.items())
+
     def parse_artifacts(self, artifacts):
+        make_entry = self.entry_builder()
+
         for artifact_url, artifact in artifacts.items():
-            wb = openpyxl.load_workbook(artifact)
+            artifact = self.track_artifact(artifact_url, artifact)
             charge_code_column = None
             charge_code_description_column = None
             cpt_hcpcs_code_column = None
             op_charge_column = None
             ip_charge_column = None
 
-            for row in wb.worksheets[0].iter_rows(min_row=5):
+            for row in self.xlsx_rows(artifact, min_row=5, max_col=5):
                 values = []
-                for cell in row[:5]:
-                    if type(cell.value) in (int, float):
-                        values.append(cell.value)
-                    elif cell.value:
-                        values.append(cell.value.strip())
+                for value in row:
+                    if type(value) in (int, float):
+                        values.append(value)
+                    elif value:
+                        values.append(value.strip())
                     else:
                         values.append(None)
                 if (
@@ -50,10 +56,9 @@ class CedarsSinaiChargeMasterParser(ChargeMasterParser):
                     charge_code = values[charge_code_column]
                     charge_code_desc = values[charge_code_description_column]
                     charge = values[op_charge_column]
-                    if charge is not None:
-                        charge = float(str(charge).replace("$", "").replace(",", ""))
+                    charge = self.parse_price(charge)
 
-                    yield ChargeMasterEntry(
+                    yield make_entry(
                         location="all",
                         procedure_identifier=charge_code,
                         procedure_description=charge_code_desc,
@@ -65,25 +70,18 @@ class CedarsSinaiChargeMasterParser(ChargeMasterParser):
                     cpt_code = None
                     hcpcs_code = None
                     if cpt_hcps_code != None:
-                        if (
-                            isinstance(cpt_hcps_code, int)
-                            and len(str(cpt_hcps_code)) == 5
-                        ):
+                        # Numeric codes come through from the sheet as ints - classify
+                        # the text but keep the value as it was
+                        code_type, _ = classify_cpt_hcpcs(str(cpt_hcps_code))
+                        if code_type == CPT:
                             cpt_code = cpt_hcps_code
                         else:
-                            if len(cpt_hcps_code) == 5 and cpt_hcps_code[0].isnumeric():
-                                cpt_code = cpt_hcps_code
-                            else:
-                                hcpcs_code = cpt_hcps_code
+                            hcpcs_code = cpt_hcps_code
 
                         if values[ip_charge_column] != None:
-                            charge = values[ip_charge_column]
-                            if charge is not None:
-                                charge = float(
-                                    str(charge).replace("$", "").replace(",", "")
-                                )
+                            charge = self.parse_price(values[ip_charge_column])
 
-                        yield ChargeMasterEntry(
+                        yield make_entry(
                             location="all",
                             procedure_identifier=charge_code,
                             procedure_description=charge_code_desc,
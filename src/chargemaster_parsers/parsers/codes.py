@@ -0,0 +1,72 @@
+from functools import lru_cache
+import re
+
+# Code types returned by the classifiers
+CPT = "CPT"
+HCPCS = "HCPCS"
+MS_DRG = "MS-DRG"
+NDC = "NDC"
+
+# The same few thousand codes recur across millions of rows, so every classifier is
+# memoized on the raw string. Bounded so a file full of junk can't grow it forever.
+CODE_CACHE_SIZE = 65536
+
+NDC_REGEX = re.compile(r"^(\d{4}-\d{4}-\d{2}|\d{5}-(?:\d{3}-\d{2}|\d{4}-\d{1,2}))")
+NUBC_REV_CODE_REGEX = re.compile(r"^([0-9]{4})\s*-\s*")
+
+# Codes labelled with their type, e.g. "CPT® 76499", "HCPCS C1713" or
+# "MS-DRG V37 (FY 2020) 883". Some institutions mangle the ® into other characters
+# when re-encoding, so anything up to the code itself is accepted after "CPT".
+LABELLED_CODE_MATCHERS = (
+    (CPT, re.compile(r"^CPT.*?([0-9]{4}[0-9A-Za-z])\s*$")),
+    (HCPCS, re.compile(r"^HCPCS\s+(.+?)\s*$")),
+    (MS_DRG, re.compile(r"^MS-DRG\s+V[0-9]+\s+\(FY\s*[0-9]+\)\s+(.+?)\s*$")),
+)
+
+# Bare codes from a combined CPT/HCPCS column - CPT codes are four digits and a digit
+# or letter, anything else is treated as HCPCS
+BARE_CPT_REGEX = re.compile(r"^[0-9]{4}[0-9A-Za-z]$")
+
+
+@lru_cache(maxsize=CODE_CACHE_SIZE)
+def classify_code(raw):
+    # Returns (code type, normalized code) for a labelled code, or (None, None) if
+    # the string isn't one we recognize
+    if raw:
+        for code_type, matcher in LABELLED_CODE_MATCHERS:
+            match = matcher.match(raw)
+            if match:
+                return code_type, match.group(1).upper()
+    return None, None
+
+
+@lru_cache(maxsize=CODE_CACHE_SIZE)
+def classify_cpt_hcpcs(raw):
+    # Returns (CPT or HCPCS, code) for a value from a combined CPT/HCPCS column, or
+    # (None, None) if it's empty
+    if not raw:
+        return None, None
+    elif BARE_CPT_REGEX.match(raw):
+        return CPT, raw
+    else:
+        return HCPCS, raw
+
+
+@lru_cache(maxsize=CODE_CACHE_SIZE)
+def parse_ndc(raw):
+    # Returns the National Drug Code at the start of the string, if any
+    if raw:
+        match = NDC_REGEX.match(raw)
+        if match:
+            return match.group(1)
+    return None
+
+
+@lru_cache(maxsize=CODE_CACHE_SIZE)
+def parse_nubc_revenue_code(raw):
+    # Returns the four digit revenue code from strings like "0250 - PHARMACY"
+    if raw:
+        match = NUBC_REV_CODE_REGEX.match(raw)
+        if match:
+            return match.group(1)
+    return None
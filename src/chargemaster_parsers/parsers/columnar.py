@@ -0,0 +1,293 @@
+from array import array
+from operator import attrgetter
+
+from .parsers import ChargeMasterEntry
+
+DEFAULT_BATCH_SIZE = 65536
+
+# Slots that hold a dollar amount - stored as doubles with NaN standing in for None.
+# Anything else that isn't a number is an error rather than another NaN.
+PRICE_FIELDS = (
+    "expected_reimbursement",
+    "gross_charge",
+    "in_patient_price",
+    "max_reimbursement",
+    "min_reimbursement",
+)
+
+# Tri-state flags - stored as signed bytes with -1 standing in for None
+FLAG_FIELDS = ("in_patient",)
+
+NAN = float("nan")
+
+_get_values = attrgetter(*ChargeMasterEntry.__slots__)
+
+
+class DictionaryColumn:
+    # A column of repeated values stored as int32 indices into a dictionary of
+    # unique values. None is stored as index -1. The dictionary is shared by every
+    # batch of a run and only ever appended to, so indices stay valid across batches
+    # and can be compared directly when aggregating.
+    __slots__ = ("indices", "dictionary")
+
+    def __init__(self, indices, dictionary):
+        self.indices = indices
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        dictionary = self.dictionary
+        for index in self.indices:
+            yield None if index < 0 else dictionary[index]
+
+    def __getitem__(self, position):
+        index = self.indices[position]
+        return None if index < 0 else self.dictionary[index]
+
+
+class ChargeMasterBatch:
+    # A fixed-size slice of parser output stored column-wise - one column per slot in
+    # ChargeMasterEntry.__slots__. Price columns are array("d"), flag columns are
+    # array("b") and everything else is a DictionaryColumn.
+    __slots__ = ("length", "columns")
+
+    def __init__(self, length, columns):
+        self.length = length
+        self.columns = columns
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def to_pylist(self, field):
+        column = self.columns[field]
+        if field in PRICE_FIELDS:
+            return [None if value != value else value for value in column]
+        elif field in FLAG_FIELDS:
+            return [None if value < 0 else bool(value) for value in column]
+        else:
+            return list(column)
+
+    def entries(self):
+        # Materialise the rows again - mostly useful for testing and debugging since it
+        # defeats the point of the columnar layout
+        values = [self.to_pylist(field) for field in ChargeMasterEntry.__slots__]
+        for row in zip(*values):
+            yield ChargeMasterEntry.from_tuple(row)
+
+
+def _dictionary_key(value):
+    # Keep the type in the key so 1, 1.0 and True don't collapse into one value
+    try:
+        hash(value)
+        return (type(value), value)
+    except TypeError:
+        pass
+
+    if isinstance(value, dict):
+        try:
+            key = tuple(sorted(value.items()))
+            hash(key)
+            return (dict, key)
+        except TypeError:
+            pass
+
+    # Still unhashable - fall back on identity. The dictionary holds a reference so
+    # the id can't be recycled while the run is alive
+    return (object, id(value))
+
+
+def _not_a_price(field, value):
+    return ValueError(f"{field} must be a number or None, got {value!r}")
+
+
+def _price(value, field):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise _not_a_price(field, value) from None
+
+
+# What a builder from ColumnarEncoder.builder returns in place of an entry - the row
+# is already in the encoder's columns
+BUFFERED = object()
+
+
+class ColumnarEncoder:
+    # Packs rows into ChargeMasterBatch columns. Rows come either as finished
+    # entries through encode(), or straight from a parser through builder(), whose
+    # constructors write their arguments into the columns without building an entry
+    # at all. Both fill the same batch_size buffers, which start out as all missing
+    # values so only a row's non-None fields cost anything, and which are handed
+    # over as the batch once they're full.
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        self.batch_size = batch_size
+        self.dictionaries = {
+            field: []
+            for field in ChargeMasterEntry.__slots__
+            if field not in PRICE_FIELDS and field not in FLAG_FIELDS
+        }
+        self._lookups = {field: {} for field in self.dictionaries}
+        self._columns = self._new_columns()
+        self._length = 0
+        # Globals of the builder() constructors, which write to the columns by name
+        self._namespaces = []
+        self._builders = {}
+
+    def _new_columns(self):
+        columns = []
+        for field in ChargeMasterEntry.__slots__:
+            if field in PRICE_FIELDS:
+                columns.append(array("d", [NAN]) * self.batch_size)
+            elif field in FLAG_FIELDS:
+                columns.append(array("b", [-1]) * self.batch_size)
+            else:
+                columns.append(array("i", [-1]) * self.batch_size)
+        return columns
+
+    def _take_batch(self):
+        # The buffered rows as a batch, with fresh buffers in their place
+        length = self._length
+        columns = dict(zip(ChargeMasterEntry.__slots__, self._columns))
+        for column in self._columns:
+            del column[length:]
+        for field, dictionary in self.dictionaries.items():
+            columns[field] = DictionaryColumn(columns[field], dictionary)
+
+        self._columns = self._new_columns()
+        self._length = 0
+        for namespace in self._namespaces:
+            for field, column in zip(ChargeMasterEntry.__slots__, self._columns):
+                namespace[f"column_{field}"] = column
+        return ChargeMasterBatch(length, columns)
+
+    def _new_index(self, field, key, value):
+        dictionary = self.dictionaries[field]
+        index = self._lookups[field][key] = len(dictionary)
+        dictionary.append(value)
+        return index
+
+    def builder(self, *fields):
+        # A drop-in for ChargeMasterEntry.builder(*fields) that writes a row into
+        # the columns and returns BUFFERED instead of an entry. Each row has to go
+        # through encode() before the next one is built. Prices that are neither
+        # numbers nor None raise ValueError before anything is written.
+        key = fields
+        try:
+            return self._builders[key]
+        except KeyError:
+            pass
+
+        slots = ChargeMasterEntry.__slots__
+        unknown = [field for field in fields if field not in slots]
+        if unknown:
+            raise ValueError(f"Unknown ChargeMasterEntry fields: {', '.join(unknown)}")
+        if len(set(fields)) != len(fields):
+            raise ValueError(f"Duplicate ChargeMasterEntry fields: {', '.join(fields)}")
+        if fields:
+            parameters = ", ".join(fields)
+        else:
+            parameters = ", ".join(f"{field}=None" for field in slots)
+            fields = slots
+
+        namespace = {
+            "BUFFERED": BUFFERED,
+            "encoder": self,
+            "price": _price,
+            "dictionary_key": _dictionary_key,
+            "new_index": self._new_index,
+        }
+        prices = []
+        others = []
+        for field, column in zip(slots, self._columns):
+            namespace[f"column_{field}"] = column
+            if field not in fields:
+                # Already missing in the buffers
+                continue
+            if field in PRICE_FIELDS:
+                # Prices go first, since they're all that can raise
+                prices.append(
+                    f"    if {field} is not None:\n"
+                    f"        if type({field}) is not float:\n"
+                    f"            {field} = price({field}, {field!r})\n"
+                    f"        column_{field}[row] = {field}\n"
+                )
+            elif field in FLAG_FIELDS:
+                others.append(
+                    f"    if {field} is not None:\n"
+                    f"        column_{field}[row] = 1 if {field} else 0\n"
+                )
+            else:
+                namespace[f"lookup_{field}"] = self._lookups[field]
+                others.append(
+                    f"    if {field} is not None:\n"
+                    f"        key = {field} if type({field}) is str else "
+                    f"dictionary_key({field})\n"
+                    f"        index = lookup_{field}.get(key)\n"
+                    f"        if index is None:\n"
+                    f"            index = new_index({field!r}, key, {field})\n"
+                    f"        column_{field}[row] = index\n"
+                )
+
+        exec(
+            f"def build({parameters}):\n"
+            f"    row = encoder._length\n"
+            f"{''.join(prices)}"
+            f"{''.join(others)}"
+            f"    encoder._length = row + 1\n"
+            f"    return BUFFERED\n",
+            namespace,
+        )
+        self._namespaces.append(namespace)
+        build = self._builders[key] = namespace["build"]
+        return build
+
+    def _store(self, entry):
+        # Writes a finished entry into the next row, once all its prices are known
+        # to be good
+        row = self._length
+        values = []
+        for position, (field, value) in enumerate(
+            zip(ChargeMasterEntry.__slots__, _get_values(entry))
+        ):
+            if value is None:
+                continue
+            elif field in PRICE_FIELDS:
+                value = _price(value, field)
+            elif field in FLAG_FIELDS:
+                value = 1 if value else 0
+            else:
+                key = value if type(value) is str else _dictionary_key(value)
+                index = self._lookups[field].get(key)
+                if index is None:
+                    index = self._new_index(field, key, value)
+                value = index
+            values.append((position, value))
+
+        columns = self._columns
+        for position, value in values:
+            columns[position][row] = value
+        self._length = row + 1
+
+    def encode(self, entries):
+        # Batches of the rows in entries - ChargeMasterEntry objects, or BUFFERED
+        # for rows a builder() constructor has already written
+        batch_size = self.batch_size
+        for entry in entries:
+            if entry is not BUFFERED:
+                self._store(entry)
+            if self._length == batch_size:
+                yield self._take_batch()
+
+        if self._length:
+            yield self._take_batch()
+
+
+def iter_batches(entries, batch_size=DEFAULT_BATCH_SIZE):
+    return ColumnarEncoder(batch_size).encode(entries)
@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+from .parsers import PRICE_CACHE_SIZE, _parse_price_text
+
+# Converters turn the text of one csv cell into the value a parser wants from it,
+# with None for a cell that has nothing in it. The price converters are memoized on
+# the cell's text, so "NA", "-1" and blanks cost a cache lookup like any repeated
+# price rather than a float() that raises.
+
+
+def raw(value):
+    return value
+
+
+def text(value):
+    return value.strip()
+
+
+def _absent(value):
+    return None
+
+
+price = _parse_price_text
+
+
+def price_unless(*placeholders):
+    # price, except that these cell values (once stripped) also mean no price - e.g.
+    # "-1" in files that use it for not applicable
+    placeholders = frozenset(placeholders)
+
+    @lru_cache(maxsize=PRICE_CACHE_SIZE)
+    def convert(value):
+        value = value.strip()
+        if value in placeholders:
+            return None
+        return _parse_price_text(value)
+
+    return convert
+
+
+def leading_price_unless(*placeholders):
+    # For contract rate cells, which can have a note after the amount ("$1,200.00 per
+    # diem"): the price of the first word, or None for blanks, placeholders and
+    # anything that isn't a number, NaN included
+    placeholders = frozenset(placeholders)
+
+    @lru_cache(maxsize=PRICE_CACHE_SIZE)
+    def convert(value):
+        value = value.strip()
+        if not value or value in placeholders:
+            return None
+        price = _parse_price_text(value.replace("$", "").split(" ")[0])
+        if price != price:
+            return None
+        return price
+
+    return convert
+
+
+class ConverterTable:
+    # Turns csv rows into typed values. It's built once per header from (index,
+    # converter, field) triples, so converting a row is an index and a converter
+    # call per column with nothing looked up by name. Rows shorter than the header
+    # read as blank cells.
+    __slots__ = ("columns", "fields", "_cells", "_width")
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.fields = tuple(field for _, _, field in self.columns)
+        self._cells = tuple((index, converter) for index, converter, _ in self.columns)
+        self._width = max((index + 1 for index, _, _ in self.columns), default=0)
+
+    @classmethod
+    def resolve(cls, header, columns, optional=()):
+        # A table for (name, converter, field) columns, found by name in header - a
+        # row of column names or a {name: index} dict. Like reading the row into a
+        # dict, a name that's repeated means its last column. A name that's missing
+        # raises KeyError unless it's in optional, in which case it converts to None.
+        if not isinstance(header, dict):
+            header = {name: index for index, name in enumerate(header)}
+        resolved = []
+        for name, converter, field in columns:
+            index = header.get(name)
+            if index is None:
+                if name not in optional:
+                    raise KeyError(name)
+                # Any cell will do since its text is ignored
+                index, converter = 0, _absent
+            resolved.append((index, converter, field))
+        return cls(resolved)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def convert(self, row):
+        # The row's values, one per column in the table's order
+        if len(row) < self._width:
+            row = row + [""] * (self._width - len(row))
+        return [converter(row[index]) for index, converter in self._cells]
+
+    def items(self, row):
+        # (field, value) for the columns of the row that have a value, in order
+        return [
+            (field, value)
+            for field, value in zip(self.fields, self.convert(row))
+            if value is not None
+        ]
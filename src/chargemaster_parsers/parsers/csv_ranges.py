@@ -0,0 +1,59 @@
+import re
+
+# Bytes per range when splitting a file up - enough rows for a worker to spend far
+# longer parsing them than it takes to ship them
+DEFAULT_RANGE_SIZE = 32 * 2**20
+
+_NEWLINE = re.compile(b"\n")
+_QUOTE = re.compile(b'"')
+
+
+def record_boundaries(data, range_size, delimiter=b","):
+    # Offsets in the CSV bytes data (bytes, mmap, memoryview...) at which records
+    # start, roughly range_size apart - the first is just past the header. Follows
+    # the csv module's quoting rules: a quote only opens a quoted field at the start
+    # of a field, doubled quotes inside one are literal and a newline inside one
+    # doesn't end the record. Only the quotes are looked at one by one, so files
+    # without any quoting are split almost for free.
+    if range_size < 1:
+        raise ValueError(f"range_size must be positive, got {range_size}")
+    opening = re.compile(b"(?:^|(?<=[\r\n" + re.escape(delimiter) + b']))"')
+    size = len(data)
+    boundaries = []
+    # Never inside a quoted field at position. The next boundary is the first at or
+    # after target, so just past a newline at target - 1 or later.
+    position = 0
+    target = 0
+    while True:
+        newline = _NEWLINE.search(data, max(position, target - 1))
+        if newline is None:
+            return boundaries
+        quote = opening.search(data, position, newline.start())
+        if quote is None:
+            position = newline.end()
+            if position < size:
+                boundaries.append(position)
+            target = position + range_size
+            continue
+
+        # Skips the quoted field - whatever follows its closing quote is literal
+        index = quote.end()
+        while True:
+            quote = _QUOTE.search(data, index)
+            if quote is None:
+                return boundaries
+            index = quote.end()
+            if data[index : index + 1] != b'"':
+                break
+            index += 1
+        position = index
+
+
+def record_ranges(data, range_size, delimiter=b","):
+    # (header_end, ranges) for the CSV bytes data - the header is data[:header_end]
+    # and each (start, end) range holds whole records, in file order
+    boundaries = record_boundaries(data, range_size, delimiter)
+    if not boundaries:
+        return len(data), []
+    ends = boundaries[1:] + [len(data)]
+    return boundaries[0], list(zip(boundaries, ends))
@@ -0,0 +1,231 @@
+from array import array
+from hashlib import blake2b
+import sys
+
+# FingerprintDedup's table starts with this many slots and doubles when it's two
+# thirds full
+_INITIAL_SLOTS = 1024
+
+# Equal to no key
+_NOTHING = object()
+
+
+def fingerprint(key):
+    # 64 bit fingerprint of a key, never 0. It's the same in every process - unlike
+    # hash(), which is salted per process for strings - so fingerprints can be kept
+    # or compared between workers. Anything but a str is fingerprinted by its repr.
+    if type(key) is str:
+        digest = blake2b(key.encode("utf-8", "surrogatepass"), digest_size=8)
+    else:
+        digest = blake2b(repr(key).encode(), digest_size=8, person=b"repr")
+    return int.from_bytes(digest.digest(), "little") or 1
+
+
+class DedupLimitError(Exception):
+    # Raised when remembering another key would take a dedup past its max_bytes
+    def __init__(self, max_bytes, needed):
+        super().__init__(
+            f"Deduplicating needs {needed} bytes, more than the {max_bytes} allowed"
+        )
+        self.max_bytes = max_bytes
+        self.needed = needed
+
+
+class DedupStats:
+    __slots__ = ("total", "unique", "peak_memory")
+
+    def __init__(self, total, unique, peak_memory):
+        self.total = total
+        self.unique = unique
+        self.peak_memory = peak_memory
+
+    @property
+    def duplicates(self):
+        return self.total - self.unique
+
+    def __eq__(self, other):
+        return (self.total, self.unique, self.peak_memory) == (
+            other.total,
+            other.unique,
+            other.peak_memory,
+        )
+
+    def __repr__(self):
+        return (
+            f"DedupStats(total={self.total}, unique={self.unique}, "
+            f"peak_memory={self.peak_memory})"
+        )
+
+
+class _Dedup:
+    # Remembers which keys it's seen - add(key) is True the first time a key comes
+    # up and False after that. clear() forgets them all, ready for the next file,
+    # but the stats carry on until reset_stats(). One parse at a time.
+    def __init__(self):
+        self.total = 0
+        self.unique = 0
+        self.peak_memory = 0
+
+    def memory(self):
+        # Bytes held for the keys remembered right now
+        raise NotImplementedError
+
+    def clear(self):
+        self.peak_memory = max(self.peak_memory, self.memory())
+
+    def stats(self):
+        # total counts every key checked, unique the ones that were new and
+        # peak_memory is the most memory() has been - all since the last reset
+        peak_memory = max(self.peak_memory, self.memory())
+        return DedupStats(self.total, self.unique, peak_memory)
+
+    def reset_stats(self):
+        self.total = 0
+        self.unique = 0
+        self.peak_memory = self.memory()
+
+
+class ExactDedup(_Dedup):
+    # The keys themselves in a set. Fastest, but every distinct key is kept alive.
+    def __init__(self, max_bytes=None):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self._keys = set()
+        self._key_bytes = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        self.total += 1
+        keys = self._keys
+        if key in keys:
+            return False
+        keys.add(key)
+        self._key_bytes += sys.getsizeof(key)
+        if self.max_bytes is not None:
+            needed = self.memory()
+            if needed > self.max_bytes:
+                keys.discard(key)
+                self._key_bytes -= sys.getsizeof(key)
+                raise DedupLimitError(self.max_bytes, needed)
+        self.unique += 1
+        return True
+
+    def memory(self):
+        return sys.getsizeof(self._keys) + self._key_bytes
+
+    def clear(self):
+        super().clear()
+        self._keys = set()
+        self._key_bytes = 0
+
+
+class FingerprintDedup(_Dedup):
+    # fingerprint()s of the keys in an open addressing table - 12 to 24 bytes a key
+    # however long the keys are. Collisions are possible: a key whose fingerprint
+    # matches one already seen is taken for a duplicate without any sign, e.g.
+    # dropping a Cash entry. With n keys the odds of any collision are about
+    # n * n / 2**65 - one in 10**7 at 2 million keys.
+    def __init__(self, max_bytes=None):
+        super().__init__()
+        self.max_bytes = max_bytes
+        slots = _INITIAL_SLOTS
+        if max_bytes is not None:
+            while slots > 8 and slots * 8 > max_bytes:
+                slots //= 2
+        self._allocate(slots)
+
+    def __len__(self):
+        return self._count
+
+    def _allocate(self, slots):
+        # Rows usually repeat the key before them, which skips the table entirely
+        self._last = _NOTHING
+        self._table = array("Q", bytes(slots * 8))
+        # Slots are picked by a fingerprint's top bits
+        self._shift = 64 - (slots.bit_length() - 1)
+        self._count = 0
+
+    def _grow(self):
+        old = self._table
+        slots = len(old) * 2
+        if self.max_bytes is not None and slots * 8 > self.max_bytes:
+            raise DedupLimitError(self.max_bytes, slots * 8)
+        self.peak_memory = max(self.peak_memory, self.memory() + slots * 8)
+        count = self._count
+        self._allocate(slots)
+        table = self._table
+        mask = slots - 1
+        shift = self._shift
+        for stored in old:
+            if stored:
+                index = stored >> shift
+                while table[index]:
+                    index = (index + 1) & mask
+                table[index] = stored
+        self._count = count
+
+    def add(self, key):
+        self.total += 1
+        if key == self._last:
+            return False
+        self._last = key
+        # fingerprint() is never 0, which marks an empty slot
+        key_fingerprint = fingerprint(key)
+        table = self._table
+        mask = len(table) - 1
+        index = key_fingerprint >> self._shift
+        while True:
+            slot = table[index]
+            if slot == key_fingerprint:
+                return False
+            if not slot:
+                break
+            index = (index + 1) & mask
+
+        if (self._count + 1) * 3 > len(table) * 2:
+            self._grow()
+            table = self._table
+            mask = len(table) - 1
+            index = key_fingerprint >> self._shift
+            while table[index]:
+                index = (index + 1) & mask
+        table[index] = key_fingerprint
+        self._count += 1
+        self.unique += 1
+        return True
+
+    def memory(self):
+        return len(self._table) * self._table.itemsize
+
+    def clear(self):
+        super().clear()
+        self._allocate(len(self._table))
+
+
+class GroupedDedup(_Dedup):
+    # Only remembers the last key - for input where every key's rows are next to
+    # each other, like a file sorted by procedure. Constant memory, but a key that
+    # comes back after a different one counts as new again.
+    def __init__(self):
+        super().__init__()
+        self._last = _NOTHING
+
+    def __len__(self):
+        return 0 if self._last is _NOTHING else 1
+
+    def add(self, key):
+        self.total += 1
+        if key == self._last:
+            return False
+        self._last = key
+        self.unique += 1
+        return True
+
+    def memory(self):
+        return 0 if self._last is _NOTHING else sys.getsizeof(self._last)
+
+    def clear(self):
+        super().clear()
+        self._last = _NOTHING
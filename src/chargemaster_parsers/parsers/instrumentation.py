@@ -0,0 +1,192 @@
+from contextlib import contextmanager
+from time import perf_counter, process_time
+import io
+
+
+class ArtifactMetrics:
+    # Counters and timings for one artifact. Times are in seconds, *_time is wall
+    # clock and *_cpu is process CPU time.
+    #
+    # rows_read counts everything the parser pulled from its row source, header and
+    # preamble rows included, and rows_skipped the ones that produced no entries.
+    # read_time covers producing rows (or whole documents for JSON and xlsx), which
+    # includes the time spent waiting on the file - decode_time is what's left once
+    # that's taken out.
+    __slots__ = (
+        "url",
+        "rows_read",
+        "rows_skipped",
+        "entries",
+        "bytes_read",
+        "io_time",
+        "io_cpu",
+        "read_time",
+        "read_cpu",
+        "build_time",
+        "build_cpu",
+    )
+
+    def __init__(self, url=None):
+        self.url = url
+        self.rows_read = 0
+        self.rows_skipped = 0
+        self.entries = 0
+        self.bytes_read = 0
+        self.io_time = 0.0
+        self.io_cpu = 0.0
+        self.read_time = 0.0
+        self.read_cpu = 0.0
+        self.build_time = 0.0
+        self.build_cpu = 0.0
+
+    @property
+    def decode_time(self):
+        return max(self.read_time - self.io_time, 0.0)
+
+    @property
+    def decode_cpu(self):
+        return max(self.read_cpu - self.io_cpu, 0.0)
+
+    def __add__(self, other):
+        total = ArtifactMetrics()
+        for field in ArtifactMetrics.__slots__[1:]:
+            setattr(total, field, getattr(self, field) + getattr(other, field))
+        return total
+
+    def __repr__(self):
+        return (
+            f"ArtifactMetrics(url={self.url!r}, rows_read={self.rows_read}, "
+            f"rows_skipped={self.rows_skipped}, entries={self.entries}, "
+            f"bytes_read={self.bytes_read}, io_time={self.io_time:.3f}, "
+            f"decode_time={self.decode_time:.3f}, build_time={self.build_time:.3f})"
+        )
+
+
+class MeteredFile(io.BufferedIOBase):
+    # Read-only wrapper that counts the bytes handed out by the underlying binary
+    # file and the time spent fetching them
+    def __init__(self, raw, metrics):
+        self._raw = raw
+        self._metrics = metrics
+
+    def _timed(self, method, *args):
+        metrics = self._metrics
+        start = perf_counter()
+        cpu = process_time()
+        result = method(*args)
+        metrics.io_time += perf_counter() - start
+        metrics.io_cpu += process_time() - cpu
+        return result
+
+    def read(self, size=-1):
+        data = self._timed(self._raw.read, size)
+        self._metrics.bytes_read += len(data)
+        return data
+
+    def read1(self, size=-1):
+        read1 = getattr(self._raw, "read1", self._raw.read)
+        data = self._timed(read1, size)
+        self._metrics.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        count = self._timed(self._raw.readinto, buffer)
+        self._metrics.bytes_read += count or 0
+        return count
+
+    def readline(self, size=-1):
+        data = self._timed(self._raw.readline, size)
+        self._metrics.bytes_read += len(data)
+        return data
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._raw.seekable()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._raw.seek(offset, whence)
+
+    def tell(self):
+        return self._raw.tell()
+
+    def close(self):
+        # The caller owns the underlying file
+        super().close()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ParserMetrics:
+    # Everything recorded while ChargeMasterParser.instrument() is active, keyed by
+    # artifact url. Entries built before any artifact is tracked land under None.
+    def __init__(self):
+        self.artifacts = {}
+        self.current = None
+
+    def start_artifact(self, url):
+        metrics = self.artifacts.get(url)
+        if metrics is None:
+            metrics = self.artifacts[url] = ArtifactMetrics(url)
+        self.current = metrics
+        return metrics
+
+    def totals(self):
+        total = ArtifactMetrics()
+        for metrics in self.artifacts.values():
+            total = total + metrics
+        return total
+
+    def _current(self):
+        return self.current or self.start_artifact(None)
+
+    def track_rows(self, rows):
+        metrics = self._current()
+        iterator = iter(rows)
+        entries = None
+        while True:
+            start = perf_counter()
+            cpu = process_time()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                metrics.read_time += perf_counter() - start
+                metrics.read_cpu += process_time() - cpu
+
+            # Everything built from the previous row has been consumed by now
+            if entries == metrics.entries:
+                metrics.rows_skipped += 1
+            metrics.rows_read += 1
+            entries = metrics.entries
+            yield row
+
+        if entries == metrics.entries:
+            metrics.rows_skipped += 1
+
+    @contextmanager
+    def decoding(self):
+        metrics = self._current()
+        start = perf_counter()
+        cpu = process_time()
+        try:
+            yield metrics
+        finally:
+            metrics.read_time += perf_counter() - start
+            metrics.read_cpu += process_time() - cpu
+
+    def timed_builder(self, build):
+        def timed_build(*args, **kwargs):
+            start = perf_counter()
+            cpu = process_time()
+            entry = build(*args, **kwargs)
+            metrics = self._current()
+            metrics.build_time += perf_counter() - start
+            metrics.build_cpu += process_time() - cpu
+            metrics.entries += 1
+            return entry
+
+        return timed_build
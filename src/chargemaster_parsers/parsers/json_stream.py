@@ -0,0 +1,259 @@
+import codecs
+import json
+import re
+
+# Bytes read at a time - far more than one row of any artifact needs
+CHUNK_SIZE = 65536
+
+_WHITESPACE = " \t\n\r"
+
+# What matters when scanning past a value rather than decoding it
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+def decode_chunks(artifact, encoding="utf-8", errors="strict", chunk_size=None):
+    # Text from a binary file a chunk at a time - the same text as decoding all of
+    # it at once, including replacement characters for sequences split across reads
+    chunk_size = chunk_size or CHUNK_SIZE
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    while True:
+        data = artifact.read(chunk_size)
+        text = decoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            return
+
+
+def _replace_chunks(chunks, old, new):
+    # text.replace(old, new) over a stream of chunks. Whatever might be the start of
+    # a match is held back until the next chunk shows whether it is one.
+    held = ""
+    keep = len(old) - 1
+    for chunk in chunks:
+        text = held + chunk
+        start = 0
+        while True:
+            found = text.find(old, start)
+            if found < 0:
+                break
+            yield text[start:found] + new
+            start = found + len(old)
+        cut = max(start, len(text) - keep)
+        if cut > start:
+            yield text[start:cut]
+        held = text[cut:]
+    if held:
+        yield held
+
+
+def repair_chunks(chunks, replacements):
+    # Applies each (old, new) replacement in turn, exactly like chaining
+    # str.replace calls on the whole text, without ever holding all of it
+    for old, new in replacements:
+        chunks = _replace_chunks(chunks, old, new)
+    return chunks
+
+
+class _Reader:
+    # A JSON document from a stream of text chunks, read from left to right. Only
+    # the unread part of the current chunk and whatever value is being decoded are
+    # held.
+    def __init__(self, chunks, decoder=None):
+        self.decoder = decoder or json.JSONDecoder()
+        self.chunks = iter(chunks)
+        self.buffer = ""
+        self.index = 0
+
+    def error(self, message):
+        return json.JSONDecodeError(message, self.buffer, self.index)
+
+    def more(self, size):
+        # Drops what's been consumed and appends at least size characters of
+        # text - False once there's nothing left to read
+        pending = [self.buffer[self.index :]]
+        read = 0
+        for chunk in self.chunks:
+            pending.append(chunk)
+            read += len(chunk)
+            if read >= size:
+                break
+        if not read:
+            return False
+        self.buffer = "".join(pending)
+        self.index = 0
+        return True
+
+    def next_character(self):
+        # The next character that isn't whitespace, reading ahead as needed - ""
+        # at the end of the document
+        while True:
+            buffer = self.buffer
+            index = self.index
+            while index < len(buffer) and buffer[index] in _WHITESPACE:
+                index += 1
+            self.index = index
+            if index < len(buffer) or not self.more(1):
+                return buffer[index : index + 1]
+
+    def decode_value(self, delimiters):
+        # Decodes the value starting at the next character. It's only settled once
+        # one of the delimiters that can follow it has been read - a number cut off
+        # by the end of a chunk still decodes. Anything unsettled is retried with
+        # more text, doubling what's buffered each time so huge values stay linear.
+        if not self.next_character():
+            raise self.error("Expecting value")
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.index)
+            except json.JSONDecodeError:
+                if not self.more(len(self.buffer) - self.index):
+                    raise
+                continue
+            after = end
+            while after < len(self.buffer) and self.buffer[after] in _WHITESPACE:
+                after += 1
+            if after < len(self.buffer) and self.buffer[after] in delimiters:
+                break
+            if not self.more(len(self.buffer) - self.index):
+                break
+        self.index = end
+        return value
+
+    def skip_value(self, depth=0):
+        # Moves past the value starting at the next character without building it
+        # - or, with a depth, past the rest of the arrays and objects that many
+        # levels in. Containers are only scanned for strings and brackets, so
+        # damage inside a skipped one goes unnoticed as long as it balances.
+        if not depth:
+            if self.next_character() not in ("[", "{"):
+                self.decode_value(",]}")
+                return
+        in_string = False
+        while True:
+            pattern = _STRING_SPECIAL if in_string else _STRUCTURAL
+            match = pattern.search(self.buffer, self.index)
+            if match is None:
+                self.index = len(self.buffer)
+                if not self.more(1):
+                    raise self.error("Unterminated value")
+                continue
+            character = match.group()
+            self.index = match.end()
+            if in_string:
+                if character == '"':
+                    in_string = False
+                elif self.index < len(self.buffer) or self.more(1):
+                    # Whatever's escaped can't end the string
+                    self.index += 1
+                else:
+                    raise self.error("Unterminated string")
+            elif character == '"':
+                in_string = True
+            elif character in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if not depth:
+                    return
+
+
+class _Items:
+    # Iterator over the items of the array starting at a reader's next character,
+    # decoding each as it's asked for. Any other value is its only item.
+    def __init__(self, reader):
+        self._reader = reader
+        self._array = reader.next_character() == "["
+        self._started = False
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        reader = self._reader
+        if not self._array:
+            self._done = True
+            return reader.decode_value(",}")
+        if not self._started:
+            self._started = True
+            reader.index += 1
+            if reader.next_character() == "]":
+                reader.index += 1
+                self._done = True
+                raise StopIteration
+        else:
+            delimiter = reader.next_character()
+            if delimiter == "]":
+                reader.index += 1
+                self._done = True
+                raise StopIteration
+            if delimiter != ",":
+                raise reader.error("Expecting ',' delimiter")
+            reader.index += 1
+        return reader.decode_value(",]")
+
+    def skip(self):
+        # Moves the reader past whatever hasn't been read, without decoding it
+        if self._done:
+            return
+        self._done = True
+        if self._started:
+            self._reader.skip_value(depth=1)
+        else:
+            self._reader.skip_value()
+
+
+def iter_array(chunks, decoder=None):
+    # Decodes a JSON document that's a top-level array from a stream of text
+    # chunks, yielding its items one at a time - json.loads(text) without building
+    # the list. Raises json.JSONDecodeError for malformed documents.
+    reader = _Reader(chunks, decoder)
+    if reader.next_character() != "[":
+        raise reader.error("Expecting '['")
+    yield from _Items(reader)
+    if reader.next_character():
+        raise reader.error("Extra data")
+
+
+def iter_sections(chunks, decoder=None):
+    # Walks a JSON document that's a top-level object of sections - usually arrays
+    # of rows - from a stream of text chunks. Yields (name, rows) for each member
+    # in document order, where rows decodes the section's items as they're asked
+    # for (a section that isn't an array is its only item). Whatever a caller
+    # hasn't read of a section when it asks for the next one is scanned past
+    # without being decoded, so skipping a section costs no more memory than a
+    # chunk. Unlike json.load, members with the same name are all yielded.
+    reader = _Reader(chunks, decoder)
+    if reader.next_character() != "{":
+        raise reader.error("Expecting '{'")
+    reader.index += 1
+    if reader.next_character() == "}":
+        reader.index += 1
+    else:
+        while True:
+            if reader.next_character() != '"':
+                raise reader.error("Expecting property name enclosed in double quotes")
+            name = reader.decode_value(":")
+            if reader.next_character() != ":":
+                raise reader.error("Expecting ':' delimiter")
+            reader.index += 1
+            if not reader.next_character():
+                raise reader.error("Expecting value")
+            rows = _Items(reader)
+            yield name, rows
+            rows.skip()
+
+            delimiter = reader.next_character()
+            if delimiter == "}":
+                reader.index += 1
+                break
+            if delimiter != ",":
+                raise reader.error("Expecting ',' delimiter")
+            reader.index += 1
+
+    if reader.next_character():
+        raise reader.error("Extra data")
@@ -3,6 +3,8 @@ import zipfile
 import io
 import re
 
+from .codes import CPT, HCPCS, classify_cpt_hcpcs
+from .converters import ConverterTable, price, raw
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 
 
@@ -18,9 +20,37 @@ class KaiserChargeMasterParser(ChargeMasterParser):
         "SanDiego": "San Diego",
     }
 
+    _PRICE_COLUMN_REGEX = re.compile(
+        r"^(COMMERCIAL|MEDICAID) (INPATIENT|OUTPATIENT) - (.+?) PRICE$"
+    )
+
+    # Every column is optional - a missing one leaves its field unset
+    _COLUMNS = (
+        ("Procedure Name", raw, "procedure_description"),
+        ("Gross Charge", price, "gross_charge"),
+        ("Procedure Code (CPT / HCPCS)", raw, "procedure_code"),
+    )
+
+    @classmethod
+    def _price_columns(cls, header):
+        # (payer, plan, in_patient) for each price column, in order - only the
+        # columns' names go into the entries
+        price_columns = []
+        for name in dict.fromkeys(header):
+            match = cls._PRICE_COLUMN_REGEX.match(name)
+            if match:
+                payer, patient_classification, provider = match.groups()
+                in_patient = patient_classification == "INPATIENT"
+                price_columns.append((payer, provider.strip(), in_patient))
+        return price_columns
+
     def parse_artifacts(self, artifacts):
+        make_entry = self.entry_builder()
+
         with zipfile.ZipFile(
-            artifacts[KaiserChargeMasterParser.SAN_DIEGO_ARTIFACT_URL]
+            self.track_artifact(
+                self.SAN_DIEGO_ARTIFACT_URL, artifacts[self.SAN_DIEGO_ARTIFACT_URL]
+            )
         ) as zip_file:
             for name in zip_file.namelist():
                 match = re.match(r"(.+?)Kaiser(.+?)ChargeDescriptionMaster.csv$", name)
@@ -30,80 +60,50 @@ class KaiserChargeMasterParser(ChargeMasterParser):
                     with zip_file.open(name) as csv_file:
                         for _ in range(4):
                             csv_file.readline()
-                        for row in csv.DictReader(io.TextIOWrapper(csv_file)):
-                            # Get rid of whitespace and garbage characters
-                            filtered_row = {
-                                key.encode("ascii", "ignore")
-                                .decode()
-                                .strip(): value.encode("ascii", "ignore")
-                                .decode()
-                                .strip()
-                                for key, value in row.items()
-                            }
+                        rows = self.track_rows(csv.reader(io.TextIOWrapper(csv_file)))
+                        header = next(rows, None)
+                        if header is None:
+                            continue
+                        convert = ConverterTable.resolve(
+                            header,
+                            self._COLUMNS,
+                            optional=[name for name, _, _ in self._COLUMNS],
+                        ).convert
+                        price_columns = self._price_columns(header)
+
+                        for row in rows:
+                            if not row:
+                                # Blank line
+                                continue
 
-                            charge_number = None
-                            procedure_identifier = None
-                            procedure_description = None
-                            nubc_revenue_code = None
-                            gross_charge = None
                             cpt_code = None
                             hcpcs_code = None
 
-                            try:
-                                charge_number = row.pop("Charge # \n(Px Code)")
-                            except KeyError:
-                                pass
-
-                            try:
-                                procedure_description = row.pop("Procedure Name")
-                            except KeyError:
-                                pass
+                            (
+                                procedure_description,
+                                gross_charge,
+                                procedure_code,
+                            ) = convert(row)
 
-                            try:
-                                gross_charge = row.pop("Gross Charge").strip()
-                                gross_charge = float(
-                                    gross_charge.replace("$", "").replace(",", "")
+                            if procedure_code is not None:
+                                code_type, procedure_code = classify_cpt_hcpcs(
+                                    procedure_code
                                 )
-                            except KeyError:
-                                pass
-
-                            try:
-                                procedure_code = row.pop("Procedure Code (CPT / HCPCS)")
-                                if (
-                                    len(procedure_code) == 5
-                                    and procedure_code[0].isnumeric()
-                                ):
+                                if code_type == CPT:
                                     cpt_code = procedure_code
-                                elif procedure_code:
+                                elif code_type == HCPCS:
                                     hcpcs_code = procedure_code
-                            except KeyError:
-                                pass
 
-                            for key in row:
-                                match = re.match(
-                                    r"^(COMMERCIAL|MEDICAID) (INPATIENT|OUTPATIENT) - (.+?) PRICE$",
-                                    key,
+                            # The charge number has no ChargeMasterEntry field and
+                            # was always dropped by the kwargs constructor
+                            for payer, plan, in_patient in price_columns:
+                                yield make_entry(
+                                    procedure_description=procedure_description,
+                                    gross_charge=gross_charge,
+                                    cpt_code=cpt_code,
+                                    hcpcs_code=hcpcs_code,
+                                    payer=payer,
+                                    plan=plan,
+                                    in_patient=in_patient,
+                                    location=location,
                                 )
-                                if match:
-                                    (
-                                        payer,
-                                        patient_classification,
-                                        provider,
-                                    ) = match.groups()
-                                    if patient_classification == "INPATIENT":
-                                        in_patient = True
-                                    elif patient_classification == "OUTPATIENT":
-                                        in_patient = False
-                                    plan = provider.strip()
-
-                                    yield ChargeMasterEntry(
-                                        charge_number=charge_number,
-                                        procedure_description=procedure_description,
-                                        gross_charge=gross_charge,
-                                        cpt_code=cpt_code,
-                                        hcpcs_code=hcpcs_code,
-                                        payer=payer,
-                                        plan=plan,
-                                        in_patient=in_patient,
-                                        location=location,
-                                    )
@@ -1,6 +1,7 @@
+from .codes import CPT, HCPCS, MS_DRG, classify_code
+from .converters import ConverterTable, price, text
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 import csv
-import re
 import io
 
 
@@ -12,9 +13,21 @@ class LLUHChargeMasterParser(ChargeMasterParser):
         "https://lluh.org/sites/lluh.org/files/330245579_lomalindauniversitybehavioralmedicalcenter_standardcharges.csv": "Behavioral Medicine Center",
         "https://lluh.org/sites/lluh.org/files/371705906_lomalindauniversitymedicalcenter-murrieta_standardcharges.csv": "Medical Center – Murrieta",
     }
-    ARTIFACT_URLS = (url for url in URL_TO_INSTITUTION.keys())
+    ARTIFACT_URLS = tuple(URL_TO_INSTITUTION)
+
+    _COLUMNS = (
+        ("procedure", text, "procedure_identifier"),
+        ("code", text, "code"),
+        ("description", text, "procedure_description"),
+        ("gross_pay", price, "gross_charge"),
+        ("cash_pay", price, "cash_price"),
+        ("minimum", price, "min_reimbursement"),
+        ("maximum", price, "max_reimbursement"),
+    )
 
     def parse_artifacts(self, artifacts):
+        make_entry = self.entry_builder()
+
         KEY_COLUMNS = (
             "procedure",
             "code",
@@ -28,88 +41,69 @@ class LLUHChargeMasterParser(ChargeMasterParser):
         for artifact in artifacts:
             location = self.URL_TO_INSTITUTION[artifact]
             reader = csv.reader(
-                io.TextIOWrapper(artifacts[artifact], encoding="cp1252", newline="")
+                io.TextIOWrapper(
+                    self.track_artifact(artifact, artifacts[artifact]),
+                    encoding="cp1252",
+                    newline="",
+                )
             )
-            headers = None
-            for row in reader:
-                if headers is None:
+            convert = None
+            for row in self.track_rows(reader):
+                if convert is None:
                     # We're hunting for the header row - if we find at least five of the candidate columns it's good
-                    count_good_columns = 0
-                    temp_headers = {}
-                    for i, value in enumerate(row):
-                        # Note the position of the candidate column header
-                        temp_headers[i] = value.strip()
-
-                        # Check to see if we recognize this colum header
-                        if temp_headers[i] in KEY_COLUMNS:
-                            count_good_columns += 1
+                    headers = [value.strip() for value in row]
+                    count_good_columns = sum(
+                        1 for name in headers if name in KEY_COLUMNS
+                    )
 
                     # We found a good header row, keep it and start collecting data
                     if count_good_columns > 5:
-                        headers = temp_headers
+                        columns = {name: index for index, name in enumerate(headers)}
+                        convert = ConverterTable.resolve(columns, self._COLUMNS).convert
+                        payers = ConverterTable(
+                            (index, price, name.replace("_", " "))
+                            for name, index in columns.items()
+                            if name not in KEY_COLUMNS
+                        )
 
                 else:
-                    row_dict_values = {}
-                    for index, column in headers.items():
-                        value = row[index].strip()
-                        row_dict_values[column] = value
-
-                    procedure_identifier = None
-                    procedure_description = None
                     ms_drg_code = None
                     cpt_code = None
                     hcpcs_code = None
-                    max_reimbursement = None
-                    min_reimbursement = None
-                    gross_charge = None
                     extra_data = {}
 
-                    expected_reimbursement = {}
-
-                    for key, value in row_dict_values.items():
-                        if key not in KEY_COLUMNS:
-                            price = self.parse_price(value)
-                            if price is not None:
-                                expected_reimbursement[key.replace("_", " ")] = price
+                    (
+                        procedure_identifier,
+                        code,
+                        procedure_description,
+                        gross_charge,
+                        cash_price,
+                        min_reimbursement,
+                        max_reimbursement,
+                    ) = convert(row)
 
-                    procedure_description = row_dict_values["description"]
-                    procedure_identifier = row_dict_values["procedure"]
+                    expected_reimbursement = dict(payers.items(row))
 
-                    temp = row_dict_values["code"]
-                    if temp:
-                        known_code = False
-                        for code_type, code_regex in (
-                            ("ms_drg", r"MS-DRG V37 \(FY2020\) (.+?)$"),
-                            ("cpt", r"CPT.+? (.+?)$"),
-                            ("hcpcs", r"HCPCS (.+?)$"),
-                        ):
-                            match = re.match(code_regex, temp)
-                            if match:
-                                value = match.groups()[0].upper().strip()
-                                if code_type == "ms_drg":
-                                    ms_drg_code = value
-                                elif code_type == "cpt":
-                                    cpt_code = value
-                                elif code_type == "hcpcs":
-                                    hcpcs_code = value
-                                known_code = True
-                                break
-                        if not known_code:
-                            extra_data["code"] = temp
+                    if code:
+                        code_type, value = classify_code(code)
+                        if code_type == MS_DRG:
+                            ms_drg_code = value
+                        elif code_type == CPT:
+                            cpt_code = value
+                        elif code_type == HCPCS:
+                            hcpcs_code = value
+                        else:
+                            extra_data["code"] = code
 
-                    gross_charge = self.parse_price(row_dict_values["gross_pay"])
-                    cash_price = self.parse_price(row_dict_values["cash_pay"])
                     if cash_price:
                         expected_reimbursement["Cash"] = cash_price
-                    min_reimbursement = self.parse_price(row_dict_values["minimum"])
-                    max_reimbursement = self.parse_price(row_dict_values["maximum"])
 
                     if not extra_data:
                         extra_data = None
 
                     for payer, expected in expected_reimbursement.items():
                         if payer == "Cash":
-                            yield ChargeMasterEntry(
+                            yield make_entry(
                                 procedure_identifier=procedure_identifier,
                                 procedure_description=procedure_description,
                                 gross_charge=expected,
@@ -121,7 +115,7 @@ class LLUHChargeMasterParser(ChargeMasterParser):
                                 location=location,
                             )
                         else:
-                            yield ChargeMasterEntry(
+                            yield make_entry(
                                 procedure_identifier=procedure_identifier,
                                 procedure_description=procedure_description,
                                 gross_charge=gross_charge,
@@ -1,5 +1,4 @@
 import re
-import openpyxl
 
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 
@@ -10,17 +9,16 @@ class PalomarChargeMasterParser(ChargeMasterParser):
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
     def parse_artifacts(self, artifacts):
-        wb = openpyxl.load_workbook(
-            artifacts[PalomarChargeMasterParser.ARTIFACT_URL], data_only=True
-        )
+        make_entry = self.entry_builder()
+
+        artifact = self.track_artifact(self.ARTIFACT_URL, artifacts[self.ARTIFACT_URL])
         cdm_column = None
         cdm_desc_column = None
         price_column = None
         found_headers = False
-        for row in wb.worksheets[0].iter_rows():
+        for row in self.xlsx_rows(artifact, max_col=3, data_only=True):
             if not found_headers:
-                for i, cell in enumerate(row[:3]):
-                    value = cell.value
+                for i, value in enumerate(row):
                     if type(value) == str:
                         value = value.strip()
                     if value == "CDM":
@@ -33,23 +31,23 @@ class PalomarChargeMasterParser(ChargeMasterParser):
                         price_column = i
                         found_headers = True
             else:
-                cdm = row[cdm_column].value
+                cdm = row[cdm_column]
                 if type(cdm) == str:
                     cdm = cdm.strip()
                 else:
                     cdm = str(cdm)
 
-                cdm_desc = row[cdm_desc_column].value
+                cdm_desc = row[cdm_desc_column]
                 if type(cdm_desc) == str:
                     cdm_desc = cdm_desc.strip()
                 else:
                     cdm_desc = str(cdm_desc)
 
-                price = row[price_column].value
+                price = row[price_column]
                 if type(price) == str:
-                    price = float(price.strip().replace("$", "").replace(",", ""))
+                    price = self.parse_price(price)
 
-                yield ChargeMasterEntry(
+                yield make_entry(
                     procedure_identifier=cdm,
                     procedure_description=cdm_desc,
                     gross_charge=price,
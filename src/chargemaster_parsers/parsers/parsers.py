@@ -1,11 +1,163 @@
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from operator import attrgetter
+import importlib
+
+from .instrumentation import MeteredFile, ParserMetrics
+
+# Wide files repeat the same few price strings ("NA", "-1", "$240,757.37") across
+# dozens of payer columns, so parsed prices are memoized on the raw string
+PRICE_CACHE_SIZE = 65536
+
+NAN = float("nan")
+
+
+@lru_cache(maxsize=PRICE_CACHE_SIZE)
+def _parse_price_text(price):
+    price = price.strip()
+    if price[:1] == "$":
+        price = price[1:]
+    price = price.replace(",", "")
+
+    # Plain decimal amounts are by far the most common, so check for those without
+    # paying for an exception on every "NA" or "Variable"
+    digits = price[1:] if price[:1] == "-" else price
+    whole, _, fraction = digits.partition(".")
+    if (whole or fraction) and (whole + fraction).isascii():
+        if (whole + fraction).isdigit():
+            return float(price)
+        elif digits.isalpha():
+            return None
+
+    # Words - "nan", "inf" and "Infinity" included - were turned away above as no
+    # price. Anything else unusual (exponents, "1_000", non-ASCII digits, stray
+    # characters) gets the slow path
+    try:
+        return float(price)
+    except ValueError:
+        return None
+
+
+def _parse_price_or_nan(price):
+    if price is None:
+        return NAN
+    elif type(price) is str:
+        price = _parse_price_text(price)
+        return NAN if price is None else price
+    else:
+        return float(price)
+
+
+class ParserRegistry(Mapping):
+    # Maps institution names to parser classes without importing them up front.
+    # Targets are either a class or a "module:ClassName" string, which is imported
+    # the first time the parser is asked for. Third party parsers can advertise
+    # themselves through the ENTRY_POINT_GROUP entry point group, e.g. in
+    # pyproject.toml:
+    #
+    # [project.entry-points."chargemaster_parsers.parsers"]
+    # "My Hospital" = "my_package.parsers:MyHospitalChargeMasterParser"
+    #
+    # Entry points are only scanned when a lookup misses or the full list is needed.
+    ENTRY_POINT_GROUP = "chargemaster_parsers.parsers"
+
+    def __init__(self):
+        self._targets = {}
+        self._names = {}
+        self._entry_points_loaded = False
+
+    def register(self, institution, target):
+        institution = institution.strip()
+        self._targets[institution] = target
+        self._names[institution.casefold()] = institution
+
+    def _load_entry_points(self):
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+
+        from importlib.metadata import entry_points
+
+        discovered = entry_points()
+        if hasattr(discovered, "select"):
+            discovered = discovered.select(group=self.ENTRY_POINT_GROUP)
+        else:
+            # Python 3.9 returns a dict of groups
+            discovered = discovered.get(self.ENTRY_POINT_GROUP, ())
+
+        for entry_point in discovered:
+            # Never let a plugin shadow a parser that's already registered
+            if entry_point.name.strip().casefold() not in self._names:
+                self.register(entry_point.name, entry_point.value)
+
+    def _resolve(self, institution):
+        target = self._targets[institution]
+        if isinstance(target, str):
+            module_name, _, class_name = target.partition(":")
+            target = getattr(importlib.import_module(module_name), class_name)
+            self._targets[institution] = target
+        return target
+
+    def lookup(self, institution):
+        # Case-insensitive lookup - returns None if nothing matches
+        name = self._names.get(institution.strip().casefold())
+        if name is None:
+            self._load_entry_points()
+            name = self._names.get(institution.strip().casefold())
+            if name is None:
+                return None
+        return self._resolve(name)
+
+    def __getitem__(self, institution):
+        if institution not in self._targets:
+            self._load_entry_points()
+        return self._resolve(institution)
+
+    def __contains__(self, institution):
+        self._load_entry_points()
+        return institution in self._targets
+
+    def __iter__(self):
+        self._load_entry_points()
+        return iter(list(self._targets))
+
+    def __len__(self):
+        self._load_entry_points()
+        return len(self._targets)
+
+
 class ChargeMasterParser:
-    registered_parsers = {}
+    registered_parsers = ParserRegistry()
+
+    # Optional StringPool shared by every entry this parser builds
+    string_pool = None
+
+    # Bump in a subclass whenever a change alters what it yields, so output that
+    # ParseCache saved from an older version is parsed again rather than replayed
+    PARSER_VERSION = 1
+
+    # Optional xlsx.XlsxRowCache the xlsx parsers read their workbooks through
+    row_cache = None
+
+    # ParserMetrics while instrument() is active - None otherwise, which keeps the
+    # track_* helpers below down to a single attribute check
+    metrics = None
+
+    # ColumnarEncoder while parse_artifacts_columnar is starting parse_artifacts -
+    # entry_builder hands out its row-writing builders then
+    column_sink = None
+
+    def __init__(self, string_pool=None, row_cache=None):
+        self.string_pool = string_pool
+        self.row_cache = row_cache
 
     # Register imported derived classes - requires Python 3.6+
     # https://python.readthedocs.io/en/stable/reference/datamodel.html#object.__init_subclass__
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
-        cls.registered_parsers[cls.institution_name.strip()] = cls
+        cls.registered_parsers.register(cls.institution_name, cls)
 
     # Requries Python 3.9+ to nest classmethod and property
     # https://docs.python.org/3.11/library/functions.html#classmethod
@@ -22,32 +174,259 @@ class ChargeMasterParser:
     def parse_artifacts(self, artifacts):
         raise NotImplemented("Only implemented on derived classes.")
 
+    def parse_artifact(self, url, artifact):
+        # Entries from one artifact on its own. A parser's output is its artifacts'
+        # outputs one after another, which lets ParseCache replay them one at a
+        # time. Parsers that can't take a lone artifact through parse_artifacts
+        # override this.
+        return self.parse_artifacts({url: artifact})
+
+    def work_units(self, artifacts):
+        # (url, artifact) pairs that parse_artifact can take independently, in the
+        # order parse_artifacts gets to them
+        return [
+            (url, artifact)
+            for url, artifact in artifacts.items()
+            if url in self.artifact_urls
+        ]
+
+    def parse_artifacts_parallel(
+        self, artifacts, workers=None, ordered=True, chunk_size=None
+    ):
+        # parse_artifacts with each work unit parsed in its own worker process - up
+        # to workers at once, one per core by default. Entries are streamed back in
+        # chunks and, with ordered set, come out exactly as parse_artifacts would
+        # yield them; otherwise each chunk is yielded as soon as it arrives.
+        # Artifacts go to the workers as the path they were opened from, or their
+        # bytes. A unit that raises stops the parse with an ArtifactParseError.
+        from ..orchestrator import DEFAULT_CHUNK_SIZE, parse_work_units
+
+        if chunk_size is None:
+            chunk_size = DEFAULT_CHUNK_SIZE
+        return parse_work_units(self, artifacts, workers, ordered, chunk_size)
+
+    def parse_artifacts_columnar(self, artifacts, batch_size=None):
+        # Same output as parse_artifacts but packed into ChargeMasterBatch objects of
+        # at most batch_size rows. Parsers that build their entries through
+        # entry_builder write each row straight into the batch columns, so no
+        # object is made per price; entries built any other way are packed as they
+        # come.
+        from .columnar import DEFAULT_BATCH_SIZE, ColumnarEncoder
+
+        if batch_size is None:
+            batch_size = DEFAULT_BATCH_SIZE
+        encoder = ColumnarEncoder(batch_size)
+        return encoder.encode(self._parse_into(encoder, artifacts))
+
+    def _parse_into(self, encoder, artifacts):
+        # parse_artifacts with encoder as the column_sink until the first row.
+        # Parsers ask entry_builder for their builders before then, and the sink is
+        # gone again before any other parse can start with this parser; a builder
+        # asked for later builds entries, which encode() packs all the same.
+        entries = iter(self.parse_artifacts(artifacts))
+        self.column_sink = encoder
+        try:
+            for entry in entries:
+                self.column_sink = None
+                yield entry
+                break
+        finally:
+            self.column_sink = None
+        yield from entries
+
     @classmethod
-    def build(cls, institution):
-        for candidate_institution in cls.registered_parsers:
-            if candidate_institution.lower() == institution.lower():
-                return cls.registered_parsers[candidate_institution]()
+    def build(cls, institution, **kwargs):
+        parser_class = cls.registered_parsers.lookup(institution)
+        if parser_class is not None:
+            return parser_class(**kwargs)
         raise ValueError(
             f"No registered institution matched {institution}. Choices were {', '.join(cls.registered_parsers)}"
         )
 
+    @contextmanager
+    def instrument(self):
+        # Records per artifact counters and stage timings for parses started inside
+        # the block, e.g.
+        #
+        # with parser.instrument() as metrics:
+        #     entries = list(parser.parse_artifacts(artifacts))
+        # for url, artifact_metrics in metrics.artifacts.items():
+        #     ...
+        metrics = self.metrics = ParserMetrics()
+        try:
+            yield metrics
+        finally:
+            self.metrics = None
+
     # Helpers
+    def entry_builder(self, *fields):
+        # Parsers should build their entries through this rather than
+        # ChargeMasterEntry.builder directly so options like string interning,
+        # instrumentation and columnar output apply. Whatever it builds is meant to
+        # be yielded as it is.
+        if self.column_sink is not None:
+            build = self.column_sink.builder(*fields)
+        elif self.string_pool is None:
+            build = ChargeMasterEntry.builder(*fields)
+        else:
+            build = self.string_pool.builder(*fields)
+        if self.metrics is not None:
+            build = self.metrics.timed_builder(build)
+        return build
+
+    # Parsers wrap their inputs with these so instrument() can see inside a parse.
+    # They hand back their argument untouched when instrumentation is off.
+    def track_artifact(self, url, artifact):
+        # Starts attributing everything to url and meters reads from the file
+        if self.metrics is None:
+            return artifact
+        return MeteredFile(artifact, self.metrics.start_artifact(url))
+
+    def track_rows(self, rows):
+        # Counts and times rows pulled from a csv reader, worksheet and so on
+        if self.metrics is None:
+            return rows
+        return self.metrics.track_rows(rows)
+
+    def decoding(self):
+        # Context manager timing a bulk decode such as json.load
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.decoding()
+
+    def xlsx_rows(self, artifact, min_row=1, max_col=None, data_only=False):
+        # Value tuples for the rows of an xlsx artifact's first worksheet - see
+        # xlsx.XlsxReader.iter_rows. With a row_cache, a workbook that's been seen
+        # before is replayed from its transcoded rows instead of decoded again. The
+        # rows come tracked: opening the workbook happens on the first row, so its
+        # read_time covers that as well as decoding every row after it. The workbook
+        # is closed once the rows run out or the generator is closed.
+        from . import xlsx
+
+        if self.row_cache is not None:
+            rows = self.row_cache.iter_rows(artifact, min_row, max_col, data_only)
+        else:
+            rows = xlsx.iter_rows(artifact, min_row, max_col, data_only)
+        return self.track_rows(rows)
+
     def parse_price(self, price):
         if price is None:
             return None
         elif type(price) is str:
-            try:
-                price = price.strip()
-                if price[0] == "$":
-                    price = price[1:]
-                return float(price.replace(",", ""))
-            except ValueError:
-                return None
+            return _parse_price_text(price)
         else:
             return float(price)
 
+    def parse_prices(self, prices):
+        # Batch version of parse_price - returns an array("d") with NaN wherever
+        # parse_price would have returned None
+        return array("d", [_parse_price_or_nan(price) for price in prices])
+
 
-class ChargeMasterEntry:
+# Fields whose values repeat heavily across entries and are worth interning
+INTERNED_FIELDS = frozenset(
+    (
+        "cpt_code",
+        "hcpcs_code",
+        "location",
+        "ms_drg_code",
+        "ndc_code",
+        "nubc_revenue_code",
+        "payer",
+        "plan",
+        "procedure_description",
+        "procedure_identifier",
+        "quantity",
+    )
+)
+
+
+class StringPoolStats:
+    __slots__ = ("total", "unique")
+
+    def __init__(self, total, unique):
+        self.total = total
+        self.unique = unique
+
+    @property
+    def duplicates(self):
+        return self.total - self.unique
+
+    def __eq__(self, other):
+        return (self.total, self.unique) == (other.total, other.unique)
+
+    def __repr__(self):
+        return f"StringPoolStats(total={self.total}, unique={self.unique})"
+
+
+class StringPool:
+    # Opt-in interning for repeated entry fields. Every string passed through intern()
+    # is swapped for the first equal string the pool saw, so millions of entries end
+    # up sharing a few thousand payer/plan/code objects. A pool can be shared between
+    # parsers (and runs) - pass it to the parser constructor.
+    def __init__(self):
+        self._strings = {}
+        self._builders = {}
+        self.total = 0
+
+    def __len__(self):
+        return len(self._strings)
+
+    def intern(self, value):
+        if type(value) is not str:
+            return value
+        self.total += 1
+        return self._strings.setdefault(value, value)
+
+    def builder(self, *fields):
+        try:
+            return self._builders[fields]
+        except KeyError:
+            build = self._builders[fields] = ChargeMasterEntry.builder(
+                *fields, intern=self.intern
+            )
+            return build
+
+    def stats(self):
+        # total counts every string routed through the pool since the last reset,
+        # unique is the number of distinct strings it holds
+        return StringPoolStats(self.total, len(self._strings))
+
+    def reset_stats(self):
+        self.total = 0
+
+    def clear(self):
+        self._strings.clear()
+        self.total = 0
+
+
+_SCALAR_TYPES = frozenset((str, float, int, bool))
+
+
+_set_attribute = object.__setattr__
+
+
+class _CachedSortKey:
+    # Lives on a base class so ChargeMasterEntry.__slots__ stays the list of fields
+    __slots__ = ("_sort_key",)
+
+
+def _hashable(value):
+    # extra_data is a dict - turn containers into tuples so they can be part of a key
+    if isinstance(value, dict):
+        try:
+            return tuple(sorted(value.items()))
+        except TypeError:
+            return tuple(value.items())
+    elif isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+class _EntrySlots(_CachedSortKey):
+    # ChargeMasterEntry's fields, without its __setattr__. Builders fill in one of
+    # these with plain attribute stores and then turn it into a ChargeMasterEntry,
+    # which has the same layout - far cheaper than a __setattr__ call per field.
     __slots__ = sorted(
         [
             "location",
@@ -73,33 +452,131 @@ class ChargeMasterEntry:
         ]
     )
 
+
+class ChargeMasterEntry(_EntrySlots):
+    __slots__ = ()
+
+    # Generated constructors, keyed by (class, fields) - see builder()
+    _builders = {}
+
     def __init__(self, **kwargs):
+        _set_attribute(self, "_sort_key", None)
+        get = kwargs.get
         for key in self.__slots__:
-            value = None
+            _set_attribute(self, key, get(key))
+
+    def __setattr__(self, name, value):
+        # Changing a field throws away the cached sort key, so equality, ordering and
+        # hashing follow the new value. (Entries inside a set or dict still have to
+        # be taken out before they're changed, and mutating extra_data in place
+        # isn't noticed.)
+        _set_attribute(self, name, value)
+        _set_attribute(self, "_sort_key", None)
+
+    @classmethod
+    def builder(cls, *fields, intern=None):
+        # Returns a precompiled constructor that skips the generic kwargs handling in
+        # __init__. With no fields it accepts any slot as a keyword argument (or all
+        # of them positionally in __slots__ order). With fields it takes exactly
+        # those values positionally and leaves everything else as None. Either way
+        # the entries are identical to ones built through __init__.
+        #
+        # If intern is given, every field in INTERNED_FIELDS is passed through it.
+        # Those builders aren't cached here since they'd keep the pool alive forever -
+        # StringPool caches its own.
+        key = (cls, fields)
+        if intern is None:
             try:
-                value = kwargs.pop(key)
+                return cls._builders[key]
             except KeyError:
                 pass
-            setattr(self, key, value)
+
+        unknown = [field for field in fields if field not in cls.__slots__]
+        if unknown:
+            raise ValueError(f"Unknown ChargeMasterEntry fields: {', '.join(unknown)}")
+        if len(set(fields)) != len(fields):
+            raise ValueError(f"Duplicate ChargeMasterEntry fields: {', '.join(fields)}")
+
+        if fields:
+            parameters = ", ".join(fields)
+        else:
+            parameters = ", ".join(f"{field}=None" for field in cls.__slots__)
+            fields = cls.__slots__
+
+        assignments = []
+        for field in cls.__slots__:
+            if field not in fields:
+                value = None
+            elif intern is not None and field in INTERNED_FIELDS:
+                value = f"intern({field})"
+            else:
+                value = field
+            assignments.append(f"    entry.{field} = {value}\n")
+
+        namespace = {
+            "new": object.__new__,
+            "slots": _EntrySlots,
+            "cls": cls,
+            "intern": intern,
+        }
+        exec(
+            f"def build({parameters}):\n"
+            f"    entry = new(slots)\n"
+            f"    entry._sort_key = None\n"
+            f"{''.join(assignments)}"
+            f"    entry.__class__ = cls\n"
+            f"    return entry\n",
+            namespace,
+        )
+        if intern is None:
+            cls._builders[key] = namespace["build"]
+        return namespace["build"]
+
+    @classmethod
+    def from_tuple(cls, values):
+        # Values must be in __slots__ order
+        return cls.builder(*cls.__slots__)(*values)
+
+    def to_tuple(self):
+        return _get_fields(self)
+
+    def sort_key(self):
+        # Flattened tuple of every slot in order: None contributes (0,) and anything
+        # else (1, value), so None sorts first exactly like the old per-slot walk.
+        # Computed once and cached until a field is set again.
+        key = self._sort_key
+        if key is None:
+            key = []
+            append = key.append
+            for value in _get_fields(self):
+                if value is None:
+                    append(0)
+                else:
+                    append(1)
+                    append(value if type(value) in _SCALAR_TYPES else _hashable(value))
+            key = tuple(key)
+            _set_attribute(self, "_sort_key", key)
+        return key
 
     def __eq__(self, other):
-        return all(map(lambda x: getattr(self, x) == getattr(other, x), self.__slots__))
+        if not isinstance(other, ChargeMasterEntry):
+            return NotImplemented
+        return (self._sort_key or self.sort_key()) == (
+            other._sort_key or other.sort_key()
+        )
+
+    def __hash__(self):
+        return hash(self._sort_key or self.sort_key())
 
     def __str__(self):
         return "\n".join([f"{key} : {getattr(self, key)}" for key in self.__slots__])
 
     def __lt__(self, other):
-        for key in self.__slots__:
-            left = getattr(self, key)
-            right = getattr(other, key)
-            if left == right:
-                continue
-            elif left is not None and right is not None:
-                return left < right
-            elif left is None and right is not None:
-                return True
-            else:
-                return False
+        if not isinstance(other, ChargeMasterEntry):
+            return NotImplemented
+        return (self._sort_key or self.sort_key()) < (
+            other._sort_key or other.sort_key()
+        )
 
     def __repr__(self):
         values = []
@@ -112,3 +589,10 @@ class ChargeMasterEntry:
                     values.append((key, value))
         params = ", ".join([f"{key}={value}" for key, value in values])
         return f"ChargeMasterEntry({params})"
+
+
+# The fields all live on _EntrySlots, but ChargeMasterEntry.__slots__ is how the
+# rest of the package lists them
+ChargeMasterEntry.__slots__ = _EntrySlots.__slots__
+
+_get_fields = attrgetter(*ChargeMasterEntry.__slots__)
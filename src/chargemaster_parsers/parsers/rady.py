@@ -1,5 +1,4 @@
 import re
-import openpyxl
 
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 
@@ -9,14 +8,19 @@ class RadyChargeMasterParser(ChargeMasterParser):
     ARTIFACT_URL = "https://www.rchsd.org/documents/2022/07/chargemaster-2.xlsx/"
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
+    # Descriptions look like "(99213) RCH OFFICE VISIT" with the CPT code in parens
+    _DESCRIPTION_REGEX = re.compile(r"^\s*(\(.+?\))?\s*RCH\s*(.+?)$")
+
     def parse_artifacts(self, artifacts):
-        wb = openpyxl.load_workbook(artifacts[RadyChargeMasterParser.ARTIFACT_URL])
+        make_entry = self.entry_builder()
+
+        artifact = self.track_artifact(self.ARTIFACT_URL, artifacts[self.ARTIFACT_URL])
         itemcode_index = None
         description_index = None
         price_index = None
-        for i, row in enumerate(wb.worksheets[0].iter_rows()):
+        for i, row in enumerate(self.xlsx_rows(artifact)):
             if i == 0:
-                header = [x.value.strip() for x in row]
+                header = [x.strip() for x in row]
                 try:
                     itemcode_index = header.index("Itemcode")
                 except ValueError as ex:
@@ -34,27 +38,26 @@ class RadyChargeMasterParser(ChargeMasterParser):
             else:
                 procedure_identifier = i
                 if itemcode_index is not None:
-                    procedure_identifier = row[itemcode_index].value
+                    procedure_identifier = row[itemcode_index]
 
-                description = row[description_index].value
+                description = row[description_index]
                 cpt_code = None
-                match = re.match(r"^\s*(\(.+?\))?\s*RCH\s*(.+?)$", description)
+                match = self._DESCRIPTION_REGEX.match(description)
                 if match:
                     cpt_code = match.groups()[0]
                     description = match.groups()[1]
                     if cpt_code:
                         cpt_code = cpt_code[1:-1]
 
-                try:
-                    price = row[price_index].value
-                    if type(price) is str:
-                        price = float(price.replace(",", ""))
-
-                    yield ChargeMasterEntry(
-                        procedure_identifier=procedure_identifier,
-                        procedure_description=description,
-                        gross_charge=price,
-                        cpt_code=cpt_code,
-                    )
-                except ValueError as ex:
-                    pass
+                price = row[price_index]
+                if type(price) is str:
+                    price = self.parse_price(price)
+                    if price is None:
+                        continue
+
+                yield make_entry(
+                    procedure_identifier=procedure_identifier,
+                    procedure_description=description,
+                    gross_charge=price,
+                    cpt_code=cpt_code,
+                )
@@ -1,16 +1,23 @@
-import re
+from functools import lru_cache
 import csv
 import io
 
+from .converters import ConverterTable, price, raw, text
+from .dedup import ExactDedup
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 
-NDC_REGEX = r"^(\d{4}-\d{4}-\d{2}|\d{5}-(?:\d{3}-\d{2}|\d{4}-\d{1,2}))"
-NUBC_REV_CODE_REGEX = r"(^[0-9]{4})\s*-\s*"
-CODE_MATCHERS = (
-    ("CPT", r"^CPT.+?([0-9]+)$"),
-    ("HCPCS", r"^HCPCS\s+(.+)$"),
-    ("DRG", r"^MS-DRG\s+V[0-9]+\s+\(FY [0-9]+\)\s+(.+?)$"),
-)
+# Payer and plan strings repeat on every row - only clean each distinct one once
+NAME_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _payer_name(payer):
+    return payer.split("[")[0].strip()
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _plan_names(plan):
+    return tuple(name.strip() for name in plan.split("[")[0].split(","))
 
 
 class ScrippsChargeMasterParser(ChargeMasterParser):
@@ -28,101 +35,138 @@ class ScrippsChargeMasterParser(ChargeMasterParser):
         SCRIPPS_MERCY_HOSPITAL_CHULA_VISTA_ARTIFACT_URL,
     )
 
-    def parse_artifacts(self, artifacts):
-        for artifact_url in self.artifact_urls:
-            cash_procedures_yielded = set()
-            reader = csv.DictReader(
-                io.TextIOWrapper(artifacts[artifact_url]), delimiter="|"
-            )
-            for row in reader:
-                location = None
-                procedure_identifier = None
-                procedure_description = None
-                ndc_code = None
-                nubc_revenue_code = None
-                cpt_code = None
-                hcpcs_code = None
-                ms_drg_code = None
-                expected_reimbursement = None
-                in_patient = None
-                payer = None
-                plan = None
-                gross_charge = None
-
-                gross_charges_outpatient = None
-                gross_charges_inpatient = None
-                expected_inpatient_reimbursement = None
-                expected_outpatient_reimbursement = None
-                min_inpatient_reimbursement = None
-                max_inpatient_reimbursement = None
-                min_outpatient_reimbursement = None
-                max_outpatient_reimbursement = None
-
-                location = row["LOCATION"].strip()
-                procedure_identifier = row["PROCEDURE CODE"]
-
-                if procedure_identifier.startswith("MS"):
-                    ms_drg_code = procedure_identifier[2:]
-                procedure_description = row["PROCEDURE DESCRIPTION"]
-
-                payer = row["PAYER"].split("[")[0].strip()
-                plan = row["PLAN"].split("[")[0].strip()
-
-                try:
-                    cash = float(row["CASH/SELF PAY"])
-                except ValueError:
-                    pass
-
-                try:
-                    gross_charges_inpatient = float(row["GROSS CHARGES IP"])
-                except ValueError:
-                    pass
-
-                try:
-                    expected_inpatient_reimbursement = float(
-                        row["IP_EXPECTED_REIMBURSMENT"]
-                    )
-                except ValueError:
-                    pass
+    _COLUMNS = (
+        ("LOCATION", text, "location"),
+        ("PROCEDURE CODE", raw, "procedure_identifier"),
+        ("PROCEDURE DESCRIPTION", raw, "procedure_description"),
+        ("PAYER", _payer_name, "payer"),
+        ("PLAN", _plan_names, "plans"),
+        ("CASH/SELF PAY", price, "cash"),
+        ("GROSS CHARGES IP", price, "gross_charges_inpatient"),
+        ("IP_EXPECTED_REIMBURSMENT", price, "expected_inpatient_reimbursement"),
+        ("GROSS CHARGES OP", price, "gross_charges_outpatient"),
+        ("OP_EXPECTED_REIMBURSMENT", price, "expected_outpatient_reimbursement"),
+        ("IP_MIN", price, "min_inpatient_reimbursement"),
+        ("IP_MAX", price, "max_inpatient_reimbursement"),
+        ("OP_MIN", price, "min_outpatient_reimbursement"),
+        ("OP_MAX", price, "max_outpatient_reimbursement"),
+    )
 
-                try:
-                    gross_charges_outpatient = float(row["GROSS CHARGES OP"])
-                except ValueError:
-                    pass
+    def __init__(self, cash_dedup=None, **kwargs):
+        # cash_dedup is one of dedup's strategies for remembering which procedures
+        # a file's cash price has been yielded for, cleared at the start of each
+        # file - an ExactDedup by default. Its stats() report what it took.
+        super().__init__(**kwargs)
+        self.cash_dedup = cash_dedup
 
-                try:
-                    expected_outpatient_reimbursement = float(
-                        row["OP_EXPECTED_REIMBURSMENT"]
-                    )
-                except ValueError:
-                    pass
-
-                try:
-                    min_inpatient_reimbursement = float(row["IP_MIN"])
-                except ValueError:
-                    pass
-
-                try:
-                    max_inpatient_reimbursement = float(row["IP_MAX"])
-                except ValueError:
-                    pass
-
-                try:
-                    min_outpatient_reimbursement = float(row["OP_MIN"])
-                except ValueError:
-                    pass
-
-                try:
-                    max_outpatient_reimbursement = float(row["OP_MAX"])
-                except ValueError:
-                    pass
-
-                # Every line references cash but make sure to only yield it once
-                if (
-                    procedure_identifier not in cash_procedures_yielded
-                    and cash is not None
-                ):
-                    yield ChargeMasterEntry(
+    def _cash_procedures(self):
+        if self.cash_dedup is None:
+            return ExactDedup()
+        self.cash_dedup.clear()
+        return self.cash_dedup
+
+    def parse_artifacts(self, artifacts):
+        for artifact_url, artifact in self.work_units(artifacts):
+            yield from self.parse_artifact(artifact_url, artifact)
+
+    def work_units(self, artifacts):
+        # Every hospital's file is required, in the same order each time
+        return [(url, artifacts[url]) for url in self.artifact_urls]
+
+    def parse_artifacts_ranged(
+        self, artifacts, workers=None, range_size=None, chunk_size=None
+    ):
+        # parse_artifacts with every file split into byte ranges of whole records,
+        # each parsed in a worker process - up to workers at once, one per core by
+        # default. Entries come out exactly as parse_artifacts yields them.
+        from ..orchestrator import DEFAULT_CHUNK_SIZE, parse_byte_ranges
+        from .csv_ranges import DEFAULT_RANGE_SIZE
+
+        if range_size is None:
+            range_size = DEFAULT_RANGE_SIZE
+        if chunk_size is None:
+            chunk_size = DEFAULT_CHUNK_SIZE
+
+        # Each range only yields cash once per procedure within itself - the first
+        # range to get to a procedure is the one whose cash entry the file keeps
+        current_url = None
+        cash_procedures = None
+        for url, entry in parse_byte_ranges(
+            self, artifacts, workers, range_size, chunk_size, b"|"
+        ):
+            if url != current_url:
+                current_url = url
+                cash_procedures = self._cash_procedures()
+            if entry.payer == "Cash" and entry.plan is None:
+                if not cash_procedures.add(entry.procedure_identifier):
+                    continue
+            yield entry
+
+    def parse_artifact(self, url, artifact):
+        make_entry = self.entry_builder()
+
+        cash_procedures = self._cash_procedures()
+        reader = self.track_rows(
+            csv.reader(
+                io.TextIOWrapper(self.track_artifact(url, artifact)),
+                delimiter="|",
+            )
+        )
+        header = next(reader, None)
+        if header is None:
+            return
+        convert = ConverterTable.resolve(header, self._COLUMNS).convert
+
+        for row in reader:
+            if not row:
+                # Blank line
+                continue
+
+            ndc_code = None
+            nubc_revenue_code = None
+            cpt_code = None
+            hcpcs_code = None
+            ms_drg_code = None
+
+            (
+                location,
+                procedure_identifier,
+                procedure_description,
+                payer,
+                plans,
+                cash,
+                gross_charges_inpatient,
+                expected_inpatient_reimbursement,
+                gross_charges_outpatient,
+                expected_outpatient_reimbursement,
+                min_inpatient_reimbursement,
+                max_inpatient_reimbursement,
+                min_outpatient_reimbursement,
+                max_outpatient_reimbursement,
+            ) = convert(row)
+
+            if procedure_identifier.startswith("MS"):
+                ms_drg_code = procedure_identifier[2:]
+
+            # Every line references cash but make sure to only yield it once
+            if cash is not None and cash_procedures.add(procedure_identifier):
+                yield make_entry(
+                    location=location,
+                    procedure_identifier=procedure_identifier,
+                    procedure_description=procedure_description,
+                    ndc_code=ndc_code,
+                    nubc_revenue_code=nubc_revenue_code,
+                    cpt_code=cpt_code,
+                    hcpcs_code=hcpcs_code,
+                    ms_drg_code=ms_drg_code,
+                    in_patient=True,
+                    payer="Cash",
+                    gross_charge=cash,
+                )
+
+            for plan in plans:
+                if gross_charges_inpatient:
+                    yield make_entry(
                         location=location,
                         procedure_identifier=procedure_identifier,
                         procedure_description=procedure_description,
@@ -131,46 +175,29 @@ class ScrippsChargeMasterParser(ChargeMasterParser):
                         cpt_code=cpt_code,
                         hcpcs_code=hcpcs_code,
                         ms_drg_code=ms_drg_code,
+                        max_reimbursement=max_inpatient_reimbursement,
+                        min_reimbursement=min_inpatient_reimbursement,
+                        expected_reimbursement=expected_inpatient_reimbursement,
                         in_patient=True,
-                        payer="Cash",
-                        gross_charge=cash,
+                        payer=payer,
+                        plan=plan,
+                        gross_charge=gross_charges_inpatient,
+                    )
+                if gross_charges_outpatient:
+                    yield make_entry(
+                        location=location,
+                        procedure_identifier=procedure_identifier,
+                        procedure_description=procedure_description,
+                        ndc_code=ndc_code,
+                        nubc_revenue_code=nubc_revenue_code,
+                        cpt_code=cpt_code,
+                        hcpcs_code=hcpcs_code,
+                        ms_drg_code=ms_drg_code,
+                        max_reimbursement=max_outpatient_reimbursement,
+                        min_reimbursement=min_outpatient_reimbursement,
+                        expected_reimbursement=expected_outpatient_reimbursement,
+                        in_patient=False,
+                        payer=payer,
+                        plan=plan,
+                        gross_charge=gross_charges_outpatient,
                     )
-                    cash_procedures_yielded.add(procedure_identifier)
-
-                for plan in plan.split(","):
-                    if gross_charges_inpatient:
-                        yield ChargeMasterEntry(
-                            location=location,
-                            procedure_identifier=procedure_identifier,
-                            procedure_description=procedure_description,
-                            ndc_code=ndc_code,
-                            nubc_revenue_code=nubc_revenue_code,
-                            cpt_code=cpt_code,
-                            hcpcs_code=hcpcs_code,
-                            ms_drg_code=ms_drg_code,
-                            max_reimbursement=max_inpatient_reimbursement,
-                            min_reimbursement=min_inpatient_reimbursement,
-                            expected_reimbursement=expected_inpatient_reimbursement,
-                            in_patient=True,
-                            payer=payer,
-                            plan=plan.strip(),
-                            gross_charge=gross_charges_inpatient,
-                        )
-                    if gross_charges_outpatient:
-                        yield ChargeMasterEntry(
-                            location=location,
-                            procedure_identifier=procedure_identifier,
-                            procedure_description=procedure_description,
-                            ndc_code=ndc_code,
-                            nubc_revenue_code=nubc_revenue_code,
-                            cpt_code=cpt_code,
-                            hcpcs_code=hcpcs_code,
-                            ms_drg_code=ms_drg_code,
-                            max_reimbursement=max_outpatient_reimbursement,
-                            min_reimbursement=min_outpatient_reimbursement,
-                            expected_reimbursement=expected_outpatient_reimbursement,
-                            in_patient=False,
-                            payer=payer,
-                            plan=plan.strip(),
-                            gross_charge=gross_charges_outpatient,
-                        )
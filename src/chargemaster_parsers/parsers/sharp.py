@@ -1,5 +1,4 @@
 import re
-import openpyxl
 
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 
@@ -222,50 +221,63 @@ class SharpChargeMasterParser(ChargeMasterParser):
 
     _ARTIFACT_URL_LOCATION_REGEX = re.compile(r".+?chargemaster/(.+?)/upload.+?")
 
-    @staticmethod
-    def find_artifacts():
-        options = [
-            ("grossmont", "SGH"),
-            ("chula-vista", "SCV"),
-            ("coronado", "SCO"),
-            ("memorial", "SMH"),
+    # Facilities and the prefix of their workbook names, numbered 3000 to 4999
+    _FACILITY_PREFIXES = (
+        ("grossmont", "SGH"),
+        ("chula-vista", "SCV"),
+        ("coronado", "SCO"),
+        ("memorial", "SMH"),
+    )
+
+    @classmethod
+    def candidate_urls(
+        cls, base_url="https://www.sharp.com", numbers=range(3000, 5000)
+    ):
+        return [
+            f"{base_url}/chargemaster/{center}/upload/{prefix}{number}.xlsx"
+            for center, prefix in cls._FACILITY_PREFIXES
+            for number in numbers
         ]
 
-        import requests
-        import time
+    @classmethod
+    def find_artifacts(
+        cls,
+        cache_path=None,
+        refresh=False,
+        base_url="https://www.sharp.com",
+        numbers=range(3000, 5000),
+        **kwargs,
+    ):
+        # Sweeps every candidate workbook name and returns the urls that exist, to
+        # refresh ARTIFACT_URLS with - python -m chargemaster_parsers.probe Sharp
+        # prints them ready to paste. kwargs go to Prober; with cache_path, later
+        # sweeps only probe the names that haven't been checked yet.
+        from ..probe import Prober
 
-        for center, abbr in options:
-            for i in range(3000, 5000):
-                url = (
-                    f"https://www.sharp.com/chargemaster/{center}/upload/{abbr}{i}.xlsx"
-                )
-                request = requests.get(url)
-                time.sleep(1)
-                try:
-                    request.raise_for_status()
-                    print(url)
-                except requests.HTTPError:
-                    pass
+        prober = Prober(cache_path=cache_path, **kwargs)
+        return prober.find(cls.candidate_urls(base_url, numbers), refresh)
 
     def parse_artifacts(self, artifacts):
+        make_entry = self.entry_builder()
+
         for artifact_url, artifact in artifacts.items():
             if artifact_url in self.artifact_urls:
                 matcher = self._ARTIFACT_URL_LOCATION_REGEX.match(artifact_url)
                 if matcher:
                     location = self._LOCATION_FORMAL_NAMES[matcher.groups()[0]]
-                    wb = openpyxl.load_workbook(artifact)
+                    artifact = self.track_artifact(artifact_url, artifact)
                     (
                         charge_code_column,
                         charge_code_description_column,
                         charge_column,
                     ) = (None, None, None)
-                    for i, row in enumerate(wb.worksheets[0].iter_rows()):
+                    for i, row in enumerate(self.xlsx_rows(artifact, max_col=3)):
                         values = []
-                        for cell in row[:3]:
-                            if type(cell.value) in (int, float):
-                                values.append(cell.value)
-                            elif cell.value:
-                                values.append(cell.value.strip())
+                        for value in row:
+                            if type(value) in (int, float):
+                                values.append(value)
+                            elif value:
+                                values.append(value.strip())
                             else:
                                 values.append(None)
 
@@ -285,21 +297,15 @@ class SharpChargeMasterParser(ChargeMasterParser):
                                     charge_column,
                                 ) = (0, 1, 2)
                         else:
-                            charge_code = row[charge_code_column].value
+                            charge_code = row[charge_code_column]
                             charge_code_description = row[
                                 charge_code_description_column
-                            ].value
-                            charge = row[charge_column].value
-                            if charge_code:
-                                try:
-                                    charge = float(
-                                        charge.replace("$", "").replace(",", "")
-                                    )
-                                    yield ChargeMasterEntry(
-                                        location=location,
-                                        procedure_identifier=charge_code,
-                                        procedure_description=charge_code_description,
-                                        gross_charge=charge,
-                                    )
-                                except ValueError:
-                                    pass
+                            ]
+                            charge = self.parse_price(row[charge_column])
+                            if charge_code and charge is not None:
+                                yield make_entry(
+                                    location=location,
+                                    procedure_identifier=charge_code,
+                                    procedure_description=charge_code_description,
+                                    gross_charge=charge,
+                                )
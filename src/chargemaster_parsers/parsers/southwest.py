@@ -1,15 +1,42 @@
+from .codes import CPT, HCPCS, classify_cpt_hcpcs
+from .converters import (
+    ConverterTable,
+    leading_price_unless,
+    price,
+    price_unless,
+    text,
+)
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 import csv
-import re
 import io
 
+# "-1" means N/A for that institution, both in the contract rates and the gross and
+# cash prices
+_NOT_APPLICABLE = price_unless("-1")
+_CONTRACT_RATE = leading_price_unless("-1")
+
 
 class SouthwestChargeMasterParser(ChargeMasterParser):
     INSTITUTION_NAME = "Southwest"
     ARTIFACT_URL = "https://uhsfilecdn.eskycity.net/ac/233059262_southwest-healthcare-system_standardcharges.csv"
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
+    _COLUMNS = (
+        ("Description", text, "procedure_description"),
+        ("CDM", text, "procedure_identifier"),
+        ("CPT/HCPCS (If Applicable)", text, "cpt_hcpcs_code"),
+        ("DRG (If Applicable)", text, "ms_drg_code"),
+        ("EAPG (If Applicable)", text, "EAPG (If Applicable)"),
+        ("APC (If Applicable)", text, "APC (If Applicable)"),
+        ("Gross Charge", _NOT_APPLICABLE, "gross_charge"),
+        ("Cash Price", _NOT_APPLICABLE, "cash_price"),
+        ("Minimum", price, "min_reimbursement"),
+        ("Maximum", price, "max_reimbursement"),
+    )
+
     def parse_artifacts(self, artifacts):
+        make_entry = self.entry_builder()
+
         KEY_COLUMNS = (
             "Facility",
             "Description",
@@ -26,104 +53,70 @@ class SouthwestChargeMasterParser(ChargeMasterParser):
             "Maximum",
         )
 
-        reader = csv.reader(io.TextIOWrapper(artifacts[self.ARTIFACT_URL]))
-        headers = None
-        for row in reader:
-            if headers is None:
+        reader = csv.reader(
+            io.TextIOWrapper(
+                self.track_artifact(self.ARTIFACT_URL, artifacts[self.ARTIFACT_URL])
+            )
+        )
+        convert = None
+        for row in self.track_rows(reader):
+            if convert is None:
                 # We're hunting for the header row - if we find at least five of the candidate columns it's good
-                count_good_columns = 0
-                temp_headers = {}
-                for i, value in enumerate(row):
-                    # Note the position of the candidate column header
-                    temp_headers[i] = value.strip()
-
-                    # Check to see if we recognize this colum header
-                    if temp_headers[i] in KEY_COLUMNS:
-                        count_good_columns += 1
+                headers = [value.strip() for value in row]
+                count_good_columns = sum(1 for name in headers if name in KEY_COLUMNS)
 
                 # We found a good header row, keep it and start collecting data
                 if count_good_columns > 5:
-                    headers = temp_headers
+                    columns = {name: index for index, name in enumerate(headers)}
+                    convert = ConverterTable.resolve(columns, self._COLUMNS).convert
+                    # These are contract rates
+                    payers = ConverterTable(
+                        (index, _CONTRACT_RATE, name)
+                        for name, index in columns.items()
+                        if name not in KEY_COLUMNS
+                    )
 
             else:
-                row_dict_values = {}
-                for index, column in headers.items():
-                    value = row[index].strip()
-                    row_dict_values[column] = value
-
-                procedure_identifier = None
-                procedure_description = None
                 ms_drg_code = None
                 cpt_code = None
                 hcpcs_code = None
-                ndc_code = None
-                max_reimbursement = None
-                min_reimbursement = None
-                expected_reimbursement = None
-                in_patient = None
-                payer = None
-                plan = None
-                gross_charge = None
-                nubc_revenue_code = None
                 extra_data = {}
 
-                expected_reimbursement = {}
-
-                for key, value in row_dict_values.items():
-                    if key not in KEY_COLUMNS:
-                        # These are contract rates - "-1" means N/A for that institution so skip
-                        if value and value != "-1":
-                            value = value.replace("$", "")
-                            value = value.split(" ")[0]
-                            expected_reimbursement[key] = float(value.replace(",", ""))
-
-                procedure_description = row_dict_values["Description"]
-                procedure_identifier = row_dict_values["CDM"]
-
-                temp = row_dict_values["CPT/HCPCS (If Applicable)"]
-                if temp:
-                    if re.match(r"[0-9]{4}[0-9A-Za-z]$", temp):
-                        cpt_code = temp
-                    else:
-                        hcpcs_code = temp
-
-                temp = row_dict_values["DRG (If Applicable)"]
-                if temp:
-                    if temp.isnumeric():
+                (
+                    procedure_description,
+                    procedure_identifier,
+                    cpt_hcpcs_code,
+                    drg_code,
+                    eapg_code,
+                    apc_code,
+                    gross_charge,
+                    cash_price,
+                    min_reimbursement,
+                    max_reimbursement,
+                ) = convert(row)
+
+                expected_reimbursement = dict(payers.items(row))
+
+                code_type, temp = classify_cpt_hcpcs(cpt_hcpcs_code)
+                if code_type == CPT:
+                    cpt_code = temp
+                elif code_type == HCPCS:
+                    hcpcs_code = temp
+
+                if drg_code:
+                    if drg_code.isnumeric():
                         # MS-DRG < 999 - to be formally correct pad to 3
-                        temp = str(temp).zfill(3)
-                    ms_drg_code = temp
-
-                temp = row_dict_values["EAPG (If Applicable)"]
-                if temp:
-                    extra_data["EAPG (If Applicable)"] = temp
-
-                temp = row_dict_values["APC (If Applicable)"]
-                if temp:
-                    extra_data["APC (If Applicable)"] = temp
-
-                temp = row_dict_values["Rev Code (If Applicable)"]
-                if temp:
-                    nubc_revenue_code = temp
-
-                temp = row_dict_values["Gross Charge"]
-                if temp:
-                    if temp != "-1":
-                        gross_charge = float(temp.replace(",", ""))
+                        drg_code = str(drg_code).zfill(3)
+                    ms_drg_code = drg_code
 
-                temp = row_dict_values["Cash Price"]
-                if temp:
-                    if temp != "-1":
-                        temp = float(temp.replace(",", ""))
-                        expected_reimbursement["Cash"] = temp
+                if eapg_code:
+                    extra_data["EAPG (If Applicable)"] = eapg_code
 
-                temp = row_dict_values["Minimum"]
-                if temp:
-                    min_reimbursement = float(temp.replace(",", ""))
+                if apc_code:
+                    extra_data["APC (If Applicable)"] = apc_code
 
-                temp = row_dict_values["Maximum"]
-                if temp:
-                    max_reimbursement = float(temp.replace(",", ""))
+                if cash_price is not None:
+                    expected_reimbursement["Cash"] = cash_price
 
                 if not procedure_identifier:
                     # Make up a unique identifier
@@ -139,7 +132,7 @@ class SouthwestChargeMasterParser(ChargeMasterParser):
 
                 for payer, expected in expected_reimbursement.items():
                     if payer == "Cash":
-                        yield ChargeMasterEntry(
+                        yield make_entry(
                             procedure_identifier=procedure_identifier,
                             procedure_description=procedure_description,
                             gross_charge=expected,
@@ -150,7 +143,7 @@ class SouthwestChargeMasterParser(ChargeMasterParser):
                             payer="Cash",
                         )
                     else:
-                        yield ChargeMasterEntry(
+                        yield make_entry(
                             procedure_identifier=procedure_identifier,
                             procedure_description=procedure_description,
                             gross_charge=gross_charge,
@@ -1,22 +1,58 @@
 import re
-import json
+import logging
 import pprint
 
+from .codes import CPT, HCPCS, classify_code
+from .json_stream import decode_chunks, iter_sections
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 
+logger = logging.getLogger(__name__)
+
 
 class StanfordChargeMasterParser(ChargeMasterParser):
     INSTITUTION_NAME = "Stanford"
     ARTIFACT_URL = "https://stanfordhealthcare.org/content/dam/SHC/patientsandvisitors/pricingtransparency/946174066_stanford-health-care_standardcharges.json"
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
+    # 2: payer specific charges carry the de-identified minimum and maximum, and
+    # outpatient ones are yielded
+    PARSER_VERSION = 2
+
+    def _index_charges(self, rows, code_key, charge_key, index, pick):
+        # Adds each row's charge to index by its code, keeping pick(old, new) when
+        # a code comes up more than once
+        parse_price = self.parse_price
+        for entry in self.track_rows(rows):
+            code = entry.get(code_key)
+            charge = parse_price(entry.get(charge_key))
+            if code is None or charge is None:
+                continue
+            code = str(code).strip()
+            current = index.get(code)
+            index[code] = charge if current is None else pick(current, charge)
+
     def parse_artifacts(self, artifacts):
-        hcpcs_gross_charges = dict()
+        make_entry = self.entry_builder()
+
+        # De-identified minimum and maximum charges by MS-DRG and by APC, filled in
+        # as those sections stream by so the payer specific sections after them are
+        # joined on the code without a second pass or holding any payer rows. The
+        # de-identified sections come first in Stanford's file - a payer section
+        # ahead of them would just go without.
+        drg_minimums = {}
+        drg_maximums = {}
+        apc_minimums = {}
+        apc_maximums = {}
+
+        # Sections are decoded a row at a time as they're read - the ones passed
+        # over below are scanned past without being decoded at all
+        artifact = self.track_artifact(self.ARTIFACT_URL, artifacts[self.ARTIFACT_URL])
+        sections = iter_sections(decode_chunks(artifact, encoding="utf-8-sig"))
 
-        for section_name, section in json.load(artifacts[self.ARTIFACT_URL]).items():
+        for section_name, section in sections:
             if section_name.strip() == "File Summary":
-                effective_date = section[0]["Prices Posted And Effective"]
-                print(f"Effective Date: {effective_date}")
+                effective_date = next(section)["Prices Posted And Effective"]
+                logger.info("Effective date: %s", effective_date)
                 # [{'Discounted Cash Price': 'This section presents information regarding '
                 #                            'discounted cash pricing for those patients who '
                 #                            'decide to pay without insurance coverage.',
@@ -64,7 +100,7 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 #  'Procedure Description': 'SCREW MATRIXMIDFACE 1.55MM',
                 #  'Quantity': 'N/A'},
                 codes = set()
-                for entry in section:
+                for entry in self.track_rows(section):
                     cpt_code = None
                     hcpcs_code = None
                     try:
@@ -77,16 +113,15 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                         # Some rows are empty for some reason
                         continue
 
-                    code = entry.get("Code", None)
-                    if code:
-                        if code.lower().strip().startswith("hcpcs"):
-                            _, hcpcs_code = code.split(" ")
-                        elif code.lower().strip().startswith("cpt"):
-                            _, cpt_code = code.split(" ")
+                    code_type, code = classify_code(entry.get("Code", None))
+                    if code_type == HCPCS:
+                        hcpcs_code = code
+                    elif code_type == CPT:
+                        cpt_code = code
 
                     # Always yield the cash rates - HCPCS codes will get payer
                     # specific values in a later section
-                    yield ChargeMasterEntry(
+                    yield make_entry(
                         procedure_identifier=procedure_identifier,
                         procedure_description=procedure_description,
                         gross_charge=cash_price,
@@ -115,7 +150,7 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 #  'Payer Specific Negotiated Charge': 1607.18,
                 #  'Payer Specific Negotiated Charge - Max': 1852.55,
                 #  'Payer Specific Negotiated Charge - Min': 99.03},
-                for entry in section:
+                for entry in self.track_rows(section):
                     if not entry:
                         continue
 
@@ -129,7 +164,7 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                     min_reimbursement = entry["Payer Specific Negotiated Charge - Min"]
                     location = entry["Location"]
 
-                    yield ChargeMasterEntry(
+                    yield make_entry(
                         procedure_identifier=procedure_identifier,
                         procedure_description=procedure_description,
                         gross_charge=gross_charge,
@@ -153,7 +188,13 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 #  {'De-Identified Minimum Negotiated Charge': 64864.0,
                 #   'Description': 'Other Multiple Significant Trauma With Cc',
                 #   'MS-DRG': '964'},
-                pass
+                self._index_charges(
+                    section,
+                    "MS-DRG",
+                    "De-Identified Minimum Negotiated Charge",
+                    drg_minimums,
+                    min,
+                )
             elif (
                 section_name.strip()
                 == "Inpatient De-identified Maximum Negotiated Charge"
@@ -163,7 +204,13 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 #  'Description': 'Non-Extensive O.R. Procedures Unrelated To Principal '
                 #                 'Diagnosis With Cc',
                 #  'MS-DRG': '988'},
-                pass
+                self._index_charges(
+                    section,
+                    "MS-DRG",
+                    "De-Identified Maximum Negotiated Charge",
+                    drg_maximums,
+                    max,
+                )
             elif section_name.strip().startswith("Inpatient Payer Specific Charge"):
                 # Valid keys: ['Payer', 'MS-DRG', 'Description', 'Payer Specific Negotiated Charge']
                 # Example:
@@ -171,18 +218,22 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 #   'MS-DRG': '965',
                 #   'Payer': 'HealthNet',
                 #   'Payer Specific Negotiated Charge': 159516.0}
-                for entry in section:
+                for entry in self.track_rows(section):
                     if not entry:
                         continue
 
-                    yield ChargeMasterEntry(
-                        procedure_identifier=entry["MS-DRG"],
+                    ms_drg_code = entry["MS-DRG"]
+                    code = str(ms_drg_code).strip()
+                    yield make_entry(
+                        procedure_identifier=ms_drg_code,
                         procedure_description=entry["Description"],
-                        ms_drg_code=entry["MS-DRG"],
+                        ms_drg_code=ms_drg_code,
                         payer=entry["Payer"],
                         expected_reimbursement=entry[
                             "Payer Specific Negotiated Charge"
                         ],
+                        min_reimbursement=drg_minimums.get(code),
+                        max_reimbursement=drg_maximums.get(code),
                     )
 
             elif (
@@ -194,7 +245,13 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 # {'APC': 'N905',
                 #  'De-Identified Minimum Negotiated Charge': 4.0,
                 #  'Description': 'Not Recognized by OPPS'}
-                pass
+                self._index_charges(
+                    section,
+                    "APC",
+                    "De-Identified Minimum Negotiated Charge",
+                    apc_minimums,
+                    min,
+                )
             elif (
                 section_name.strip()
                 == "Outpatient De-identified Maximum Negotiated Charge"
@@ -204,7 +261,13 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 # {'APC': 'N905',
                 #  'De-Identified Maximum Negotiated Charge': 4.0,
                 #  'Description': 'Not Recognized by OPPS'}
-                pass
+                self._index_charges(
+                    section,
+                    "APC",
+                    "De-Identified Maximum Negotiated Charge",
+                    apc_maximums,
+                    max,
+                )
             elif section_name.strip().startswith("Outpatient Payer Specific Charge"):
                 # Valid keys:  ['Payer', 'APC', 'Description', 'Payer Specific Negotiated Charge']
                 # Example:
@@ -212,6 +275,21 @@ class StanfordChargeMasterParser(ChargeMasterParser):
                 #   'Description': 'Packaged Services',
                 #   'Payer': 'MultiPlan/PHCS/Beech Street',
                 #   'Payer Specific Negotiated Charge': 179.0}
-                pass
+                for entry in self.track_rows(section):
+                    if not entry:
+                        continue
+
+                    apc = entry["APC"]
+                    code = str(apc).strip()
+                    yield make_entry(
+                        procedure_identifier=apc,
+                        procedure_description=entry["Description"],
+                        payer=entry["Payer"],
+                        expected_reimbursement=entry[
+                            "Payer Specific Negotiated Charge"
+                        ],
+                        min_reimbursement=apc_minimums.get(code),
+                        max_reimbursement=apc_maximums.get(code),
+                    )
 
         return []
@@ -1,15 +1,34 @@
+from .codes import CPT, classify_cpt_hcpcs
+from .converters import ConverterTable, leading_price_unless, price, text
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 import csv
 import re
 import io
 
+# Contract rates - "NA" means N/A for that institution
+_CONTRACT_RATE = leading_price_unless("NA")
+
 
 class TriCityChargeMasterParser(ChargeMasterParser):
     INSTITUTION_NAME = "Tri-City"
     ARTIFACT_URL = "https://www.tricitymed.org/wp-content/uploads/2022/11/952126937_Tri-City-Medical-Center_standardcharges.csv"
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
+    _COLUMNS = (
+        ("Code Type", text, "code_type"),
+        ("Code", text, "code"),
+        ("Description", text, "procedure_description"),
+        ("Patient Type", text, "patient_type"),
+        ("Rev Code", text, "nubc_revenue_code"),
+        ("Gross Charge", price, "gross_charge"),
+        ("Cash Price", price, "cash_price"),
+        ("Min ($)", price, "min_reimbursement"),
+        ("Max ($)", price, "max_reimbursement"),
+    )
+
     def parse_artifacts(self, artifacts):
+        make_entry = self.entry_builder()
+
         KEY_COLUMNS = (
             "Code Type",
             "Code",
@@ -24,66 +43,56 @@ class TriCityChargeMasterParser(ChargeMasterParser):
 
         reader = csv.reader(
             io.TextIOWrapper(
-                artifacts[self.ARTIFACT_URL], encoding="cp1252", newline=""
+                self.track_artifact(self.ARTIFACT_URL, artifacts[self.ARTIFACT_URL]),
+                encoding="cp1252",
+                newline="",
             )
         )
-        headers = None
-        for row in reader:
-            if headers is None:
+        convert = None
+        for row in self.track_rows(reader):
+            if convert is None:
                 # We're hunting for the header row - if we find at least five of the candidate columns it's good
-                count_good_columns = 0
-                temp_headers = {}
-                for i, value in enumerate(row):
-                    # Note the position of the candidate column header
-                    temp_headers[i] = value.strip()
-
-                    # Check to see if we recognize this colum header
-                    if temp_headers[i] in KEY_COLUMNS:
-                        count_good_columns += 1
+                headers = [value.strip() for value in row]
+                count_good_columns = sum(1 for name in headers if name in KEY_COLUMNS)
 
                 # We found a good header row, keep it and start collecting data
                 if count_good_columns > 5:
-                    headers = temp_headers
+                    columns = {name: index for index, name in enumerate(headers)}
+                    convert = ConverterTable.resolve(columns, self._COLUMNS).convert
+                    # A column can list several payers, one per line
+                    payers = ConverterTable(
+                        (
+                            index,
+                            _CONTRACT_RATE,
+                            tuple(payer.strip() for payer in name.split("\n")),
+                        )
+                        for name, index in columns.items()
+                        if name not in KEY_COLUMNS
+                    )
 
             else:
-                row_dict_values = {}
-                for index, column in headers.items():
-                    value = row[index].strip()
-                    row_dict_values[column] = value
-
-                procedure_identifier = None
-                procedure_description = None
                 ms_drg_code = None
                 cpt_code = None
                 hcpcs_code = None
-                max_reimbursement = None
-                min_reimbursement = None
-                expected_reimbursement = None
-                in_patient = None
-                gross_charge = None
-                nubc_revenue_code = None
                 extra_data = {}
 
+                (
+                    code_type,
+                    code,
+                    procedure_description,
+                    patient_type,
+                    nubc_revenue_code,
+                    gross_charge,
+                    cash_price,
+                    min_reimbursement,
+                    max_reimbursement,
+                ) = convert(row)
+
                 expected_reimbursement = {}
+                for column_payers, rate in payers.items(row):
+                    for payer in column_payers:
+                        expected_reimbursement[payer] = rate
 
-                for key, value in row_dict_values.items():
-                    if key not in KEY_COLUMNS:
-                        for payer in key.split("\n"):
-                            # These are contract rates - "-1" means N/A for that institution so skip
-                            if value and value != "NA":
-                                value = value.replace("$", "")
-                                value = value.split(" ")[0]
-                                try:
-                                    expected_reimbursement[payer.strip()] = float(
-                                        value.replace(",", "")
-                                    )
-                                except ValueError:
-                                    pass
-
-                procedure_description = row_dict_values["Description"]
-
-                code_type = row_dict_values["Code Type"]
-                code = row_dict_values["Code"]
                 procedure_identifier = code_type + "_" + code
 
                 if procedure_description:
@@ -95,7 +104,8 @@ class TriCityChargeMasterParser(ChargeMasterParser):
                 if code_type == "DRG":
                     ms_drg_code = str(int(code)).rjust(3, "0")
                 elif code_type == "CDM":
-                    if re.match(r"^[0-9]{4}[0-9A-Za-z]$", code):
+                    cdm_code_type, _ = classify_cpt_hcpcs(code)
+                    if cdm_code_type == CPT:
                         cpt_code = code
                     elif "|" in code:
                         # These are likely two HCPCs combined with | but rare
@@ -107,25 +117,19 @@ class TriCityChargeMasterParser(ChargeMasterParser):
                     extra_data["Code Type"] = code_type
                     extra_data["Code"] = code
 
-                temp = row_dict_values["Rev Code"]
-                if temp and temp != "NA":
-                    nubc_revenue_code = temp
-                in_patient = row_dict_values["Patient Type"] == "IP"
+                if not nubc_revenue_code or nubc_revenue_code == "NA":
+                    nubc_revenue_code = None
+                in_patient = patient_type == "IP"
 
-                gross_charge = self.parse_price(row_dict_values["Gross Charge"])
-                cash_price = self.parse_price(row_dict_values["Cash Price"])
                 if cash_price is not None:
                     expected_reimbursement["Cash"] = cash_price
 
-                min_reimbursement = self.parse_price(row_dict_values["Min ($)"])
-                max_reimbursement = self.parse_price(row_dict_values["Max ($)"])
-
                 if not extra_data:
                     extra_data = None
 
                 for payer, expected in expected_reimbursement.items():
                     if payer == "Cash":
-                        yield ChargeMasterEntry(
+                        yield make_entry(
                             procedure_identifier=procedure_identifier,
                             procedure_description=procedure_description,
                             gross_charge=expected,
@@ -138,7 +142,7 @@ class TriCityChargeMasterParser(ChargeMasterParser):
                             in_patient=in_patient,
                         )
                     else:
-                        yield ChargeMasterEntry(
+                        yield make_entry(
                             procedure_identifier=procedure_identifier,
                             procedure_description=procedure_description,
                             gross_charge=gross_charge,
@@ -1,5 +1,5 @@
 from . import ChargeMasterEntry, ChargeMasterParser
-import json
+from .json_stream import decode_chunks, iter_sections
 
 
 class UCIChargeMasterParser(ChargeMasterParser):
@@ -7,14 +7,22 @@ class UCIChargeMasterParser(ChargeMasterParser):
     ARTIFACT_URL = "https://www.ucihealth.org/-/media/files/xlsx/patients-visitors/952226406-regentsoftheuniversityofcaliforniaatirvinehospital-standardcharges.json"
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
+    def work_units(self, artifacts):
+        # Every artifact given is parsed, whatever its url
+        return list(artifacts.items())
+
     def parse_artifacts(self, artifacts):
+            make_entry = self.entry_builder()
+
             for artifact_url, artifact in artifacts.items():
-                data_dict = json.load(artifact)
+                artifact = self.track_artifact(artifact_url, artifact)
+                # Decoded a row at a time - sections that aren't used are scanned past
+                sections = iter_sections(decode_chunks(artifact, encoding="utf-8-sig"))
                 prev_hcpcs = None
 
-                for category, entries in data_dict.items():
+                for category, entries in sections:
                     if category == 'File Summary':
-                        effective_date = entries[0]["Prices Posted And Effective"]
+                        effective_date = next(entries)["Prices Posted And Effective"]
                         # "Hospital Name": "University of California Irvine Medical Center",
                         # "Prices Posted And Effective": "8/1/2022 12:00:00 AM",
                         # "File Disclaimer": "The information contained in this file is intended for informational purposes only and does not represent any obligation or agreement.",
@@ -30,7 +38,7 @@ class UCIChargeMasterParser(ChargeMasterParser):
                     # other cateogories, such as 'Outpatient De-identified Negotiated Charge', but would require 
                     # some more research.
                     if category == 'Gross Charges':
-                        for entry in entries:
+                        for entry in self.track_rows(entries):
                             procedure_identifier = entry.get("Itemcode", None) 
                             procedure_description = entry.get("Description", None)
                             hcpcs_code = entry.get("CDM HCPCS", None)
@@ -38,27 +46,27 @@ class UCIChargeMasterParser(ChargeMasterParser):
                             cash_price = entry.get("UCI HB OUTPATIENT RATE Discounted Cash Price", None)
                             nubc_revenue_code = entry.get("CDM Revenue Code", None)
 
-                            if uci_hb_full_price != 'N/A': # add UCI HB payer entry only if there's a price listed
-                                if uci_hb_full_price is not None:
-                                    yield ChargeMasterEntry(
-                                        procedure_identifier = procedure_identifier,
-                                        procedure_description = procedure_description,
-                                        hcpcs_code = hcpcs_code,
-                                        in_patient = False,
-                                        payer = 'UCI HB',
-                                        gross_charge = float(uci_hb_full_price.replace(',', '')),
-                                        nubc_revenue_code = nubc_revenue_code,
-                                    )
+                            uci_hb_full_price = self.parse_price(uci_hb_full_price)
+                            if uci_hb_full_price is not None: # add UCI HB payer entry only if there's a price listed ('N/A' parses to None)
+                                yield make_entry(
+                                    procedure_identifier = procedure_identifier,
+                                    procedure_description = procedure_description,
+                                    hcpcs_code = hcpcs_code,
+                                    in_patient = False,
+                                    payer = 'UCI HB',
+                                    gross_charge = uci_hb_full_price,
+                                    nubc_revenue_code = nubc_revenue_code,
+                                )
 
-                            if cash_price != 'N/A': # add cash payer entry only if there's a price listed
-                                if cash_price is not None:
-                                    yield ChargeMasterEntry(
-                                        procedure_identifier = procedure_identifier,
-                                        procedure_description = procedure_description,
-                                        hcpcs_code = hcpcs_code,
-                                        in_patient = False,
-                                        payer = 'Cash',
-                                        gross_charge = float(cash_price.replace(',', '')),
-                                        nubc_revenue_code = nubc_revenue_code,
-                                    )
+                            cash_price = self.parse_price(cash_price)
+                            if cash_price is not None: # add cash payer entry only if there's a price listed
+                                yield make_entry(
+                                    procedure_identifier = procedure_identifier,
+                                    procedure_description = procedure_description,
+                                    hcpcs_code = hcpcs_code,
+                                    in_patient = False,
+                                    payer = 'Cash',
+                                    gross_charge = cash_price,
+                                    nubc_revenue_code = nubc_revenue_code,
+                                )
             
@@ -1,15 +1,21 @@
-import re
-import json
-
+from .codes import CPT, HCPCS, MS_DRG, classify_code, parse_ndc, parse_nubc_revenue_code
+from .json_stream import decode_chunks, iter_array, repair_chunks
 from .parsers import ChargeMasterEntry, ChargeMasterParser
 
-NDC_REGEX = r"^(\d{4}-\d{4}-\d{2}|\d{5}-(?:\d{3}-\d{2}|\d{4}-\d{1,2}))"
-NUBC_REV_CODE_REGEX = r"(^[0-9]{4})\s*-\s*"
-CODE_MATCHERS = (
-    ("CPT", r"^CPT.+?([0-9]{4}[0-9A-Z])$"),
-    ("HCPCS", r"^HCPCS\s+(.+)$"),
-    ("DRG", r"^MS-DRG\s+V[0-9]+\s+\(FY [0-9]+\)\s+(.+?)$"),
-)
+
+def _normalize_header(key):
+    return (
+        key.encode("ascii", errors="ignore").decode().replace("_", " ").strip().upper()
+    )
+
+
+def _clean_value(value):
+    # Drops non-ascii characters and surrounding whitespace - None for anything empty
+    if not value:
+        return None
+    if value.isascii():
+        return value.strip()
+    return value.encode("ascii", errors="ignore").decode().strip()
 
 
 class UCSDChargeMasterParser(ChargeMasterParser):
@@ -17,35 +23,72 @@ class UCSDChargeMasterParser(ChargeMasterParser):
     ARTIFACT_URL = "http://hsfiles.ucsd.edu/patientBilling/UC-San-Diego-Standard-Charges-956006144.json"
     ARTIFACT_URLS = (ARTIFACT_URL,)
 
+    # Damage in the published file and what it's replaced with, in order
+    _REPAIRS = (
+        ('�"�', ""),
+        ('"Where "Variable" exists,', "\"Where 'Variable' exists,"),
+    )
+
+    # Columns with a meaning of their own, by normalized header. Every other column
+    # is a price for one or more insurance plans.
+    _FIELDS = frozenset(
+        (
+            "CODE",
+            "CODE TYPE",
+            "IP PRICE",
+            "NDC",
+            "PROCEDURE",
+            "PROCEDURE DESCRIPTION",
+            "QUANTITY",
+            "REIMB MAX",
+            "REIMB MIN",
+            "REV CODE",
+        )
+    )
+
+    @classmethod
+    def _header_plan(cls, keys):
+        # What to do with each column of a row with these keys - worked out once per
+        # distinct set of keys rather than for every row. Returns (name, key) pairs
+        # for the known fields and (key, plans) pairs for the insurance columns, with
+        # their names already split into plans. Headers that normalize to the same
+        # name behave like assigning them into a dict in order: the position of the
+        # first, the value of the last.
+        columns = {}
+        for key in keys:
+            columns[_normalize_header(key)] = key
+        fields = []
+        insurance = []
+        for name, key in columns.items():
+            if name in cls._FIELDS:
+                fields.append((name, key))
+            else:
+                insurance.append((key, tuple(plan.strip() for plan in name.split(";"))))
+        return fields, insurance
+
     def parse_artifacts(self, artifacts):
+        make_entry = self.entry_builder()
+        parse_price = self.parse_price
+        parse_prices = self.parse_prices
+        header_plans = {}
+
         # What a disaster - instead of being able to just stream the binary contents with json.load as a utf-8
         # encoded file, UCSD appears to have included some unescaped quotes and bad UTF-8 sequences. But the default
         # codecs decode error functions end up leaving behind the quote, and registering a new one would lack sufficient
-        # context to find the weird sequences
-        decoded = (
-            artifacts[self.ARTIFACT_URL]
-            .read()
-            .decode("utf-8", errors="replace")
-            .replace('�"�', "")
-            .replace('"Where "Variable" exists,', "\"Where 'Variable' exists,")
-        )
-        for row in json.loads(decoded):
+        # context to find the weird sequences. So the text is decoded, repaired and split into rows a chunk at a
+        # time, which keeps no more than a row or so in memory
+        artifact = self.track_artifact(self.ARTIFACT_URL, artifacts[self.ARTIFACT_URL])
+        text = decode_chunks(artifact, errors="replace")
+        rows = iter_array(repair_chunks(text, self._REPAIRS))
+        for row in self.track_rows(rows):
+            keys = tuple(row)
+            header_plan = header_plans.get(keys)
+            if header_plan is None:
+                header_plan = header_plans[keys] = self._header_plan(keys)
+            fields, insurance = header_plan
+
             # Deal with non-ascii stuff and whitespace
-            filtered_row = {}
-            for key, value in row.items():
-                filtered_key = (
-                    key.encode("ascii", errors="ignore")
-                    .decode()
-                    .replace("_", " ")
-                    .strip()
-                    .upper()
-                )
-                filtered_value = None
-                if value:
-                    filtered_value = (
-                        value.encode("ascii", errors="ignore").decode().strip()
-                    )
-                filtered_row[filtered_key] = filtered_value
+            filtered_row = {name: _clean_value(row[key]) for name, key in fields}
 
             location = None
             procedure_identifier = None
@@ -66,17 +109,9 @@ class UCSDChargeMasterParser(ChargeMasterParser):
             quantity = None
             in_patient_price = None
 
-            try:
-                # This can be "Variable" - which we'll treat as None
-                min_reimbursement = float(filtered_row.pop("REIMB MIN"))
-            except (KeyError, ValueError, TypeError):
-                pass
-
-            try:
-                # This can be "Variable" - which we'll treat as None
-                max_reimbursement = float(filtered_row.pop("REIMB MAX"))
-            except (KeyError, ValueError, TypeError):
-                pass
+            # These can be "Variable" - which parses to None
+            min_reimbursement = parse_price(filtered_row.pop("REIMB MIN", None))
+            max_reimbursement = parse_price(filtered_row.pop("REIMB MAX", None))
 
             if min_reimbursement and max_reimbursement:
                 # Handle case where they're swapped for.. who knows what reason
@@ -87,13 +122,9 @@ class UCSDChargeMasterParser(ChargeMasterParser):
             try:
                 # This should only occur when "Code Type" == "ERX"
                 ndc = filtered_row.pop("NDC")
-                ndc_match = re.match(NDC_REGEX, ndc)
-                if ndc_match:
-                    ndc_code = ndc_match.groups()[0]
-                else:
-                    nubc_revenue_code_match = re.match(NUBC_REV_CODE_REGEX, ndc)
-                    if nubc_revenue_code_match:
-                        nubc_revenue_code = nubc_revenue_code_match.groups()[0]
+                ndc_code = parse_ndc(ndc)
+                if ndc_code is None:
+                    nubc_revenue_code = parse_nubc_revenue_code(ndc)
 
             except (KeyError, ValueError, TypeError):
                 pass
@@ -105,24 +136,16 @@ class UCSDChargeMasterParser(ChargeMasterParser):
                 pass
 
             # This is usually "Variable", sometimes "OP_PRICE" almost useless espeicallys since we have min/max and insurance rates
-            try:
-                in_patient_price = float(filtered_row.pop("IP PRICE"))
-            except (KeyError, ValueError, TypeError):
-                pass
+            in_patient_price = parse_price(filtered_row.pop("IP PRICE", None))
 
             try:
-                code = filtered_row.pop("CODE")
-                if code is not None:
-                    for candidate_code_type, code_matcher in CODE_MATCHERS:
-                        match = re.match(code_matcher, code)
-                        if match:
-                            if candidate_code_type == "CPT":
-                                cpt_code = match.groups()[0]
-                            elif candidate_code_type == "HCPCS":
-                                hcpcs_code = match.groups()[0]
-                            elif candidate_code_type == "DRG":
-                                ms_drg_code = match.groups()[0]
-                            break
+                code_type, code = classify_code(filtered_row.pop("CODE"))
+                if code_type == CPT:
+                    cpt_code = code
+                elif code_type == HCPCS:
+                    hcpcs_code = code
+                elif code_type == MS_DRG:
+                    ms_drg_code = code
             except KeyError:
                 pass
 
@@ -137,12 +160,8 @@ class UCSDChargeMasterParser(ChargeMasterParser):
                 if rev_code is not None:
                     matched = False
                     if nubc_revenue_code is None:
-                        nubc_revenue_code_match = re.match(
-                            NUBC_REV_CODE_REGEX, rev_code
-                        )
-                        if nubc_revenue_code_match:
-                            nubc_revenue_code = nubc_revenue_code_match.groups()[0]
-                            matched = True
+                        nubc_revenue_code = parse_nubc_revenue_code(rev_code)
+                        matched = nubc_revenue_code is not None
                     if not matched:
                         procedure_description = rev_code
             except KeyError:
@@ -169,15 +188,13 @@ class UCSDChargeMasterParser(ChargeMasterParser):
             # Any remaining fields will be insurance fields which have keys that are compound by semicolon
             # TODO: These are grouped by "payer" but payer isn't specified directly. I guess it can usually
             # be guessed by the common suffix though
-            for insurance_provders, value in filtered_row.items():
-                for insurance_provder in insurance_provders.split(";"):
-                    plan = insurance_provder.strip()
-                    try:
-                        expected_reimbursement = float(value)
-                    except (ValueError, TypeError):
-                        continue
-
-                    yield ChargeMasterEntry(
+            prices = parse_prices([_clean_value(row[key]) for key, _ in insurance])
+            for (_, plans), expected_reimbursement in zip(insurance, prices):
+                if expected_reimbursement != expected_reimbursement:
+                    # NaN - no price listed
+                    continue
+                for plan in plans:
+                    yield make_entry(
                         location=location,
                         procedure_identifier=procedure_identifier,
                         procedure_description=procedure_description,
@@ -0,0 +1,483 @@
+from itertools import islice
+import datetime
+import hashlib
+import marshal
+import os
+import posixpath
+import struct
+import tempfile
+import zipfile
+import zlib
+from xml.etree.ElementTree import fromstring, iterparse
+
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904,
+    CALENDAR_WINDOWS_1900,
+    from_excel,
+    from_ISO8601,
+)
+from openpyxl.worksheet.formula import ArrayFormula
+
+from ..artifacts import content_digest
+
+# Reads the values of an xlsx workbook's first worksheet without building
+# openpyxl's object model - no Cell objects, styles or merged ranges, just one tuple
+# of values per row, parsed a row at a time. Values come out exactly as
+# load_workbook(...).worksheets[0].iter_rows() would give them: shared and inline
+# strings as str, numbers as int or float, booleans, error codes as their text,
+# numbers in a date format as datetimes and formulas as "=..." text unless data_only
+# is set.
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELATIONSHIP_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+DOCUMENT_RELATIONSHIP_NS = (
+    "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+)
+
+_ROW = MAIN_NS + "row"
+_CELL = MAIN_NS + "c"
+_VALUE = MAIN_NS + "v"
+_FORMULA = MAIN_NS + "f"
+_INLINE_STRING = MAIN_NS + "is"
+_TEXT = MAIN_NS + "t"
+_RUN = MAIN_NS + "r"
+_STRING_ITEM = MAIN_NS + "si"
+_SHEET_DATA = MAIN_NS + "sheetData"
+_DIMENSION = MAIN_NS + "dimension"
+
+_DIGITS = "0123456789"
+
+# Rows per record in a transcoded row file
+ROW_BATCH_SIZE = 4096
+
+COMPRESSION_LEVEL = 1
+
+# Part of every row file key - bump it whenever the layout below or what
+# XlsxReader yields changes
+ROW_FORMAT_VERSION = 2
+
+ROWS_SUFFIX = ".rows"
+
+# Payload length and whether the payload is compressed
+_RECORD_HEADER = struct.Struct("<IB")
+
+# Cell values marshal stores as they are
+_PLAIN_TYPES = frozenset((str, int, float, bool, type(None)))
+
+# Everything else a row can hold is stored as a (tag, marshallable value) tuple
+_DATETIME = 0
+_DATE = 1
+_TIME = 2
+_TIMEDELTA = 3
+_ARRAY_FORMULA = 4
+
+
+def _encode_value(value):
+    value_type = type(value)
+    if value_type is datetime.datetime:
+        return (_DATETIME, value.isoformat())
+    elif value_type is datetime.date:
+        return (_DATE, value.toordinal())
+    elif value_type is datetime.time:
+        return (_TIME, value.isoformat())
+    elif value_type is datetime.timedelta:
+        return (_TIMEDELTA, (value.days, value.seconds, value.microseconds))
+    elif value_type is ArrayFormula:
+        return (_ARRAY_FORMULA, (value.ref, value.text))
+    elif value_type in _PLAIN_TYPES:
+        return value
+    raise TypeError(f"Can't store a {value_type.__name__} in a row file")
+
+
+def _decode_value(value):
+    if type(value) is not tuple:
+        return value
+    tag, value = value
+    if tag == _DATETIME:
+        return datetime.datetime.fromisoformat(value)
+    elif tag == _DATE:
+        return datetime.date.fromordinal(value)
+    elif tag == _TIME:
+        return datetime.time.fromisoformat(value)
+    elif tag == _TIMEDELTA:
+        return datetime.timedelta(*value)
+    elif tag == _ARRAY_FORMULA:
+        ref, text = value
+        return ArrayFormula(ref=ref, text=text)
+    raise ValueError(f"Unknown row file value tag {tag!r}")
+
+
+def _encode_batch(rows):
+    # (rows, positions of the rows with tagged values) - most rows only hold plain
+    # values and go in as they are
+    tagged = []
+    encoded = []
+    for row in rows:
+        for value in row:
+            if type(value) not in _PLAIN_TYPES:
+                tagged.append(len(encoded))
+                row = tuple(_encode_value(value) for value in row)
+                break
+        encoded.append(row)
+    return marshal.dumps((encoded, tagged))
+
+
+def _decode_batch(data):
+    rows, tagged = marshal.loads(data)
+    for index in tagged:
+        rows[index] = tuple(_decode_value(value) for value in rows[index])
+    return rows
+
+
+def _part_path(source, target):
+    # Resolves a relationship target against the part that refers to it
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source), target))
+
+
+def _relationships(archive, part):
+    # {id: (type, path)} for a part's relationships
+    directory, name = posixpath.split(part)
+    rels_path = posixpath.join(directory, "_rels", name + ".rels")
+    try:
+        root = fromstring(archive.read(rels_path))
+    except KeyError:
+        return {}
+    return {
+        rel.get("Id"): (rel.get("Type", ""), _part_path(part, rel.get("Target", "")))
+        for rel in root.iter(RELATIONSHIP_NS + "Relationship")
+    }
+
+
+def _text_content(element):
+    # What openpyxl's Text.content makes of an <si> or <is> element: the plain text
+    # followed by any rich text runs, leaving out phonetic guides
+    text = element.findtext(_TEXT)
+    runs = [run.findtext(_TEXT) or "" for run in element.iterfind(_RUN)]
+    if not runs:
+        return text or ""
+    return (text or "") + "".join(runs)
+
+
+def _cast_number(value):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _column_index(reference, cache):
+    letters = reference.rstrip(_DIGITS)
+    column = cache.get(letters)
+    if column is None:
+        column = cache[letters] = column_index_from_string(letters)
+    return column
+
+
+class XlsxReader:
+    # Opens the workbook's first worksheet and reads what every row needs - the
+    # shared strings, which styles are dates and the date epoch. Only the worksheet
+    # itself is streamed.
+    def __init__(self, artifact):
+        self.archive = zipfile.ZipFile(artifact)
+        try:
+            self._read_workbook()
+        except BaseException:
+            self.archive.close()
+            raise
+
+    def _read_workbook(self):
+        workbook_part = "xl/workbook.xml"
+        for rel_type, path in _relationships(self.archive, "").values():
+            if rel_type.endswith("/officeDocument"):
+                workbook_part = path
+        workbook = fromstring(self.archive.read(workbook_part))
+        rels = _relationships(self.archive, workbook_part)
+        names = set(self.archive.namelist())
+
+        self.sheet_part = None
+        for sheet in workbook.iter(MAIN_NS + "sheet"):
+            rel_type, path = rels.get(
+                sheet.get(DOCUMENT_RELATIONSHIP_NS + "id"), ("", "")
+            )
+            if rel_type.endswith("/worksheet") and path in names:
+                self.sheet_part = path
+                break
+        if self.sheet_part is None:
+            raise ValueError("Workbook has no worksheets")
+
+        self.epoch = CALENDAR_WINDOWS_1900
+        properties = workbook.find(MAIN_NS + "workbookPr")
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+
+        self.shared_strings = []
+        shared_strings_part = "xl/sharedStrings.xml"
+        for rel_type, path in rels.values():
+            if rel_type.endswith("/sharedStrings"):
+                shared_strings_part = path
+        if shared_strings_part in names:
+            self.shared_strings = self._read_shared_strings(shared_strings_part)
+
+        # Style indices as they appear in the s attribute
+        self.date_styles = set()
+        self.timedelta_styles = set()
+        if "xl/styles.xml" in names:
+            stylesheet = Stylesheet.from_tree(
+                fromstring(self.archive.read("xl/styles.xml"))
+            )
+            if stylesheet.cell_styles:
+                self.date_styles = {str(i) for i in stylesheet.date_formats}
+                self.timedelta_styles = {str(i) for i in stylesheet.timedelta_formats}
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _read_shared_strings(self, part):
+        strings = []
+        with self.archive.open(part) as f:
+            for _, element in iterparse(f):
+                if element.tag == _STRING_ITEM:
+                    strings.append(_text_content(element).replace("x005F_", ""))
+                    element.clear()
+        return strings
+
+    def iter_rows(self, min_row=1, max_col=None, data_only=False):
+        # Yields a tuple of values for every row from min_row to the last one with
+        # any cells, blank rows included. With max_col, every row is exactly that
+        # many values long. Otherwise rows are padded to the sheet's <dimension>
+        # where it has one - openpyxl pads to the widest row, which isn't known
+        # until the end of the sheet.
+        width = max_col or 0
+        columns = {}
+        shared_formulae = {}
+        row_number = 0
+        last_row = 0
+        sheet_data = None
+
+        with self.archive.open(self.sheet_part) as f:
+            for event, element in iterparse(f, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag == _SHEET_DATA:
+                        sheet_data = element
+                    continue
+                if tag == _DIMENSION:
+                    if max_col is None:
+                        last = element.get("ref", "").rpartition(":")[2]
+                        if last.rstrip(_DIGITS):
+                            width = _column_index(last, columns)
+                    continue
+                if tag != _ROW:
+                    continue
+
+                number = element.get("r")
+                if number is None:
+                    row_number += 1
+                else:
+                    row_number = int(float(number))
+                cells = element.findall(_CELL)
+                if sheet_data is not None:
+                    sheet_data.remove(element)
+                if not cells:
+                    continue
+
+                values = self._row_values(
+                    cells, row_number, columns, shared_formulae, data_only
+                )
+                if row_number >= min_row:
+                    blank = (None,) * width
+                    for _ in range(max(last_row + 1, min_row), row_number):
+                        yield blank
+                    if len(values) < width:
+                        values.extend([None] * (width - len(values)))
+                    elif max_col is not None:
+                        del values[max_col:]
+                    yield tuple(values)
+                last_row = row_number
+
+    def _row_values(self, cells, row_number, columns, shared_formulae, data_only):
+        values = []
+        column = 0
+        for cell in cells:
+            reference = cell.get("r")
+            if reference:
+                column = _column_index(reference, columns)
+            else:
+                column += 1
+            while len(values) < column:
+                values.append(None)
+
+            data_type = cell.get("t", "n")
+            formula = None if data_only else cell.find(_FORMULA)
+            if formula is not None:
+                values[column - 1] = self._formula(formula, reference, shared_formulae)
+                continue
+
+            if data_type == "inlineStr":
+                child = cell.find(_INLINE_STRING)
+                if child is not None:
+                    values[column - 1] = _text_content(child)
+                continue
+
+            value = cell.findtext(_VALUE) or None
+            if value is None:
+                continue
+            if data_type == "n":
+                value = _cast_number(value)
+                style = cell.get("s")
+                if style in self.date_styles:
+                    try:
+                        value = from_excel(
+                            value,
+                            self.epoch,
+                            timedelta=style in self.timedelta_styles,
+                        )
+                    except (OverflowError, ValueError):
+                        value = "#VALUE!"
+            elif data_type == "s":
+                value = self.shared_strings[int(value)]
+            elif data_type == "b":
+                value = bool(int(value))
+            elif data_type == "d":
+                value = from_ISO8601(value)
+            values[column - 1] = value
+        return values
+
+    def _formula(self, formula, reference, shared_formulae):
+        value = "="
+        if formula.text is not None:
+            value += formula.text
+        formula_type = formula.get("t")
+        if formula_type == "array":
+            return ArrayFormula(ref=formula.get("ref"), text=value)
+        if formula_type == "shared":
+            index = formula.get("si")
+            if index in shared_formulae:
+                return shared_formulae[index].translate_formula(reference)
+            if value != "=":
+                shared_formulae[index] = Translator(value, reference)
+        return value
+
+
+def iter_rows(artifact, min_row=1, max_col=None, data_only=False):
+    # Convenience wrapper - value tuples for the first worksheet of the xlsx file
+    with XlsxReader(artifact) as reader:
+        yield from reader.iter_rows(min_row, max_col, data_only)
+
+
+def _limit_rows(rows, min_row, max_col):
+    # Applies XlsxReader.iter_rows' limits to every row of a sheet
+    if min_row > 1:
+        rows = islice(rows, min_row - 1, None)
+    if max_col is None:
+        yield from rows
+        return
+    for row in rows:
+        if len(row) != max_col:
+            row = row[:max_col] + (None,) * (max_col - len(row))
+        yield row
+
+
+class XlsxRowCache:
+    # Transcodes the first worksheet of each workbook it's given into a compact row
+    # file once, and reads that instead of the xlsx whenever the same workbook
+    # comes back:
+    #
+    #   root/<key>.rows
+    #
+    # where key hashes the workbook's sha256 and data_only. The file holds every
+    # row of the sheet as XlsxReader yields it with no limits, so one file serves
+    # any min_row and max_col. Rows are stored ROW_BATCH_SIZE at a time, each batch
+    # marshalled behind a 4 byte length and a flag byte saying whether it's zlib
+    # compressed. Strings, numbers, bools and None are stored as they are; dates,
+    # times, timedeltas and array formulas are tagged and stored as text or numbers,
+    # so reading a row file never constructs anything else.
+    #
+    #   parser = ChargeMasterParser.build("Sharp", row_cache=XlsxRowCache("rows"))
+    def __init__(self, root, compress=True):
+        self.root = os.fspath(root)
+        self.compress = compress
+        os.makedirs(self.root, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, digest, data_only):
+        identity = "\0".join((str(ROW_FORMAT_VERSION), digest, str(bool(data_only))))
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ROWS_SUFFIX)
+
+    def iter_rows(
+        self, artifact, min_row=1, max_col=None, data_only=False, digest=None
+    ):
+        # Same rows as XlsxReader(artifact).iter_rows(min_row, max_col, data_only).
+        # digest is the workbook's sha256 where it's already known.
+        rows = self._rows(artifact, data_only, digest)
+        return _limit_rows(rows, min_row, max_col)
+
+    def _rows(self, artifact, data_only, digest):
+        if digest is None:
+            digest = content_digest(artifact)
+        path = self._path(self.key(digest, data_only))
+        try:
+            cached = open(path, "rb")
+        except FileNotFoundError:
+            self.misses += 1
+            yield from self._transcode(artifact, data_only, path)
+            return
+
+        self.hits += 1
+        with cached:
+            read = cached.read
+            while True:
+                header = read(_RECORD_HEADER.size)
+                if not header:
+                    break
+                length, compressed = _RECORD_HEADER.unpack(header)
+                data = read(length)
+                if compressed:
+                    data = zlib.decompress(data)
+                yield from _decode_batch(data)
+
+    def _transcode(self, artifact, data_only, path):
+        # Yields the workbook's rows while writing them to a temporary file, which
+        # only takes path's place once the whole sheet has been read
+        descriptor, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        saved = False
+        try:
+            with os.fdopen(descriptor, "wb") as f, XlsxReader(artifact) as reader:
+                batch = []
+                for row in reader.iter_rows(data_only=data_only):
+                    batch.append(row)
+                    if len(batch) == ROW_BATCH_SIZE:
+                        self._write_batch(f, batch)
+                        batch = []
+                    yield row
+                if batch:
+                    self._write_batch(f, batch)
+            os.replace(temp_path, path)
+            saved = True
+        finally:
+            if not saved:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def _write_batch(self, f, batch):
+        data = _encode_batch(batch)
+        if self.compress:
+            data = zlib.compress(data, COMPRESSION_LEVEL)
+        f.write(_RECORD_HEADER.pack(len(data), self.compress))
+        f.write(data)
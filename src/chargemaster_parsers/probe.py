@@ -0,0 +1,209 @@
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .download import BROWSER_HEADERS, DEFAULT_TIMEOUT, HostPools, request_target
+
+DEFAULT_CONCURRENCY = 8
+
+# Probes per second, averaged - enough to sweep thousands of candidates in minutes
+# without hammering anyone's server
+DEFAULT_RATE = 10.0
+
+FOUND_STATUSES = (200, 206)
+MISSING_STATUSES = (404, 410)
+
+# Servers that won't answer HEAD - asked again with a one byte ranged GET
+HEAD_UNSUPPORTED_STATUSES = (403, 405, 501)
+
+# Write the results cache every so many conclusive probes, so an interrupted sweep
+# doesn't have to start over
+SAVE_EVERY = 200
+
+
+class TokenBucket:
+    # Async rate limiter: holds up to capacity tokens, refilled at rate per second,
+    # and acquire() waits for one. Waiters are served in order.
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Prober:
+    # Finds which of a set of candidate urls exist without downloading them. Each
+    # url gets a HEAD (or a one byte ranged GET where HEAD is refused) over pooled
+    # keep-alive connections, with at most concurrency in flight and no more than
+    # rate started per second.
+    #
+    # With cache_path set, conclusive results - found or missing - are kept in a
+    # JSON file and later sweeps only probe the urls that aren't in it yet. Errors
+    # and unexpected statuses aren't cached, so those urls are tried again.
+    def __init__(
+        self,
+        cache_path=None,
+        concurrency=DEFAULT_CONCURRENCY,
+        rate=DEFAULT_RATE,
+        burst=1,
+        headers=None,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.cache_path = cache_path
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.headers = dict(BROWSER_HEADERS if headers is None else headers)
+        self.timeout = timeout
+        # HTTP requests sent, over every sweep
+        self.requests = 0
+        self._requests_lock = threading.Lock()
+        self.results = {}
+        if cache_path is not None:
+            try:
+                with open(cache_path) as f:
+                    self.results = json.load(f)
+            except FileNotFoundError:
+                pass
+
+    def save(self):
+        if self.cache_path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        descriptor, path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as f:
+            json.dump(self.results, f, indent=1, sort_keys=True)
+        os.replace(path, self.cache_path)
+
+    def _send(self, pool, method, url, headers):
+        # Returns the status, leaving the connection reusable where the body was
+        # small enough to read off
+        with self._requests_lock:
+            self.requests += 1
+        connection, response = pool.request(method, request_target(url), headers)
+        reusable = False
+        try:
+            if method == "HEAD" or response.status != 200:
+                # No body, a one byte range, or an error page
+                response.read()
+                reusable = not response.will_close
+            # A 200 to a ranged GET is the whole file - drop the connection rather
+            # than read it
+            return response.status
+        finally:
+            pool.release(connection, reusable)
+
+    def probe_url(self, pools, url):
+        # (status, error) for url - blocking
+        try:
+            pool = pools.pool(url)
+            with pool.slots:
+                status = self._send(pool, "HEAD", url, self.headers)
+                if status in HEAD_UNSUPPORTED_STATUSES:
+                    status = self._send(
+                        pool, "GET", url, {**self.headers, "Range": "bytes=0-0"}
+                    )
+            return status, None
+        except (OSError, http.client.HTTPException, ValueError) as ex:
+            return None, f"{type(ex).__name__}: {ex}"
+
+    async def probe(self, urls, refresh=False):
+        # {url: True if found, False if missing, None if inconclusive} for every
+        # url. Cached results are used as they are unless refresh is set.
+        urls = list(dict.fromkeys(urls))
+        pending = [url for url in urls if refresh or url not in self.results]
+        found = {url: self.results[url]["found"] for url in urls if url not in pending}
+        if not pending:
+            return {url: found.get(url) for url in urls}
+
+        loop = asyncio.get_running_loop()
+        bucket = TokenBucket(self.rate, self.burst)
+        slots = asyncio.Semaphore(self.concurrency)
+        pools = HostPools(self.concurrency, self.timeout)
+        unsaved = 0
+
+        async def probe_one(url):
+            nonlocal unsaved
+            async with slots:
+                await bucket.acquire()
+                status, error = await loop.run_in_executor(
+                    executor, self.probe_url, pools, url
+                )
+            if status in FOUND_STATUSES or status in MISSING_STATUSES:
+                found[url] = status in FOUND_STATUSES
+                self.results[url] = {"found": found[url], "status": status}
+                unsaved += 1
+                if unsaved >= SAVE_EVERY:
+                    unsaved = 0
+                    self.save()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                await asyncio.gather(*(probe_one(url) for url in pending))
+            finally:
+                pools.close()
+                self.save()
+        return {url: found.get(url) for url in urls}
+
+    def find(self, urls, refresh=False):
+        # The urls that exist, in the order given
+        results = asyncio.run(self.probe(urls, refresh))
+        return [url for url in urls if results[url]]
+
+
+def format_artifact_urls(urls):
+    # Python source for an ARTIFACT_URLS tuple, ready to paste into a parser
+    lines = ["ARTIFACT_URLS = ("]
+    lines.extend(f'    "{url}",' for url in urls)
+    lines.append(")")
+    return "\n".join(lines)
+
+
+def main():
+    from .parsers import ChargeMasterParser
+
+    arg_parser = argparse.ArgumentParser(
+        description="Sweep an institution's candidate artifact urls and print the "
+        "ones that exist as an ARTIFACT_URLS tuple"
+    )
+    arg_parser.add_argument("institution")
+    arg_parser.add_argument("--cache", help="JSON file to keep results in")
+    arg_parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    arg_parser.add_argument("--rate", type=float, default=DEFAULT_RATE)
+    arg_parser.add_argument("--refresh", action="store_true")
+    args = arg_parser.parse_args()
+
+    parser_class = ChargeMasterParser.registered_parsers.lookup(args.institution)
+    if parser_class is None or not hasattr(parser_class, "find_artifacts"):
+        arg_parser.error(f"{args.institution} has no candidate urls to probe")
+    urls = parser_class.find_artifacts(
+        cache_path=args.cache,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        refresh=args.refresh,
+    )
+    print(format_artifact_urls(urls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+from chargemaster_parsers.artifacts import ArtifactStore, MappedArtifact, content_digest
+from chargemaster_parsers.parsers import TriCityChargeMasterParser
+
+import hashlib
+import zipfile
+import pytest
+import io
+import os
+
+TRICITY_ROWS = "\n".join(
+    [
+        "Code Type,Code,Description,Patient Type,Rev Code,Gross Charge,Cash Price,Aetna HMO/PPO, Min ($) , Max ($) ",
+        'CDM,36415,VENIPUNCTURE,OP,0300,"$35.00 ","$14.00 ","$20.00 ","$9.00 ","$20.00 "',
+    ]
+).encode("cp1252")
+
+
+@pytest.fixture
+def store(tmp_path):
+    yield ArtifactStore(tmp_path / "store")
+
+
+def test_round_trip(store):
+    digest = store.put("https://example.com/a.csv", b"line one\nline two\n")
+    assert digest == hashlib.sha256(b"line one\nline two\n").hexdigest()
+    assert store.digest("https://example.com/a.csv") == digest
+    assert "https://example.com/a.csv" in store
+    with open(store.path("https://example.com/a.csv"), "rb") as f:
+        assert f.read() == b"line one\nline two\n"
+
+    with store.open("https://example.com/a.csv") as artifact:
+        assert isinstance(artifact, MappedArtifact)
+        assert artifact.readline() == b"line one\n"
+        assert artifact.tell() == 9
+        assert artifact.read(4) == b"line"
+        assert artifact.read() == b" two\n"
+        assert artifact.read() == b""
+        artifact.seek(-4, io.SEEK_END)
+        assert artifact.read() == b"two\n"
+        artifact.seek(0)
+        buffer = bytearray(4)
+        assert artifact.readinto(buffer) == 4
+        assert buffer == b"line"
+        assert bytes(artifact.getbuffer()) == b"line one\nline two\n"
+    assert artifact.closed
+
+
+def test_file_like_source(store):
+    store.put("https://example.com/a.csv", io.BytesIO(b"x" * 3000000))
+    with store.open("https://example.com/a.csv") as artifact:
+        assert len(artifact.read()) == 3000000
+
+
+def test_empty(store):
+    store.put("https://example.com/empty.csv", b"")
+    with store.open("https://example.com/empty.csv") as artifact:
+        assert artifact.read() == b""
+        assert artifact.readline() == b""
+
+
+def test_missing(store):
+    with pytest.raises(KeyError):
+        store.open("https://example.com/nope.csv")
+    assert store.open_artifacts(["https://example.com/nope.csv"]) == {}
+
+
+def test_deduplicated(store):
+    first = store.put("https://example.com/a.csv", b"same")
+    second = store.put("https://example.com/b.csv", b"same")
+    assert first == second
+    assert store.size() == 4
+    assert len(os.listdir(os.path.dirname(store._object_path(first)))) == 1
+
+    # The object stays until the last url pointing at it goes
+    store.remove("https://example.com/a.csv")
+    assert os.path.exists(store._object_path(first))
+    store.remove("https://example.com/b.csv")
+    assert not os.path.exists(store._object_path(first))
+
+
+def test_replaced_content(store):
+    first = store.put("https://example.com/a.csv", b"old")
+    second = store.put("https://example.com/a.csv", b"new")
+    assert first != second
+    assert not os.path.exists(store._object_path(first))
+    assert store.size() == 3
+
+
+def test_persisted(tmp_path):
+    ArtifactStore(tmp_path).put("https://example.com/a.csv", b"kept")
+    store = ArtifactStore(tmp_path)
+    assert store.urls() == ["https://example.com/a.csv"]
+    with store.open("https://example.com/a.csv") as artifact:
+        assert artifact.read() == b"kept"
+
+
+def test_lru_eviction(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=10)
+    store.put("https://example.com/a.csv", b"aaaa")
+    store.put("https://example.com/b.csv", b"bbbb")
+    # Touch a so b is the least recently used
+    store.open("https://example.com/a.csv").close()
+    store.put("https://example.com/c.csv", b"cccc")
+
+    assert "https://example.com/a.csv" in store
+    assert "https://example.com/b.csv" not in store
+    assert "https://example.com/c.csv" in store
+    assert store.size() == 8
+
+    # Something bigger than the whole budget is still kept on its own
+    store.put("https://example.com/d.csv", b"d" * 20)
+    assert store.urls() == ["https://example.com/d.csv"]
+
+
+def test_last_use_saved_once(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path, max_bytes=10)
+    for url, data in (("a", b"aaaa"), ("b", b"bbbb"), ("c", b"cc")):
+        store.put(f"https://example.com/{url}.csv", data)
+
+    saves = []
+    save = store._save
+    monkeypatch.setattr(store, "_save", lambda: saves.append(save()))
+
+    urls = ["https://example.com/b.csv", "https://example.com/a.csv"]
+    artifacts = store.open_artifacts(urls + ["https://example.com/nope.csv"])
+    assert list(artifacts) == urls
+    for artifact in artifacts.values():
+        artifact.close()
+    assert len(saves) == 1
+    store.open("https://example.com/c.csv").close()
+    assert len(saves) == 1
+    store.flush()
+    store.flush()
+    assert len(saves) == 2
+
+    # The last uses made it to disk, so b is now the least recently used
+    store = ArtifactStore(tmp_path, max_bytes=10)
+    store.put("https://example.com/d.csv", b"dddd")
+    assert sorted(store.urls()) == [
+        "https://example.com/a.csv",
+        "https://example.com/c.csv",
+        "https://example.com/d.csv",
+    ]
+
+
+def test_parse_from_store(store):
+    url = TriCityChargeMasterParser.ARTIFACT_URL
+    store.put(url, TRICITY_ROWS)
+    parser = TriCityChargeMasterParser()
+
+    expected_result = list(parser.parse_artifacts({url: io.BytesIO(TRICITY_ROWS)}))
+    actual_result = list(parser.parse_artifacts(store.open_artifacts([url])))
+    assert actual_result == expected_result
+    assert len(actual_result) == 2
+
+
+def test_zip_from_store(store):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as zip_file:
+        zip_file.writestr("inner.csv", "hello")
+    store.put("https://example.com/a.zip", output.getvalue())
+
+    with zipfile.ZipFile(store.open("https://example.com/a.zip")) as zip_file:
+        assert zip_file.read("inner.csv") == b"hello"
+
+
+def test_validators(store):
+    url = "https://example.com/a.csv"
+    store.put(url, b"one", {"etag": '"1"', "last_modified": None})
+    assert store.validators(url) == {"etag": '"1"'}
+
+    # Same content without validators keeps them, new content drops them
+    store.put(url, b"one")
+    assert store.validators(url) == {"etag": '"1"'}
+    store.put(url, b"two")
+    assert store.validators(url) == {}
+
+    store.put(url, b"two", {"etag": '"2"', "content_length": 3})
+    store.update_validators(url, {"etag": '"3"', "content_length": None})
+    assert store.validators(url) == {"etag": '"3"', "content_length": 3}
+    assert ArtifactStore(store.root).validators(url) == store.validators(url)
+    assert store.validators("https://example.com/missing.csv") == {}
+
+
+def test_content_digest():
+    data = b"x" * 3000000
+    expected = hashlib.sha256(data).hexdigest()
+    assert content_digest(io.BytesIO(data)) == expected
+
+    # Plain file objects are read from the start and left where they were
+    artifact = io.BufferedReader(io.BytesIO(data))
+    artifact.read(10)
+    assert content_digest(artifact) == expected
+    assert artifact.tell() == 10
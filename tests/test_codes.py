@@ -0,0 +1,68 @@
+from chargemaster_parsers.parsers.codes import (
+    CPT,
+    HCPCS,
+    MS_DRG,
+    classify_code,
+    classify_cpt_hcpcs,
+    parse_ndc,
+    parse_nubc_revenue_code,
+)
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "raw,expected",
+    [
+        ("CPT® 76499", (CPT, "76499")),
+        ("CPT® 0712T", (CPT, "0712T")),
+        ("CPT« 90847", (CPT, "90847")),
+        ("CPT 0001a ", (CPT, "0001A")),
+        ("HCPCS C1713", (HCPCS, "C1713")),
+        ("HCPCS 00002007", (HCPCS, "00002007")),
+        ("HCPCS v2632 ", (HCPCS, "V2632")),
+        ("MS-DRG V37 (FY2020) 883", (MS_DRG, "883")),
+        ("MS-DRG V38 (FY 2021) 001", (MS_DRG, "001")),
+        ("ICD10 Z00.00", (None, None)),
+        ("", (None, None)),
+        (None, (None, None)),
+    ],
+)
+def test_classify_code(raw, expected):
+    assert classify_code(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "raw,expected",
+    [
+        ("99213", (CPT, "99213")),
+        ("0001U", (CPT, "0001U")),
+        ("C1776", (HCPCS, "C1776")),
+        ("J1100 ", (HCPCS, "J1100 ")),
+        ("", (None, None)),
+        (None, (None, None)),
+    ],
+)
+def test_classify_cpt_hcpcs(raw, expected):
+    assert classify_cpt_hcpcs(raw) == expected
+
+
+def test_parse_ndc():
+    assert parse_ndc("00121-0657-11") == "00121-0657-11"
+    assert parse_ndc("0121-0657-11 TABLET") == "0121-0657-11"
+    assert parse_ndc("0278 - MEDICAL/SURGICAL SUPPLIES") is None
+    assert parse_ndc(None) is None
+
+
+def test_parse_nubc_revenue_code():
+    assert parse_nubc_revenue_code("0278 - MEDICAL/SURGICAL SUPPLIES") == "0278"
+    assert parse_nubc_revenue_code("0320- RADIOLOGY") == "0320"
+    assert parse_nubc_revenue_code("00121-0657-11") is None
+    assert parse_nubc_revenue_code(None) is None
+
+
+def test_memoized():
+    classify_code.cache_clear()
+    classify_code("HCPCS C1713")
+    classify_code("HCPCS C1713")
+    assert classify_code.cache_info().hits == 1
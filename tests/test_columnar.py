@@ -0,0 +1,230 @@
+from chargemaster_parsers.parsers import (
+    ChargeMasterBatch,
+    ChargeMasterEntry,
+    ChargeMasterParser,
+    ScrippsChargeMasterParser,
+    TriCityChargeMasterParser,
+)
+from chargemaster_parsers.parsers.columnar import BUFFERED, ColumnarEncoder
+
+from array import array
+import math
+import pytest
+import io
+
+
+class FakeChargeMasterParser(ChargeMasterParser):
+    INSTITUTION_NAME = "Fake Columnar"
+    ARTIFACT_URLS = ()
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def parse_artifacts(self, artifacts):
+        yield from self.entries
+
+
+ENTRIES = [
+    ChargeMasterEntry(
+        procedure_identifier="1",
+        procedure_description="ROOM & BOARD-CCU",
+        payer="Cash",
+        gross_charge=11834.0,
+        in_patient=True,
+    ),
+    ChargeMasterEntry(
+        procedure_identifier="2",
+        procedure_description="ROOM & BOARD-CCU",
+        payer="COMMERCIAL",
+        plan="KAISER FOUNDATION HEALTH PLAN, INC.",
+        expected_reimbursement=9000.0,
+        in_patient=False,
+        extra_data={"Code Type": "ICD10", "Code": "0001"},
+    ),
+    ChargeMasterEntry(
+        procedure_identifier=3,
+        procedure_description="US BX BREAST INITIAL",
+        payer="Cash",
+        gross_charge=6720,
+    ),
+]
+
+
+def test_round_trip():
+    batches = list(
+        FakeChargeMasterParser(ENTRIES).parse_artifacts_columnar({}, batch_size=2)
+    )
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert all(isinstance(batch, ChargeMasterBatch) for batch in batches)
+
+    actual_result = [entry for batch in batches for entry in batch.entries()]
+    assert actual_result == ENTRIES
+    assert actual_result[2].procedure_identifier == 3
+
+
+def test_column_types():
+    (batch,) = FakeChargeMasterParser(ENTRIES).parse_artifacts_columnar({})
+
+    assert set(batch.columns) == set(ChargeMasterEntry.__slots__)
+
+    gross_charge = batch["gross_charge"]
+    assert isinstance(gross_charge, array) and gross_charge.typecode == "d"
+    assert gross_charge[0] == 11834.0
+    assert math.isnan(gross_charge[1])
+    assert gross_charge[2] == 6720.0
+
+    in_patient = batch["in_patient"]
+    assert isinstance(in_patient, array) and in_patient.typecode == "b"
+    assert list(in_patient) == [1, 0, -1]
+    assert batch.to_pylist("in_patient") == [True, False, None]
+
+    payer = batch["payer"]
+    assert list(payer.indices) == [0, 1, 0]
+    assert payer.dictionary == ["Cash", "COMMERCIAL"]
+    assert batch.to_pylist("plan") == [
+        None,
+        "KAISER FOUNDATION HEALTH PLAN, INC.",
+        None,
+    ]
+    assert batch.to_pylist("extra_data")[1] == {"Code Type": "ICD10", "Code": "0001"}
+
+
+def test_dictionary_shared_across_batches():
+    batches = list(
+        FakeChargeMasterParser(ENTRIES).parse_artifacts_columnar({}, batch_size=1)
+    )
+    assert len(batches) == 3
+    assert batches[0]["payer"].dictionary is batches[2]["payer"].dictionary
+    assert batches[0]["payer"].indices[0] == batches[2]["payer"].indices[0]
+
+
+@pytest.mark.parametrize("price", ["$1,234", "NA", [12.5]])
+def test_non_numeric_price(price):
+    entries = ENTRIES + [
+        ChargeMasterEntry(procedure_identifier="4", gross_charge=price)
+    ]
+    with pytest.raises(ValueError, match="gross_charge must be a number or None"):
+        list(FakeChargeMasterParser(entries).parse_artifacts_columnar({}))
+
+
+def test_empty():
+    assert list(FakeChargeMasterParser([]).parse_artifacts_columnar({})) == []
+
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError, match="batch_size must be positive"):
+        FakeChargeMasterParser(ENTRIES).parse_artifacts_columnar({}, batch_size=0)
+
+
+def test_scripps():
+    rows = "\n".join(
+        [
+            "LOCATION|PROCEDURE CODE|PROCEDURE DESCRIPTION|PAYER|PLAN|GROSS CHARGES IP|IP_EXPECTED_REIMBURSMENT|GROSS CHARGES OP|OP_EXPECTED_REIMBURSMENT|IP_MIN|IP_MAX|OP_MIN|OP_MAX|CASH/SELF PAY",
+            "Scripps Green Hospital|MS940|O.R. Procedures With Diagnoses Of Other Contact With Health Services With Cc|AETNA MEDI-CAL [213]|AETNA MEDI-CAL BETTER HEALTH OF CA [21301], AETNA MEDI-CAL HMO - COMM CARE IPA [21302]|105058.34||||9000.00|101685.89|||52529.17",
+        ]
+    )
+
+    def artifacts():
+        return {
+            url: io.BytesIO(rows.encode("utf-8") if i == 0 else b"")
+            for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+        }
+
+    parser = ScrippsChargeMasterParser()
+    expected_result = list(parser.parse_artifacts(artifacts()))
+    actual_result = [
+        entry
+        for batch in parser.parse_artifacts_columnar(artifacts(), batch_size=1)
+        for entry in batch.entries()
+    ]
+    assert len(actual_result) == 2
+    assert actual_result == expected_result
+
+
+TRICITY_ROWS = "\n".join(
+    [
+        "Code Type,Code,Description,Patient Type,Rev Code,Gross Charge,Cash Price,Aetna HMO/PPO, Min ($) , Max ($) ",
+    ]
+    + [
+        f'CDM,{36415 + i},VENIPUNCTURE {i % 3},{"IP" if i % 2 else "OP"},0300,"${35 + i}.00 ","$14.00 ", NA ,"$9.00 ","$20.00 "'
+        for i in range(10)
+    ]
+).encode("cp1252")
+
+
+def tricity_artifacts():
+    return {TriCityChargeMasterParser.ARTIFACT_URL: io.BytesIO(TRICITY_ROWS)}
+
+
+def test_rows_skip_entries(monkeypatch):
+    parser = TriCityChargeMasterParser()
+    expected_result = list(parser.parse_artifacts(tricity_artifacts()))
+
+    with monkeypatch.context() as patch:
+        # Not a single entry is built on the way to the columns
+        def no_entries(*fields, intern=None):
+            raise AssertionError("built a ChargeMasterEntry")
+
+        patch.setattr(ChargeMasterEntry, "builder", no_entries)
+        batches = list(parser.parse_artifacts_columnar(tricity_artifacts(), 7))
+    assert [len(batch) for batch in batches] == [7] * (len(expected_result) // 7) + [
+        len(expected_result) % 7
+    ]
+    actual_result = [entry for batch in batches for entry in batch.entries()]
+    assert actual_result == expected_result
+    assert parser.column_sink is None
+
+
+def test_parses_in_between():
+    parser = TriCityChargeMasterParser()
+    batches = parser.parse_artifacts_columnar(tricity_artifacts(), batch_size=2)
+    first = next(batches)
+    # A plain parse while the columnar one is paused still gets entries
+    entries = list(parser.parse_artifacts(tricity_artifacts()))
+    assert all(isinstance(entry, ChargeMasterEntry) for entry in entries)
+
+    actual_result = list(first.entries())
+    actual_result += [entry for batch in batches for entry in batch.entries()]
+    assert actual_result == entries
+
+
+def test_rows_are_instrumented():
+    parser = TriCityChargeMasterParser()
+    with parser.instrument() as metrics:
+        batches = list(parser.parse_artifacts_columnar(tricity_artifacts()))
+    assert metrics.totals().entries == sum(len(batch) for batch in batches) > 0
+
+
+def test_builder():
+    encoder = ColumnarEncoder(batch_size=3)
+    build = encoder.builder()
+    assert encoder.builder() is build
+    positional = encoder.builder("payer", "gross_charge", "in_patient")
+
+    def rows():
+        # Like a parser, hands each row to encode() as it's built
+        for entry in ENTRIES:
+            yield build(**{field: getattr(entry, field) for field in entry.__slots__})
+        yield positional("Cash", 5, False)
+
+    first, second = encoder.encode(rows())
+    assert list(first.entries()) == ENTRIES
+    assert list(second.entries()) == [
+        ChargeMasterEntry(payer="Cash", gross_charge=5.0, in_patient=False)
+    ]
+    assert second["payer"].indices[0] == first["payer"].indices[0]
+    assert len(first["gross_charge"]) == 3 and len(second["gross_charge"]) == 1
+
+    with pytest.raises(ValueError, match="Unknown ChargeMasterEntry fields: cost"):
+        encoder.builder("cost")
+
+
+def test_builder_non_numeric_price():
+    encoder = ColumnarEncoder()
+    build = encoder.builder()
+    with pytest.raises(ValueError, match="gross_charge must be a number or None"):
+        build(payer="Cash", gross_charge="$1,234")
+    # Nothing was appended for the rejected row
+    build(payer="Cash", gross_charge=1)
+    (batch,) = encoder.encode([BUFFERED])
+    assert list(batch.entries()) == [ChargeMasterEntry(payer="Cash", gross_charge=1.0)]
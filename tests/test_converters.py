@@ -0,0 +1,99 @@
+from chargemaster_parsers.parsers.converters import (
+    ConverterTable,
+    leading_price_unless,
+    price,
+    price_unless,
+    raw,
+    text,
+)
+
+import math
+import pytest
+
+HEADER = ["CODE", "DESCRIPTION", "PRICE", "CODE", "AETNA"]
+
+
+def test_converters():
+    assert text("  CT HEAD  ") == "CT HEAD"
+    assert raw("  CT HEAD  ") == "  CT HEAD  "
+    assert price(" $1,234.50 ") == 1234.5
+    for missing in ("NA", "N/A", "", "  ", "Variable"):
+        assert price(missing) is None
+
+    not_applicable = price_unless("-1", "NA")
+    assert not_applicable(" -1 ") is None
+    assert not_applicable("NA") is None
+    assert not_applicable("-1.50") == -1.5
+    assert not_applicable("$2,000") == 2000.0
+
+
+def test_leading_price():
+    rate = leading_price_unless("-1")
+    assert rate("$1,200.00 per diem") == 1200.0
+    assert rate(" 884 ") == 884.0
+    for missing in ("-1", "", "NA", "nan", "per diem"):
+        assert rate(missing) is None
+    # Only the whole cell is a placeholder
+    assert rate("-1 per case") == -1.0
+
+
+def test_resolve():
+    table = ConverterTable.resolve(
+        HEADER,
+        [
+            ("DESCRIPTION", text, "procedure_description"),
+            ("CODE", raw, "code"),
+            ("PRICE", price, "gross_charge"),
+        ],
+    )
+    assert len(table) == 3
+    assert table.fields == ("procedure_description", "code", "gross_charge")
+    # Repeated names mean the last column with that name
+    assert table.columns[1] == (3, raw, "code")
+    assert table.convert(["1", " CT HEAD ", "$10.00", "2", "5"]) == [
+        "CT HEAD",
+        "2",
+        10.0,
+    ]
+    assert table.items(["1", " CT HEAD ", "NA", "2", "5"]) == [
+        ("procedure_description", "CT HEAD"),
+        ("code", "2"),
+    ]
+
+
+def test_resolve_from_dict():
+    columns = {"PRICE": 2, "CODE": 0}
+    table = ConverterTable.resolve(columns, [("PRICE", price, "price")])
+    assert table.convert(["1", "", "3.5"]) == [3.5]
+
+
+def test_missing_columns():
+    with pytest.raises(KeyError):
+        ConverterTable.resolve(HEADER, [("CASH", price, "cash")])
+
+    table = ConverterTable.resolve(
+        HEADER,
+        [("CASH", price, "cash"), ("PRICE", price, "gross_charge")],
+        optional=["CASH"],
+    )
+    assert table.convert(["1", "CT HEAD", "10", "1", "5"]) == [None, 10.0]
+    assert table.items(["1", "CT HEAD", "10", "1", "5"]) == [("gross_charge", 10.0)]
+
+
+def test_short_rows():
+    table = ConverterTable([(0, text, "code"), (4, price, "Aetna"), (2, raw, "price")])
+    assert table.convert(["1", "CT HEAD"]) == ["1", None, ""]
+    assert table.convert([]) == ["", None, ""]
+    assert ConverterTable([]).convert(["1"]) == []
+
+
+def test_payer_columns():
+    columns = {name: index for index, name in enumerate(HEADER)}
+    payers = ConverterTable(
+        (index, leading_price_unless(), name)
+        for name, index in columns.items()
+        if name not in ("CODE", "DESCRIPTION")
+    )
+    items = payers.items(["1", "CT HEAD", "nan", "1", "$5.00 each"])
+    assert items == [("AETNA", 5.0)]
+    assert not math.isnan(dict(items)["AETNA"])
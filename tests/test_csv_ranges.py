@@ -0,0 +1,56 @@
+from chargemaster_parsers.parsers.csv_ranges import record_boundaries, record_ranges
+
+import csv
+import io
+import mmap
+import pytest
+
+
+def records(data, delimiter):
+    return list(csv.reader(io.StringIO(data.decode(), newline=""), delimiter=delimiter))
+
+
+DOCUMENT = (
+    b'CODE|DESCRIPTION|"PRICE\nIP"\r\n'
+    b'1|"QUOTED | WITH\nNEWLINE"|1.00\r\n'
+    b'2|NEEDLE 1.5" GAUGE|2.00\n'
+    b'3|"DOUBLED ""|\n"" QUOTES"|3.00\n'
+    b'4|"CLOSED"THEN TEXT " \n'
+    b'5|""|\n'
+    b"\n"
+    b'6|"\n\n\n"|6.00'
+)
+
+
+@pytest.mark.parametrize("range_size", [1, 2, 10, 30, 1000])
+def test_ranges_hold_whole_records(range_size):
+    expected = records(DOCUMENT, "|")
+    assert len(expected) == 8
+
+    header_end, ranges = record_ranges(DOCUMENT, range_size, b"|")
+    header = DOCUMENT[:header_end]
+    assert records(header, "|") == expected[:1]
+    actual = expected[:1]
+    for start, end in ranges:
+        actual += records(header + DOCUMENT[start:end], "|")[1:]
+    assert actual == expected
+
+
+def test_boundaries():
+    # Every record starts a range when they're asked for as small as possible
+    assert record_boundaries(DOCUMENT, 1, b"|") == [29, 61, 86, 117, 140, 146, 147]
+    assert record_boundaries(DOCUMENT, 40, b"|") == [29, 86, 140]
+    assert record_boundaries(DOCUMENT, 10**6, b"|") == [29]
+    assert record_boundaries(b"a,b\n1,2\n", 1) == [4]
+    assert record_boundaries(b"a,b", 1) == []
+    assert record_boundaries(b'a,"b\n', 1) == []
+    with pytest.raises(ValueError):
+        record_boundaries(DOCUMENT, 0)
+
+
+def test_mmap(tmp_path):
+    path = tmp_path / "charges.csv"
+    path.write_bytes(DOCUMENT)
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            assert record_ranges(data, 30, b"|") == record_ranges(DOCUMENT, 30, b"|")
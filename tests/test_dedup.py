@@ -0,0 +1,113 @@
+from chargemaster_parsers.parsers import (
+    DedupLimitError,
+    DedupStats,
+    ExactDedup,
+    FingerprintDedup,
+    GroupedDedup,
+)
+from chargemaster_parsers.parsers.dedup import fingerprint
+
+import os
+import random
+import subprocess
+import sys
+import pytest
+
+
+@pytest.mark.parametrize("dedup_class", [ExactDedup, FingerprintDedup])
+def test_exact(dedup_class):
+    dedup = dedup_class()
+    rng = random.Random(1)
+    keys = [str(rng.randrange(5000)) for _ in range(20000)] + list(range(100))
+    seen = set()
+    for key in keys:
+        assert dedup.add(key) == (key not in seen)
+        seen.add(key)
+    assert len(dedup) == len(seen)
+
+    stats = dedup.stats()
+    assert (stats.total, stats.unique) == (len(keys), len(seen))
+    assert stats.duplicates == len(keys) - len(seen)
+    assert stats.peak_memory >= dedup.memory() > 0
+
+    dedup.clear()
+    assert len(dedup) == 0
+    assert dedup.add(keys[0])
+    assert dedup.stats().total == len(keys) + 1
+    assert dedup.stats().peak_memory == stats.peak_memory
+
+    dedup.reset_stats()
+    assert dedup.stats() == DedupStats(0, 0, dedup.memory())
+
+
+def test_fingerprints_are_compact():
+    keys = [f"PROCEDURE CODE {i}" for i in range(10000)]
+    exact = ExactDedup()
+    fingerprints = FingerprintDedup()
+    for key in keys:
+        exact.add(key)
+        fingerprints.add(key)
+    assert fingerprints.memory() <= 32 * len(keys)
+    assert fingerprints.memory() * 4 < exact.memory()
+
+
+def test_fingerprints_are_stable():
+    keys = ["PROCEDURE CODE 1", "", "ÉCHO \udcff", -1, -2, 5, "5", ("MS940", 1)]
+    expected = [fingerprint(key) for key in keys]
+    assert len(set(expected)) == len(keys)
+    assert all(0 < value < 2**64 for value in expected)
+
+    # The same in another process, whatever its hash seed
+    script = (
+        "from chargemaster_parsers.parsers.dedup import fingerprint\n"
+        f"print([fingerprint(key) for key in {keys!r}])"
+    )
+    for seed in ("1", "2"):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            env=dict(os.environ, PYTHONHASHSEED=seed),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        assert output.strip() == repr(expected)
+
+
+def test_fingerprint_hash_collisions():
+    # hash(-1) == hash(-2), but their fingerprints differ
+    dedup = FingerprintDedup()
+    assert dedup.add(-1)
+    assert dedup.add(-2)
+    assert not dedup.add(-1)
+
+
+def test_grouped():
+    dedup = GroupedDedup()
+    keys = ["a", "a", "b", "b", "b", "c", "a"]
+    assert [dedup.add(key) for key in keys] == [
+        True,
+        False,
+        True,
+        False,
+        False,
+        True,
+        True,
+    ]
+    assert len(dedup) == 1
+    assert dedup.stats().peak_memory < 100
+    dedup.clear()
+    assert len(dedup) == 0
+    assert dedup.add("a")
+
+
+@pytest.mark.parametrize("dedup_class", [ExactDedup, FingerprintDedup])
+def test_max_bytes(dedup_class):
+    dedup = dedup_class(max_bytes=4096)
+    with pytest.raises(DedupLimitError) as info:
+        for i in range(10000):
+            dedup.add(str(i))
+    assert info.value.max_bytes == 4096
+    assert info.value.needed > 4096
+    assert dedup.memory() <= 4096
+    # Whatever was remembered before the limit still is
+    assert not dedup.add("0")
@@ -0,0 +1,280 @@
+from chargemaster_parsers.artifacts import ArtifactStore
+from chargemaster_parsers.download import (
+    Downloader,
+    changed_urls,
+    download_artifacts,
+)
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import types
+import time
+import pytest
+
+
+class ArtifactServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, files, delay=0):
+        super().__init__(("127.0.0.1", 0), ArtifactHandler)
+        self.files = files
+        self.delay = delay
+        self.redirects = {}
+        self.etags = {}
+        self.last_modified = {}
+        # Drop every connection after one response without saying so, like a
+        # server timing out idle keep-alive connections
+        self.drop_connections = False
+        self.requests = []
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class ArtifactHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.delay)
+            if self.path in server.redirects:
+                self.send_response(302)
+                self.send_header("Location", server.redirects[self.path])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.path in server.files:
+                body = server.files[self.path]
+                etag = server.etags.get(self.path)
+                last_modified = server.last_modified.get(self.path)
+                if (etag and self.headers["If-None-Match"] == etag) or (
+                    last_modified and self.headers["If-Modified-Since"] == last_modified
+                ):
+                    self.send_response(304)
+                    body = b""
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                if last_modified:
+                    self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_error(404)
+            if server.drop_connections:
+                self.close_connection = True
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(files, delay=0):
+        server = ArtifactServer(files, delay)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    yield ArtifactStore(tmp_path / "store")
+
+
+def test_download(serve, store):
+    files = {f"/{i}.csv": f"file {i}\n".encode() * (i + 1) for i in range(20)}
+    server = serve(files)
+    urls = [server.url(path) for path in files]
+
+    with Downloader(store, max_per_host=2, max_workers=8) as downloader:
+        results = downloader.download(urls)
+
+    assert list(results) == urls
+    for path, url in zip(files, urls):
+        assert results[url].ok
+        assert results[url].status == 200
+        assert results[url].size == len(files[path])
+        with store.open(url) as artifact:
+            assert artifact.read() == files[path]
+
+
+def test_download_generator(serve, store):
+    server = serve({"/a.csv": b"a", "/b.csv": b"b"})
+    urls = [server.url("/b.csv"), server.url("/a.csv"), server.url("/b.csv")]
+
+    with Downloader(store) as downloader:
+        results = downloader.download(url for url in urls)
+    assert list(results) == urls[:2]
+    assert all(result.ok for result in results.values())
+
+
+def test_per_host_concurrency(serve, store):
+    files = {f"/{i}.csv": b"x" for i in range(12)}
+    server = serve(files, delay=0.02)
+
+    with Downloader(store, max_per_host=3, max_workers=12) as downloader:
+        downloader.download([server.url(path) for path in files])
+        pool = downloader.pool(server.url("/"))
+
+    assert server.max_active <= 3
+    # Connections are kept alive and reused rather than opened per file
+    assert pool.connections_opened <= 3
+    assert server.connections <= 3
+
+
+def test_browser_headers(serve, store):
+    server = serve({"/a.csv": b"a"})
+    with Downloader(store) as downloader:
+        downloader.download([server.url("/a.csv")])
+    _, headers = server.requests[0]
+    assert headers["User-Agent"].startswith("Mozilla/5.0")
+
+    with Downloader(store, headers={"User-Agent": "custom"}) as downloader:
+        downloader.download([server.url("/a.csv")])
+    _, headers = server.requests[1]
+    assert headers["User-Agent"] == "custom"
+
+
+def test_redirect(serve, store):
+    server = serve({"/real.csv": b"content"})
+    server.redirects["/moved.csv"] = "/real.csv"
+
+    with Downloader(store) as downloader:
+        result = downloader.fetch(server.url("/moved.csv"))
+    assert result.ok
+    # Stored under the url that was asked for
+    with store.open(server.url("/moved.csv")) as artifact:
+        assert artifact.read() == b"content"
+
+
+def test_redirect_loop(serve, store):
+    server = serve({})
+    server.redirects["/a.csv"] = "/b.csv"
+    server.redirects["/b.csv"] = "/a.csv"
+
+    with Downloader(store, max_redirects=3) as downloader:
+        result = downloader.fetch(server.url("/a.csv"))
+    assert not result.ok
+    assert "redirects" in result.error
+
+
+def test_errors(serve, store):
+    server = serve({"/a.csv": b"a"})
+    with Downloader(store) as downloader:
+        results = downloader.download(
+            [server.url("/missing.csv"), server.url("/a.csv"), "ftp://example.com/x"]
+        )
+
+    missing, found, unsupported = results.values()
+    assert missing.status == 404
+    assert missing.error.startswith("HTTP 404")
+    assert found.ok
+    assert "Unsupported" in unsupported.error
+    assert server.url("/missing.csv") not in store
+
+
+def test_server_closed_idle_connection(serve, store):
+    server = serve({"/a.csv": b"a", "/b.csv": b"b"})
+    server.drop_connections = True
+    with Downloader(store) as downloader:
+        assert downloader.fetch(server.url("/a.csv")).ok
+        assert downloader.fetch(server.url("/b.csv")).ok
+        assert downloader.pool(server.url("/")).connections_opened == 2
+
+
+def test_download_artifacts(serve, store):
+    # Anything with artifact_urls will do - subclassing a real parser would
+    # register it over the original
+    server = serve({"/a.csv": b"a", "/b.csv": b"b"})
+    parser = types.SimpleNamespace(
+        artifact_urls=(server.url("/a.csv"), server.url("/b.csv"))
+    )
+
+    results = download_artifacts(parser, store, max_per_host=1)
+    assert all(result.ok for result in results.values())
+    assert sorted(store.urls()) == sorted(parser.artifact_urls)
+
+
+def test_revalidate_etag(serve, store):
+    server = serve({"/a.csv": b"old", "/b.csv": b"b"})
+    server.etags["/a.csv"] = '"v1"'
+    urls = [server.url("/a.csv"), server.url("/b.csv")]
+
+    with Downloader(store) as downloader:
+        first = downloader.download(urls)
+    assert changed_urls(first) == urls
+    assert store.validators(urls[0]) == {"etag": '"v1"', "content_length": 3}
+
+    with Downloader(store) as downloader:
+        second = downloader.download(urls)
+    assert second[urls[0]].status == 304
+    assert second[urls[0]].unchanged
+    assert second[urls[0]].digest == first[urls[0]].digest
+    # No validators for b, so it comes down again - but is still found unchanged
+    assert second[urls[1]].status == 200
+    assert second[urls[1]].unchanged
+    assert changed_urls(second) == []
+    revalidations = [h for path, h in server.requests[2:] if path == "/a.csv"]
+    assert revalidations[0]["If-None-Match"] == '"v1"'
+
+    server.files["/a.csv"] = b"new"
+    server.etags["/a.csv"] = '"v2"'
+    with Downloader(store) as downloader:
+        third = downloader.download(urls)
+    assert changed_urls(third) == [urls[0]]
+    assert store.validators(urls[0])["etag"] == '"v2"'
+    with store.open(urls[0]) as artifact:
+        assert artifact.read() == b"new"
+
+
+def test_revalidate_last_modified(serve, store):
+    server = serve({"/a.csv": b"a"})
+    server.last_modified["/a.csv"] = "Wed, 01 Mar 2023 00:00:00 GMT"
+    url = server.url("/a.csv")
+
+    with Downloader(store) as downloader:
+        assert not downloader.fetch(url).unchanged
+        result = downloader.fetch(url)
+    assert result.status == 304
+    assert result.unchanged
+    _, headers = server.requests[1]
+    assert headers["If-Modified-Since"] == "Wed, 01 Mar 2023 00:00:00 GMT"
+    assert "If-None-Match" not in headers
+
+
+def test_revalidate_disabled(serve, store):
+    server = serve({"/a.csv": b"a"})
+    server.etags["/a.csv"] = '"v1"'
+    url = server.url("/a.csv")
+
+    with Downloader(store, revalidate=False) as downloader:
+        downloader.fetch(url)
+        assert downloader.fetch(url).status == 200
+    _, headers = server.requests[1]
+    assert "If-None-Match" not in headers
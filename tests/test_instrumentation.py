@@ -0,0 +1,164 @@
+from chargemaster_parsers.parsers import (
+    ArtifactMetrics,
+    ChargeMasterEntry,
+    ParserMetrics,
+    RadyChargeMasterParser,
+    StringPool,
+    TriCityChargeMasterParser,
+    UCIChargeMasterParser,
+)
+
+from chargemaster_parsers.parsers import xlsx
+from openpyxl import Workbook
+
+import json
+import pytest
+import io
+
+TRICITY_ROWS = "\n".join(
+    [
+        '"Price Transparency Machine Readable file as of July 1, 2022",,,,,,,,,',
+        "Code Type,Code,Description,Patient Type,Rev Code,Gross Charge,Cash Price,Aetna HMO/PPO, Min ($) , Max ($) ",
+        'CDM,36415,VENIPUNCTURE,OP,0300,"$35.00 ","$14.00 ","$20.00 ","$9.00 ","$20.00 "',
+        "CDM,99999,NOTHING PRICED,OP,0300, NA , NA , NA , NA , NA ",
+    ]
+).encode("cp1252")
+
+UCI_DOCUMENT = {
+    "File Summary": [{"Prices Posted And Effective": "8/1/2022 12:00:00 AM"}],
+    "Gross Charges": [
+        {
+            "Itemcode": "00010020_7809",
+            "Description": "HB BEVACIZUMAB 0.25 MG",
+            "CDM HCPCS": "C9257",
+            "UCI HB OUTPATIENT RATE Price": "25.00",
+            "UCI HB OUTPATIENT RATE Discounted Cash Price": "10",
+        },
+        {
+            "Itemcode": "99800003_7904",
+            "Description": "HB SKIN TEST READING (UCI ONLY)",
+            "UCI HB OUTPATIENT RATE Price": "N/A",
+            "UCI HB OUTPATIENT RATE Discounted Cash Price": "N/A",
+        },
+    ],
+}
+
+
+def test_disabled_is_passthrough():
+    parser = TriCityChargeMasterParser()
+    artifact = io.BytesIO(TRICITY_ROWS)
+    rows = [1, 2, 3]
+
+    assert parser.metrics is None
+    assert parser.track_artifact(parser.ARTIFACT_URL, artifact) is artifact
+    assert parser.track_rows(rows) is rows
+    assert parser.entry_builder() is ChargeMasterEntry.builder()
+
+
+def test_csv_metrics():
+    parser = TriCityChargeMasterParser()
+    artifacts = {parser.ARTIFACT_URL: io.BytesIO(TRICITY_ROWS)}
+    expected_result = list(parser.parse_artifacts(artifacts))
+    artifacts = {parser.ARTIFACT_URL: io.BytesIO(TRICITY_ROWS)}
+
+    with parser.instrument() as metrics:
+        actual_result = list(parser.parse_artifacts(artifacts))
+    assert parser.metrics is None
+    assert isinstance(metrics, ParserMetrics)
+    assert actual_result == expected_result
+
+    artifact_metrics = metrics.artifacts[parser.ARTIFACT_URL]
+    assert isinstance(artifact_metrics, ArtifactMetrics)
+    assert artifact_metrics.url == parser.ARTIFACT_URL
+    # The preamble and header rows count as read but produce nothing
+    assert artifact_metrics.rows_read == 4
+    assert artifact_metrics.rows_skipped == 3
+    assert artifact_metrics.entries == len(actual_result) == 2
+    assert artifact_metrics.bytes_read == len(TRICITY_ROWS)
+    for field in ("io_time", "read_time", "decode_time", "build_time", "build_cpu"):
+        assert getattr(artifact_metrics, field) >= 0
+
+    totals = metrics.totals()
+    assert totals.entries == 2
+    assert totals.bytes_read == len(TRICITY_ROWS)
+
+
+def test_json_metrics():
+    parser = UCIChargeMasterParser()
+    data = json.dumps(UCI_DOCUMENT).encode()
+
+    with parser.instrument() as metrics:
+        actual_result = list(
+            parser.parse_artifacts({parser.ARTIFACT_URL: io.BytesIO(data)})
+        )
+
+    artifact_metrics = metrics.artifacts[parser.ARTIFACT_URL]
+    assert artifact_metrics.rows_read == 2
+    assert artifact_metrics.rows_skipped == 1
+    assert artifact_metrics.entries == len(actual_result) == 2
+    assert artifact_metrics.bytes_read == len(data)
+    assert artifact_metrics.read_time >= artifact_metrics.decode_time
+
+
+def test_instrument_with_string_pool():
+    pool = StringPool()
+    parser = TriCityChargeMasterParser(string_pool=pool)
+    with parser.instrument() as metrics:
+        actual_result = list(
+            parser.parse_artifacts({parser.ARTIFACT_URL: io.BytesIO(TRICITY_ROWS)})
+        )
+    assert metrics.totals().entries == len(actual_result) == 2
+    assert pool.stats().total > 0
+
+
+@pytest.fixture
+def closed_workbooks(monkeypatch):
+    closed = []
+    close = xlsx.XlsxReader.close
+
+    def recording_close(reader):
+        closed.append(reader)
+        close(reader)
+
+    monkeypatch.setattr(xlsx.XlsxReader, "close", recording_close)
+    yield closed
+
+
+def rady_workbook():
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Procedure Name", "Price"])
+    ws.append(["RCH PEDIATRIC PRIVATE ROOM CHARGE", 8400])
+    ws.append(["RCH PEDIATRIC SEMIPRIVATE ROOM CHG", "Variable"])
+    data = io.BytesIO()
+    wb.save(data)
+    return data.getvalue()
+
+
+def test_xlsx_metrics(closed_workbooks):
+    parser = RadyChargeMasterParser()
+    artifacts = {parser.ARTIFACT_URL: io.BytesIO(rady_workbook())}
+
+    with parser.instrument() as metrics:
+        actual_result = list(parser.parse_artifacts(artifacts))
+
+    artifact_metrics = metrics.artifacts[parser.ARTIFACT_URL]
+    assert artifact_metrics.rows_read == 3
+    assert artifact_metrics.rows_skipped == 2
+    assert artifact_metrics.entries == len(actual_result) == 1
+    # Opening the workbook and decoding its rows are both timed
+    assert artifact_metrics.read_time > 0
+    assert len(closed_workbooks) == 1
+
+
+def test_xlsx_rows_close_the_workbook(closed_workbooks):
+    parser = RadyChargeMasterParser()
+    assert len(list(parser.xlsx_rows(io.BytesIO(rady_workbook())))) == 3
+    assert len(closed_workbooks) == 1
+
+    # Including when the rows aren't read to the end
+    rows = parser.xlsx_rows(io.BytesIO(rady_workbook()))
+    assert next(rows) == ("Procedure Name", "Price")
+    rows.close()
+    assert len(closed_workbooks) == 2
+    assert closed_workbooks[-1].archive.fp is None
@@ -0,0 +1,183 @@
+from chargemaster_parsers.parsers import UCSDChargeMasterParser
+from chargemaster_parsers.parsers import json_stream
+from chargemaster_parsers.parsers.json_stream import (
+    decode_chunks,
+    iter_array,
+    iter_sections,
+    repair_chunks,
+)
+
+import io
+import json
+import pytest
+
+
+def split(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+DOCUMENT = ' [ 1 , 2.5e3, "a\\"b", {"x": [1, {"y": null}]}, true, false, null, -0.5 ]\n'
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 1000])
+def test_iter_array(size):
+    assert list(iter_array(split(DOCUMENT, size))) == json.loads(DOCUMENT)
+    assert list(iter_array(split("[ ]", size))) == []
+
+
+def test_iter_array_is_lazy():
+    def chunks():
+        yield '[{"a": 1}, '
+        raise AssertionError("read too far")
+
+    assert next(iter_array(chunks())) == {"a": 1}
+
+
+@pytest.mark.parametrize(
+    "document", ["", "{}", "[1,]", "[1 2]", "[1] x", "[1", '["abc', "[1,", "[tru]"]
+)
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_iter_array_malformed(document, size):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array(split(document, size)))
+
+
+# Brackets and an escape that a scan past the section mustn't be fooled by
+TRICKY_ROW = {"a": '"]}[{\\'}
+SECTIONS = json.dumps(
+    {
+        "File Summary": [{"Prices Posted And Effective": "12/22/2022"}],
+        "Skipped": [TRICKY_ROW, [[]], "x", 3, None],
+        "Gross Charges": [{"Code": "CPT 100", "Price": 1.5}, {}, {"Price": 2}],
+        "Empty": [],
+        "Policy": "Descriptive text, [not] {rows}",
+        "Number": 12,
+    },
+    indent=1,
+)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 1000])
+def test_iter_sections(size):
+    expected = json.loads(SECTIONS)
+    actual = {}
+    for name, rows in iter_sections(split(SECTIONS, size)):
+        actual[name] = list(rows)
+    actual["Policy"] = actual["Policy"][0]
+    actual["Number"] = actual["Number"][0]
+    assert actual == expected
+    assert list(iter_sections(split(" { } ", size))) == []
+
+
+class RecordingDecoder(json.JSONDecoder):
+    def __init__(self):
+        super().__init__()
+        self.decoded = []
+
+    def raw_decode(self, s, idx=0):
+        value, end = super().raw_decode(s, idx)
+        self.decoded.append(value)
+        return value, end
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_iter_sections_skips_without_decoding(size):
+    decoder = RecordingDecoder()
+    sections = iter_sections(split(SECTIONS, size), decoder)
+    assert next(sections)[0] == "File Summary"
+    name, rows = next(sections)
+    assert name == "Skipped"
+    # Partly read, then passed over
+    assert next(rows) == TRICKY_ROW
+    assert [name for name, _ in sections] == [
+        "Gross Charges",
+        "Empty",
+        "Policy",
+        "Number",
+    ]
+    # Values are decoded again whenever they might continue in the next chunk, but
+    # nothing in a section that's passed over is decoded at all
+    assert TRICKY_ROW in decoder.decoded
+    for value in ([[]], "x", 3, {"Code": "CPT 100", "Price": 1.5}, {}, {"Price": 2}):
+        assert value not in decoder.decoded
+    assert list(rows) == []
+
+
+def test_iter_sections_is_lazy():
+    def chunks():
+        yield '{"Skipped": [1, 2], "Rows": [{"a": 1}, '
+        raise AssertionError("read too far")
+
+    sections = iter_sections(chunks())
+    next(sections)
+    name, rows = next(sections)
+    assert (name, next(rows)) == ("Rows", {"a": 1})
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        "",
+        "[]",
+        '{"a": [1}',
+        '{"a" [1]}',
+        '{"a": [1] "b": 2}',
+        '{"a": [1]} x',
+        '{"a": ["x]',
+        '{"a": ["x\\',
+        "{1: 2}",
+        '{"a": }',
+    ],
+)
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_iter_sections_malformed(document, size):
+    with pytest.raises(json.JSONDecodeError):
+        for _, rows in iter_sections(split(document, size)):
+            pass
+
+
+REPAIRS = (
+    ('�"�', ""),
+    ('"Where "Variable" exists,', "\"Where 'Variable' exists,"),
+)
+
+
+def test_repair_chunks():
+    text = 'a�"�b "Where "Variable" exists, c�"�"� "Where "Where "Variable" exists,'
+    expected = text.replace(*REPAIRS[0]).replace(*REPAIRS[1])
+    for size in range(1, len(text) + 1):
+        assert "".join(repair_chunks(split(text, size), REPAIRS)) == expected
+
+
+def test_decode_chunks():
+    data = "héllo 中".encode() + b'\xff"\xff end \xe4\xb8'
+    for size in range(1, len(data) + 1):
+        text = "".join(
+            decode_chunks(io.BytesIO(data), errors="replace", chunk_size=size)
+        )
+        assert text == data.decode("utf-8", errors="replace")
+
+
+def test_ucsd_damage_across_chunks(monkeypatch):
+    rows = [
+        {"PROCEDURE": str(100 + i), "PROCEDURE_DESCRIPTION": f"@{i}@", "AETNA": "1.5"}
+        for i in range(20)
+    ]
+    data = json.dumps(rows).encode()
+    data = data.replace(b"@3@", b'Where "Variable" exists,')
+    data = data.replace(b"@7@", b'BROKEN \xff"\xff')
+    parser = UCSDChargeMasterParser()
+
+    expected_result = list(
+        parser.parse_artifacts({parser.ARTIFACT_URL: io.BytesIO(data)})
+    )
+    assert len(expected_result) == 20
+    assert expected_result[3].procedure_description == "Where 'Variable' exists,"
+    assert expected_result[7].procedure_description == "BROKEN"
+
+    for size in (1, 2, 7, 13):
+        monkeypatch.setattr(json_stream, "CHUNK_SIZE", size)
+        actual_result = list(
+            parser.parse_artifacts({parser.ARTIFACT_URL: io.BytesIO(data)})
+        )
+        assert actual_result == expected_result
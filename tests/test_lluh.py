@@ -223,3 +223,12 @@ def test_institution_name(parser):
 def test_artifact_urls(parser):
     assert LLUHChargeMasterParser.artifact_urls == LLUHChargeMasterParser.ARTIFACT_URLS
     assert parser.artifact_urls == LLUHChargeMasterParser.ARTIFACT_URLS
+
+
+def test_artifact_urls_reusable():
+    assert list(LLUHChargeMasterParser.ARTIFACT_URLS) == list(
+        LLUHChargeMasterParser.URL_TO_INSTITUTION
+    )
+    assert list(LLUHChargeMasterParser.ARTIFACT_URLS) == list(
+        LLUHChargeMasterParser.artifact_urls
+    )
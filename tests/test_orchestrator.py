@@ -0,0 +1,368 @@
+from chargemaster_parsers import orchestrator
+from chargemaster_parsers.orchestrator import (
+    ArtifactParseError,
+    InstitutionFailure,
+    ParallelRun,
+    parse_institutions,
+)
+from chargemaster_parsers.parsers import (
+    CedarsSinaiChargeMasterParser,
+    LLUHChargeMasterParser,
+    ScrippsChargeMasterParser,
+    SharpChargeMasterParser,
+    StringPool,
+    TriCityChargeMasterParser,
+    UCIChargeMasterParser,
+    UCSDChargeMasterParser,
+)
+
+from chargemaster_parsers.parsers.xlsx import XlsxRowCache
+
+from openpyxl import Workbook
+import json
+import pytest
+import io
+import os
+
+SCRIPPS_ROWS = "\n".join(
+    [
+        "LOCATION|PROCEDURE CODE|PROCEDURE DESCRIPTION|PAYER|PLAN|GROSS CHARGES IP|IP_EXPECTED_REIMBURSMENT|GROSS CHARGES OP|OP_EXPECTED_REIMBURSMENT|IP_MIN|IP_MAX|OP_MIN|OP_MAX|CASH/SELF PAY",
+    ]
+    + [
+        f"Scripps Green Hospital|MS{900 + i}|PROCEDURE {i}|AETNA MEDI-CAL [213]|AETNA MEDI-CAL BETTER HEALTH OF CA [21301]|{1000 + i}.00||||9000.00|101685.89|||{500 + i}.00"
+        for i in range(20)
+    ]
+).encode()
+
+TRICITY_ROWS = "\n".join(
+    [
+        "Code Type,Code,Description,Patient Type,Rev Code,Gross Charge,Cash Price,Aetna HMO/PPO, Min ($) , Max ($) ",
+    ]
+    + [
+        f'CDM,{36415 + i},VENIPUNCTURE {i},OP,0300,"${35 + i}.00 ","$14.00 ","$20.00 ","$9.00 ","$20.00 "'
+        for i in range(20)
+    ]
+).encode("cp1252")
+
+
+def scripps_artifacts():
+    return {
+        url: SCRIPPS_ROWS if i == 0 else b""
+        for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+    }
+
+
+def tricity_artifacts():
+    return {TriCityChargeMasterParser.ARTIFACT_URL: TRICITY_ROWS}
+
+
+def sequential(jobs):
+    parsers = {
+        "Scripps": ScrippsChargeMasterParser(),
+        "Tri-City": TriCityChargeMasterParser(),
+    }
+    return [
+        (institution, entry)
+        for institution, artifacts in jobs.items()
+        for entry in parsers[institution].parse_artifacts(
+            {url: io.BytesIO(data) for url, data in artifacts.items()}
+        )
+    ]
+
+
+def test_ordered():
+    jobs = {"Tri-City": tricity_artifacts(), "Scripps": scripps_artifacts()}
+    run = ParallelRun(jobs, max_workers=2, ordered=True, chunk_size=3)
+    actual_result = list(run)
+
+    assert actual_result == sequential(jobs)
+    assert run.failures == {}
+    assert run.entry_counts == {"Tri-City": 40, "Scripps": 40}
+
+
+def test_unordered():
+    jobs = {"Scripps": scripps_artifacts(), "Tri-City": tricity_artifacts()}
+    run = parse_institutions(jobs, max_workers=2, chunk_size=7)
+    actual_result = list(run)
+
+    assert sorted(actual_result, key=lambda pair: (pair[0], pair[1])) == sorted(
+        sequential(jobs), key=lambda pair: (pair[0], pair[1])
+    )
+
+
+def test_paths(tmp_path):
+    path = tmp_path / "tricity.csv"
+    path.write_bytes(TRICITY_ROWS)
+    jobs = {"Tri-City": {TriCityChargeMasterParser.ARTIFACT_URL: str(path)}}
+
+    actual_result = list(ParallelRun(jobs, ordered=True))
+    assert actual_result == sequential({"Tri-City": tricity_artifacts()})
+
+
+def test_failures_are_isolated():
+    jobs = {
+        "UCSD": {UCSDChargeMasterParser.ARTIFACT_URL: b"[{not json"},
+        "Tri-City": tricity_artifacts(),
+        "Nowhere": {},
+    }
+    run = ParallelRun(jobs, max_workers=3, ordered=True)
+    actual_result = list(run)
+
+    assert actual_result == sequential({"Tri-City": tricity_artifacts()})
+    assert set(run.failures) == {"UCSD", "Nowhere"}
+
+    failure = run.failures["UCSD"]
+    assert isinstance(failure, InstitutionFailure)
+    assert failure.error == "JSONDecodeError"
+    assert "JSONDecodeError" in failure.traceback
+    assert run.failures["Nowhere"].error == "ValueError"
+    assert run.entry_counts["UCSD"] == 0
+
+
+def test_empty():
+    assert list(ParallelRun({})) == []
+
+
+def test_invalid_chunk_size():
+    with pytest.raises(ValueError, match="chunk_size must be positive"):
+        ParallelRun({}, chunk_size=0)
+
+
+def test_close_early():
+    jobs = {"Tri-City": tricity_artifacts(), "Scripps": scripps_artifacts()}
+    results = iter(ParallelRun(jobs, max_workers=2, ordered=True, chunk_size=1))
+    assert next(results)[0] == "Tri-City"
+    results.close()
+
+
+def test_as_tuples():
+    jobs = {"Tri-City": tricity_artifacts()}
+    actual_result = list(ParallelRun(jobs, ordered=True, as_tuples=True))
+    assert actual_result == [
+        (institution, entry.to_tuple()) for institution, entry in sequential(jobs)
+    ]
+
+
+def scripps_hospital_artifacts():
+    # A different file for every hospital, so each work unit has its own output
+    return {
+        url: SCRIPPS_ROWS.replace(b"Scripps Green Hospital", f"Hospital {i}".encode())
+        for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+    }
+
+
+def test_work_units():
+    parser = ScrippsChargeMasterParser()
+    artifacts = dict(reversed(list(scripps_hospital_artifacts().items())))
+    # Scripps always goes through its hospitals in the same order
+    assert [url for url, _ in parser.work_units(artifacts)] == list(
+        ScrippsChargeMasterParser.ARTIFACT_URLS
+    )
+
+    # Everyone else takes the artifacts they recognise as they come
+    parser = LLUHChargeMasterParser()
+    urls = list(reversed(LLUHChargeMasterParser.ARTIFACT_URLS))
+    artifacts = {url: b"" for url in urls + ["https://example.com/unknown.csv"]}
+    assert [url for url, _ in parser.work_units(artifacts)] == urls
+
+
+def test_parse_artifacts_parallel():
+    parser = ScrippsChargeMasterParser()
+    data = scripps_hospital_artifacts()
+    expected_result = list(
+        parser.parse_artifacts({url: io.BytesIO(d) for url, d in data.items()})
+    )
+
+    actual_result = list(
+        parser.parse_artifacts_parallel(
+            {url: io.BytesIO(d) for url, d in data.items()}, workers=2, chunk_size=7
+        )
+    )
+    assert actual_result == expected_result
+
+    unordered = parser.parse_artifacts_parallel(
+        {url: io.BytesIO(d) for url, d in data.items()}, workers=2, ordered=False
+    )
+    assert sorted(unordered) == sorted(expected_result)
+
+
+def test_parse_artifacts_parallel_files(tmp_path):
+    parser = ScrippsChargeMasterParser(string_pool=StringPool())
+    data = scripps_hospital_artifacts()
+    expected_result = list(
+        parser.parse_artifacts({url: io.BytesIO(d) for url, d in data.items()})
+    )
+
+    artifacts = {}
+    for i, (url, d) in enumerate(data.items()):
+        path = tmp_path / f"{i}.csv"
+        path.write_bytes(d)
+        artifacts[url] = open(path, "rb")
+    try:
+        actual_result = list(parser.parse_artifacts_parallel(artifacts, workers=2))
+    finally:
+        for artifact in artifacts.values():
+            artifact.close()
+    assert actual_result == expected_result
+    # Entries are rebuilt through the parser's own pool
+    payers = {id(entry.payer) for entry in actual_result if entry.payer != "Cash"}
+    assert len(payers) == 1
+
+
+def cedars_sinai_workbook(prefix):
+    wb = Workbook()
+    ws = wb.active
+    ws.cell(row=5, column=1, value="EAP PROC CODE")
+    ws.cell(row=5, column=2, value="EAP PROC NAME")
+    ws.cell(row=5, column=3, value="DEFAULT CPT/ HCPCS CODE")
+    ws.cell(row=5, column=4, value="DEFAULT OP FEE SCHEDULE")
+    ws.cell(row=5, column=5, value="IP/ED FEE SCHEDULE")
+    for i in range(10):
+        ws.append([f"{prefix}{i}", f"PROCEDURE {i}", 96360 + i, f"${i}.00", None])
+    f = io.BytesIO()
+    wb.save(f)
+    return f.getvalue()
+
+
+def uci_document(prefix):
+    return json.dumps(
+        {
+            "File Summary": [{"Prices Posted And Effective": "8/1/2022 12:00:00 AM"}],
+            "Gross Charges": [
+                {
+                    "Itemcode": f"{prefix}{i}",
+                    "Description": f"PROCEDURE {i}",
+                    "CDM HCPCS": f"C{9250 + i}",
+                    "UCI HB OUTPATIENT RATE Price": f"{i}.00",
+                    "UCI HB OUTPATIENT RATE Discounted Cash Price": "10",
+                }
+                for i in range(10)
+            ],
+        }
+    ).encode()
+
+
+@pytest.mark.parametrize(
+    "parser_class, make_artifact",
+    [
+        (CedarsSinaiChargeMasterParser, cedars_sinai_workbook),
+        (UCIChargeMasterParser, uci_document),
+    ],
+)
+def test_parse_artifacts_parallel_any_url(parser_class, make_artifact):
+    # These parse whatever they're given, so the workers must too
+    parser = parser_class()
+    data = {
+        "https://example.com/second": make_artifact("B"),
+        parser_class.ARTIFACT_URL: make_artifact("A"),
+    }
+    expected_result = list(
+        parser.parse_artifacts({url: io.BytesIO(d) for url, d in data.items()})
+    )
+    assert {entry.procedure_identifier[0] for entry in expected_result} == {"A", "B"}
+
+    actual_result = list(parser.parse_artifacts_parallel(data, workers=2))
+    assert actual_result == expected_result
+
+
+def test_parse_artifacts_parallel_failure():
+    parser = ScrippsChargeMasterParser()
+    data = scripps_hospital_artifacts()
+    bad_url = ScrippsChargeMasterParser.ARTIFACT_URLS[2]
+    data[bad_url] = b"LOCATION|PROCEDURE CODE\nnowhere|1"
+
+    entries = []
+    with pytest.raises(ArtifactParseError) as error:
+        for entry in parser.parse_artifacts_parallel(data, workers=2):
+            entries.append(entry)
+    assert error.value.url == bad_url
+    assert error.value.error == "KeyError"
+    # Everything from the units before it came through first
+    assert {entry.location for entry in entries} == {"Hospital 0", "Hospital 1"}
+
+
+def test_parse_artifacts_parallel_nothing():
+    parser = LLUHChargeMasterParser()
+    assert list(parser.parse_artifacts_parallel({})) == []
+
+
+def sharp_workbook(prefix):
+    wb = Workbook()
+    wb.active.append(["ChargeCode", "ChargeCode Description", "Charge"])
+    for i in range(20):
+        wb.active.append([f"{prefix}{i}", f"PROCEDURE {i}", f"${i}.00"])
+    f = io.BytesIO()
+    wb.save(f)
+    return f.getvalue()
+
+
+def test_parse_artifacts_parallel_row_cache(tmp_path):
+    data = {
+        url: sharp_workbook(i)
+        for i, url in enumerate(SharpChargeMasterParser.ARTIFACT_URLS[:3])
+    }
+    expected_result = list(
+        SharpChargeMasterParser().parse_artifacts(
+            {url: io.BytesIO(d) for url, d in data.items()}
+        )
+    )
+
+    # The workers transcode into the parser's row cache
+    parser = SharpChargeMasterParser(row_cache=XlsxRowCache(tmp_path))
+    assert list(parser.parse_artifacts_parallel(data, workers=2)) == expected_result
+    assert len(os.listdir(tmp_path)) == 3
+    assert list(parser.parse_artifacts_parallel(data, workers=2)) == expected_result
+
+
+def bounded_run_jobs(monkeypatch, ahead):
+    # Has _run_jobs check that, whenever it yields a job's message, no job more
+    # than ahead(max_workers) places after that one has been submitted yet
+    submitted = []
+
+    class RecordingExecutor(orchestrator.ProcessPoolExecutor):
+        def submit(self, function, key, *args):
+            submitted.append(key)
+            return super().submit(function, key, *args)
+
+    run_jobs = orchestrator._run_jobs
+
+    def checked_run_jobs(jobs, max_workers, ordered, window=None):
+        order = list(jobs)
+        assert len(order) > ahead(max_workers)
+        for message in run_jobs(jobs, max_workers, ordered, window):
+            assert len(submitted) <= order.index(message[1]) + ahead(max_workers)
+            yield message
+        assert submitted == order
+
+    monkeypatch.setattr(orchestrator, "ProcessPoolExecutor", RecordingExecutor)
+    monkeypatch.setattr(orchestrator, "_run_jobs", checked_run_jobs)
+    return submitted
+
+
+def test_byte_ranges_are_submitted_as_the_output_advances(monkeypatch):
+    parser = ScrippsChargeMasterParser()
+    expected_result = list(
+        parser.parse_artifacts(
+            {url: io.BytesIO(data) for url, data in scripps_artifacts().items()}
+        )
+    )
+
+    submitted = bounded_run_jobs(
+        monkeypatch, lambda workers: orchestrator.JOBS_AHEAD_PER_WORKER * workers
+    )
+    actual_result = list(
+        parser.parse_artifacts_ranged(scripps_artifacts(), workers=2, range_size=100)
+    )
+    assert actual_result == expected_result
+    assert len(submitted) > 10
+
+
+def test_institutions_are_submitted_as_the_output_advances(monkeypatch):
+    jobs = {"Tri-City": tricity_artifacts(), "Scripps": scripps_artifacts()}
+    expected_result = sequential(jobs)
+
+    # Nothing is started ahead of the workers
+    submitted = bounded_run_jobs(monkeypatch, lambda workers: workers)
+    actual_result = list(ParallelRun(jobs, max_workers=1, ordered=True, chunk_size=1))
+    assert actual_result == expected_result
+    assert submitted == ["Tri-City", "Scripps"]
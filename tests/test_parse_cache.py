@@ -0,0 +1,172 @@
+from chargemaster_parsers.artifacts import ArtifactStore, content_digest
+from chargemaster_parsers.parse_cache import ParseCache
+from chargemaster_parsers.parsers import (
+    ChargeMasterEntry,
+    ScrippsChargeMasterParser,
+    StringPool,
+    TriCityChargeMasterParser,
+)
+
+import datetime
+import os
+import pytest
+import io
+
+HEADER = "LOCATION|PROCEDURE CODE|PROCEDURE DESCRIPTION|PAYER|PLAN|GROSS CHARGES IP|IP_EXPECTED_REIMBURSMENT|GROSS CHARGES OP|OP_EXPECTED_REIMBURSMENT|IP_MIN|IP_MAX|OP_MIN|OP_MAX|CASH/SELF PAY"
+
+
+def scripps_rows(location, count):
+    lines = [HEADER]
+    for i in range(count):
+        lines.append(
+            f"{location}|{50400000 + i}|PROCEDURE {i}|AETNA [213]|AETNA HMO, AETNA PPO [21301]|{100 + i}.00||{90 + i}.00|80.00|||70.00|{95 + i}.00|{50 + i}.00"
+        )
+    return "\n".join(lines).encode()
+
+
+ARTIFACTS = {
+    url: scripps_rows(f"Hospital {i}", 1000 * i)
+    for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+}
+
+
+def open_artifacts():
+    return {url: io.BytesIO(data) for url, data in ARTIFACTS.items()}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield ParseCache(tmp_path / "cache")
+
+
+@pytest.fixture
+def parser():
+    yield ScrippsChargeMasterParser()
+
+
+def test_replay(cache, parser):
+    expected_result = list(parser.parse_artifacts(open_artifacts()))
+    # Several batches in the biggest artifact
+    assert len(expected_result) > 20000
+
+    assert list(cache.parse_artifacts(parser, open_artifacts())) == expected_result
+    assert (cache.hits, cache.misses) == (0, 5)
+    assert len(os.listdir(cache.root)) == 5
+
+    assert list(cache.parse_artifacts(parser, open_artifacts())) == expected_result
+    assert (cache.hits, cache.misses) == (5, 5)
+
+
+def test_replay_follows_parser(cache, parser):
+    # Scripps parses its hospitals in a fixed order whatever order they're given in
+    expected_result = list(parser.parse_artifacts(open_artifacts()))
+    reordered = dict(reversed(list(open_artifacts().items())))
+    assert list(cache.parse_artifacts(parser, reordered)) == expected_result
+
+    # Urls the parser doesn't know are left alone, as parse_artifacts leaves them
+    tricity = TriCityChargeMasterParser()
+    artifacts = {
+        "https://example.com/unrelated.csv": b"not a chargemaster",
+        tricity.ARTIFACT_URL: (
+            "Code Type,Code,Description,Patient Type,Rev Code,Gross Charge,"
+            'Cash Price,Aetna,Min ($),Max ($)\nCDM,36415,VENIPUNCTURE,OP,0300,"$35.00",'
+            '"$14.00","$20.00","$9.00","$20.00"\n'
+        ).encode("cp1252"),
+    }
+    expected_result = list(
+        tricity.parse_artifacts({url: io.BytesIO(d) for url, d in artifacts.items()})
+    )
+    assert len(expected_result) == 2
+    for _ in range(2):
+        actual_result = list(
+            cache.parse_artifacts(
+                tricity, {url: io.BytesIO(d) for url, d in artifacts.items()}
+            )
+        )
+        assert actual_result == expected_result
+
+
+def test_replay_uses_string_pool(cache):
+    list(cache.parse_artifacts(ScrippsChargeMasterParser(), open_artifacts()))
+
+    pool = StringPool()
+    parser = ScrippsChargeMasterParser(string_pool=pool)
+    entries = list(cache.parse_artifacts(parser, open_artifacts()))
+    assert cache.hits == 5
+    assert len({id(entry.payer) for entry in entries if entry.payer == "AETNA"}) == 1
+    assert pool.stats().total > 0
+
+
+def test_key(cache, parser, monkeypatch):
+    url = ScrippsChargeMasterParser.ARTIFACT_URLS[1]
+    data = ARTIFACTS[url]
+    list(cache.parse_artifact(parser, url, io.BytesIO(data)))
+
+    # Same content at another url, and changed content at the same url
+    other_url = ScrippsChargeMasterParser.ARTIFACT_URLS[2]
+    list(cache.parse_artifact(parser, other_url, io.BytesIO(data)))
+    list(cache.parse_artifact(parser, url, io.BytesIO(data + b"\n")))
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    list(cache.parse_artifact(parser, url, io.BytesIO(data)))
+    assert cache.hits == 1
+
+    # A new parser version doesn't replay output from the old one
+    monkeypatch.setattr(ScrippsChargeMasterParser, "PARSER_VERSION", 2)
+    list(cache.parse_artifact(parser, url, io.BytesIO(data)))
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_known_digests(cache, parser, tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    for url, data in ARTIFACTS.items():
+        store.put(url, data)
+    digests = {url: store.digest(url) for url in ARTIFACTS}
+    artifacts = store.open_artifacts(ARTIFACTS)
+
+    assert digests == {url: content_digest(artifacts[url]) for url in ARTIFACTS}
+    expected_result = list(parser.parse_artifacts(open_artifacts()))
+    list(cache.parse_artifacts(parser, open_artifacts()))
+    assert list(cache.parse_artifacts(parser, artifacts, digests)) == expected_result
+    assert cache.hits == 5
+
+
+def test_incomplete_parse_not_saved(cache, parser):
+    url = ScrippsChargeMasterParser.ARTIFACT_URLS[1]
+    entries = cache.parse_artifact(parser, url, io.BytesIO(ARTIFACTS[url]))
+    next(entries)
+    entries.close()
+    assert os.listdir(cache.root) == []
+
+
+def test_unmarshallable(cache, parser):
+    entry = ChargeMasterEntry(
+        procedure_identifier="1", extra_data=datetime.date.today()
+    )
+    parser.parse_artifact = lambda url, artifact: iter([entry])
+
+    assert list(cache.parse_artifact(parser, "url", io.BytesIO(b""))) == [entry]
+    assert os.listdir(cache.root) == []
+    list(cache.parse_artifact(parser, "url", io.BytesIO(b"")))
+    assert cache.misses == 2
+
+
+def test_eviction(tmp_path, parser):
+    urls = ScrippsChargeMasterParser.ARTIFACT_URLS[1:4]
+    unbounded = ParseCache(tmp_path / "unbounded")
+    sizes = []
+    for url in urls:
+        list(unbounded.parse_artifact(parser, url, io.BytesIO(ARTIFACTS[url])))
+        sizes.append(unbounded.size() - sum(sizes))
+
+    cache = ParseCache(tmp_path / "cache", max_bytes=sizes[1] + sizes[2])
+    for url in urls:
+        list(cache.parse_artifact(parser, url, io.BytesIO(ARTIFACTS[url])))
+    assert cache.size() == sizes[1] + sizes[2]
+
+    # The first artifact went, the others replay
+    for url in urls[1:]:
+        list(cache.parse_artifact(parser, url, io.BytesIO(ARTIFACTS[url])))
+    assert (cache.hits, cache.misses) == (2, 3)
+    list(cache.parse_artifact(parser, urls[0], io.BytesIO(ARTIFACTS[urls[0]])))
+    assert cache.misses == 4
@@ -1,7 +1,14 @@
-from chargemaster_parsers.parsers import ChargeMasterEntry, ChargeMasterParser
+from chargemaster_parsers.parsers import (
+    ChargeMasterEntry,
+    ChargeMasterParser,
+    StringPool,
+    StringPoolStats,
+)
 
 from chargemaster_parsers.parsers import RadyChargeMasterParser
 
+from array import array
+import math
 import pytest
 
 
@@ -97,3 +104,179 @@ def test_parse_price():
     assert sut.parse_price(1) == 1.0
     assert sut.parse_price(" 1,234.5 ") == 1234.5
     assert sut.parse_price(" $1,234") == 1234
+    assert sut.parse_price("-12.50") == -12.5
+    assert sut.parse_price(".5") == 0.5
+    assert sut.parse_price("1e3") == 1000.0
+    assert sut.parse_price("Variable") == None
+    assert sut.parse_price("") == None
+    assert sut.parse_price("$") == None
+    assert sut.parse_price("1,234 per day") == None
+    for word in ("nan", "NaN", "inf", "-inf", "Infinity"):
+        assert sut.parse_price(word) == None
+    assert sut.parse_price("1_000") == 1000.0
+
+
+def test_parse_prices():
+    sut = ChargeMasterParser()
+    prices = sut.parse_prices(["$1,234.50", "NA", None, 7, ""])
+    assert isinstance(prices, array) and prices.typecode == "d"
+    assert prices[0] == 1234.5
+    assert math.isnan(prices[1])
+    assert math.isnan(prices[2])
+    assert prices[3] == 7.0
+    assert math.isnan(prices[4])
+    assert len(sut.parse_prices(iter([]))) == 0
+
+
+def test_builder_matches_kwargs():
+    kwargs = dict(
+        payer="COMMERCIAL",
+        plan="KAISER FOUNDATION HEALTH PLAN, INC.",
+        gross_charge=11834.0,
+        location="San Diego",
+        in_patient=False,
+    )
+    expected = ChargeMasterEntry(**kwargs)
+
+    actual = ChargeMasterEntry.builder()(**kwargs)
+    assert type(actual) is ChargeMasterEntry
+    assert repr(actual) == repr(expected)
+    assert actual == expected
+
+    build = ChargeMasterEntry.builder(
+        "location", "payer", "plan", "gross_charge", "in_patient"
+    )
+    actual = build(
+        "San Diego", "COMMERCIAL", "KAISER FOUNDATION HEALTH PLAN, INC.", 11834.0, False
+    )
+    assert repr(actual) == repr(expected)
+
+    assert ChargeMasterEntry.from_tuple(expected.to_tuple()) == expected
+    assert ChargeMasterEntry.builder() is ChargeMasterEntry.builder()
+
+
+def test_builder_invalid_fields():
+    with pytest.raises(
+        ValueError, match="Unknown ChargeMasterEntry fields: charge_number"
+    ):
+        ChargeMasterEntry.builder("payer", "charge_number")
+
+    with pytest.raises(ValueError, match="Duplicate ChargeMasterEntry fields"):
+        ChargeMasterEntry.builder("payer", "payer")
+
+    with pytest.raises(TypeError):
+        ChargeMasterEntry.builder()(charge_number="1")
+
+
+def test_hash_and_set_membership():
+    a = ChargeMasterEntry(
+        payer="COMMERCIAL",
+        gross_charge=11834.0,
+        extra_data={"Code Type": "ICD10", "Code": "0001"},
+    )
+    b = ChargeMasterEntry(
+        payer="COMMERCIAL",
+        gross_charge=11834,
+        extra_data={"Code": "0001", "Code Type": "ICD10"},
+    )
+    c = ChargeMasterEntry(payer="Cash", gross_charge=11834.0)
+
+    assert a == b
+    assert hash(a) == hash(b)
+    assert len({a, b, c}) == 2
+    assert {a: 1}[b] == 1
+    assert a != "COMMERCIAL"
+
+
+@pytest.mark.parametrize(
+    "build",
+    [
+        lambda **fields: ChargeMasterEntry(**fields),
+        lambda **fields: ChargeMasterEntry.builder()(**fields),
+        lambda **fields: ChargeMasterEntry.builder(*fields)(*fields.values()),
+    ],
+)
+def test_setting_a_field_after_hashing(build):
+    a = build(payer="Aetna", gross_charge=10.0)
+    b = build(payer="Cash", gross_charge=10.0)
+    assert type(a) is ChargeMasterEntry
+    assert a != b
+    assert a < b
+    hash(a)
+
+    a.payer = "Cash"
+    assert a == b
+    assert hash(a) == hash(b)
+    assert len({a, b}) == 1
+
+    a.gross_charge = 5.0
+    assert a < b
+    assert sorted([b, a]) == [a, b]
+    assert a.sort_key() == ChargeMasterEntry(payer="Cash", gross_charge=5.0).sort_key()
+
+
+def test_sort_key_matches_slot_order():
+    def legacy_lt(left_entry, right_entry):
+        for key in ChargeMasterEntry.__slots__:
+            left = getattr(left_entry, key)
+            right = getattr(right_entry, key)
+            if left == right:
+                continue
+            elif left is not None and right is not None:
+                return left < right
+            elif left is None and right is not None:
+                return True
+            else:
+                return False
+        return False
+
+    entries = [
+        ChargeMasterEntry(),
+        ChargeMasterEntry(payer="Cash"),
+        ChargeMasterEntry(payer="Cash", plan="A"),
+        ChargeMasterEntry(payer="Aetna", plan="A"),
+        ChargeMasterEntry(payer="Aetna", gross_charge=1.0),
+        ChargeMasterEntry(payer="Aetna", gross_charge=2.0),
+        ChargeMasterEntry(cpt_code="99213", payer="Aetna"),
+        ChargeMasterEntry(in_patient=True, payer="Aetna"),
+        ChargeMasterEntry(in_patient=False, payer="Aetna"),
+    ]
+    for left in entries:
+        for right in entries:
+            assert (left < right) == legacy_lt(left, right)
+
+    assert sorted(reversed(entries)) == sorted(entries)
+
+
+def test_string_pool():
+    pool = StringPool()
+    first = "".join(["KAISER ", "FOUNDATION"])
+    second = "".join(["KAISER", " FOUNDATION"])
+    assert first is not second
+
+    assert pool.intern(first) is first
+    assert pool.intern(second) is first
+    assert pool.intern(None) is None
+    assert pool.intern(1.5) == 1.5
+    assert pool.stats() == StringPoolStats(total=2, unique=1)
+    assert pool.stats().duplicates == 1
+
+    pool.reset_stats()
+    assert pool.stats() == StringPoolStats(total=0, unique=1)
+
+
+def test_string_pool_builder():
+    pool = StringPool()
+    build = pool.builder()
+    a = build(payer="".join(["COMM", "ERCIAL"]), gross_charge=1.0)
+    b = build(payer="".join(["COMMER", "CIAL"]), gross_charge=2.0)
+    assert a.payer is b.payer
+    assert a == ChargeMasterEntry(payer="COMMERCIAL", gross_charge=1.0)
+    assert pool.builder() is build
+
+
+def test_parser_string_pool():
+    pool = StringPool()
+    parser = ChargeMasterParser.build("rady", string_pool=pool)
+    assert parser.string_pool is pool
+    assert ChargeMasterParser.build("rady").string_pool is None
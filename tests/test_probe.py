@@ -0,0 +1,194 @@
+from chargemaster_parsers.parsers import SharpChargeMasterParser
+from chargemaster_parsers.probe import Prober, TokenBucket, format_artifact_urls
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import json
+import threading
+import time
+import pytest
+
+
+class ProbeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, paths):
+        super().__init__(("127.0.0.1", 0), ProbeHandler)
+        self.paths = set(paths)
+        self.allow_head = True
+        self.broken = set()
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class ProbeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, with_body):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, self.headers["Range"]))
+        if self.path in server.broken:
+            self.send_error(500)
+        elif self.path not in server.paths:
+            self.send_error(404)
+        elif self.command == "HEAD" and not server.allow_head:
+            self.send_error(405)
+        elif self.headers["Range"] == "bytes=0-0":
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes 0-0/1000")
+            self.send_header("Content-Length", "1")
+            self.end_headers()
+            self.wfile.write(b"P")
+        else:
+            self.send_response(200)
+            self.send_header("Content-Length", "1000")
+            self.end_headers()
+            if with_body:
+                self.wfile.write(b"P" * 1000)
+
+    def do_HEAD(self):
+        self.respond(with_body=False)
+
+    def do_GET(self):
+        self.respond(with_body=True)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(paths):
+        server = ProbeServer(paths)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_find(serve):
+    server = serve(["/a.xlsx", "/c.xlsx"])
+    urls = [server.url(path) for path in ("/a.xlsx", "/b.xlsx", "/c.xlsx")]
+
+    prober = Prober(rate=1000)
+    assert prober.find(urls) == [urls[0], urls[2]]
+    # Nothing was downloaded
+    assert {method for method, _, _ in server.requests} == {"HEAD"}
+
+
+def test_ranged_get_fallback(serve):
+    server = serve(["/a.xlsx"])
+    server.allow_head = False
+    urls = [server.url("/a.xlsx"), server.url("/b.xlsx")]
+
+    prober = Prober(rate=1000)
+    assert prober.find(urls) == [urls[0]]
+    assert ("GET", "/a.xlsx", "bytes=0-0") in server.requests
+    assert prober.results[urls[1]] == {"found": False, "status": 404}
+
+
+def test_cached_results(serve, tmp_path):
+    server = serve(["/a.xlsx"])
+    server.broken.add("/c.xlsx")
+    urls = [server.url(path) for path in ("/a.xlsx", "/b.xlsx", "/c.xlsx")]
+    cache_path = tmp_path / "probe.json"
+
+    results = asyncio.run(Prober(cache_path, rate=1000).probe(urls))
+    assert results == {urls[0]: True, urls[1]: False, urls[2]: None}
+    with open(cache_path) as f:
+        assert set(json.load(f)) == {urls[0], urls[1]}
+
+    # Only the inconclusive url is checked again, plus anything new
+    server.requests.clear()
+    server.broken.clear()
+    new_url = server.url("/d.xlsx")
+    prober = Prober(cache_path, rate=1000)
+    assert prober.find(urls + [new_url]) == [urls[0]]
+    assert sorted(path for _, path, _ in server.requests) == ["/c.xlsx", "/d.xlsx"]
+
+    # Unless asked to refresh
+    server.paths.add("/b.xlsx")
+    assert prober.find(urls, refresh=True) == urls[:2]
+
+
+def test_concurrency_and_rate(serve):
+    paths = [f"/{i}.xlsx" for i in range(10)]
+    server = serve(paths)
+    prober = Prober(concurrency=4, rate=40)
+
+    start = time.perf_counter()
+    assert len(prober.find([server.url(path) for path in paths])) == 10
+    # One token up front, then one every 25ms
+    assert time.perf_counter() - start >= 9 / 40
+    assert prober.requests == 10
+
+
+def test_token_bucket():
+    async def take(count):
+        bucket = TokenBucket(rate=100, capacity=5)
+        start = time.perf_counter()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    # The burst is free, the rest are paced
+    assert asyncio.run(take(5)) < 0.02
+    assert asyncio.run(take(15)) >= 0.09
+
+
+def test_errors():
+    prober = Prober(rate=1000, timeout=1)
+    # Nothing listens on port 9 (discard) here, and ftp isn't supported
+    results = asyncio.run(
+        prober.probe(["http://127.0.0.1:9/a.xlsx", "ftp://example.com/a.xlsx"])
+    )
+    assert list(results.values()) == [None, None]
+    assert prober.results == {}
+
+
+def test_sharp_find_artifacts(serve, tmp_path):
+    server = serve(
+        [
+            "/chargemaster/grossmont/upload/SGH3011.xlsx",
+            "/chargemaster/memorial/upload/SMH3012.xlsx",
+        ]
+    )
+    base_url = server.url("")
+    candidates = SharpChargeMasterParser.candidate_urls(base_url, range(3010, 3015))
+    assert len(candidates) == 20
+
+    urls = SharpChargeMasterParser.find_artifacts(
+        cache_path=tmp_path / "sharp.json",
+        base_url=base_url,
+        numbers=range(3010, 3015),
+        rate=1000,
+    )
+    assert urls == [
+        f"{base_url}/chargemaster/grossmont/upload/SGH3011.xlsx",
+        f"{base_url}/chargemaster/memorial/upload/SMH3012.xlsx",
+    ]
+    assert format_artifact_urls(urls) == "\n".join(
+        [
+            "ARTIFACT_URLS = (",
+            f'    "{urls[0]}",',
+            f'    "{urls[1]}",',
+            ")",
+        ]
+    )
+
+
+def test_default_candidates():
+    candidates = SharpChargeMasterParser.candidate_urls()
+    assert len(candidates) == 8000
+    # Everything already known is among the candidates
+    assert set(SharpChargeMasterParser.ARTIFACT_URLS) <= set(candidates)
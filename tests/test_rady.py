@@ -61,6 +61,9 @@ def test_simple_row_v2(parser):
     ws.cell(row=4, column=1, value="00011920")
     ws.cell(row=4, column=2, value="RCH PICC/CVA CATH TRAY")
     ws.cell(row=4, column=3, value="Additional Input Required")
+    ws.cell(row=5, column=1, value="00011930")
+    ws.cell(row=5, column=2, value="RCH PICC LINE INSERTION")
+    ws.cell(row=5, column=3, value="$1,234")
 
     expected_result = [
         ChargeMasterEntry(
@@ -73,6 +76,12 @@ def test_simple_row_v2(parser):
             procedure_description="PICU - OBS RM CHG P/HR",
             gross_charge=298.0,
         ),
+        # Dollar amounts are read like any other price
+        ChargeMasterEntry(
+            procedure_identifier="00011930",
+            procedure_description="PICC LINE INSERTION",
+            gross_charge=1234.0,
+        ),
     ]
 
     with tempfile.TemporaryDirectory() as tmp_dir:
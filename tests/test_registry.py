@@ -0,0 +1,91 @@
+from chargemaster_parsers.parsers import ChargeMasterParser, ParserRegistry
+
+import subprocess
+import textwrap
+import sys
+import pytest
+
+
+@pytest.fixture
+def plugin_path(tmp_path, monkeypatch):
+    (tmp_path / "fake_hospital_parser.py").write_text(textwrap.dedent("""
+            from chargemaster_parsers.parsers import ChargeMasterParser
+
+
+            class FakeHospitalChargeMasterParser(ChargeMasterParser):
+                INSTITUTION_NAME = "Fake Hospital"
+                ARTIFACT_URLS = ()
+
+                def parse_artifacts(self, artifacts):
+                    return []
+            """))
+    dist_info = tmp_path / "fake_hospital_parser-0.1.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: fake-hospital-parser\nVersion: 0.1\n"
+    )
+    (dist_info / "entry_points.txt").write_text(
+        "[chargemaster_parsers.parsers]\n"
+        "Fake Hospital = fake_hospital_parser:FakeHospitalChargeMasterParser\n"
+        "Scripps = fake_hospital_parser:FakeHospitalChargeMasterParser\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    sys.modules.pop("fake_hospital_parser", None)
+
+
+def test_import_is_lazy():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from chargemaster_parsers.parsers import ChargeMasterParser\n"
+            "assert 'openpyxl' not in sys.modules\n"
+            "parser = ChargeMasterParser.build('ucsd')\n"
+            "loaded = sorted(m for m in sys.modules if m.startswith('chargemaster_parsers.parsers.'))\n"
+            "assert 'openpyxl' not in sys.modules, loaded\n"
+            "assert 'chargemaster_parsers.parsers.ucsd' in loaded, loaded\n"
+            "assert 'chargemaster_parsers.parsers.sharp' not in loaded, loaded\n"
+            "from chargemaster_parsers.parsers import UCSDChargeMasterParser\n"
+            "assert type(parser) is UCSDChargeMasterParser\n",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_build_is_case_insensitive():
+    from chargemaster_parsers.parsers import TriCityChargeMasterParser
+
+    assert isinstance(ChargeMasterParser.build("TRI-CITY"), TriCityChargeMasterParser)
+    assert isinstance(ChargeMasterParser.build(" tri-city "), TriCityChargeMasterParser)
+
+
+def test_lazy_target():
+    registry = ParserRegistry()
+    registry.register(
+        "Rady", "chargemaster_parsers.parsers.rady:RadyChargeMasterParser"
+    )
+    from chargemaster_parsers.parsers import RadyChargeMasterParser
+
+    assert registry.lookup("RADY") is RadyChargeMasterParser
+    assert registry["Rady"] is RadyChargeMasterParser
+    assert registry.lookup("unknown") is None
+
+
+def test_entry_points(plugin_path):
+    registry = ParserRegistry()
+    registry.register(
+        "Scripps", "chargemaster_parsers.parsers.scripps:ScrippsChargeMasterParser"
+    )
+    assert "fake_hospital_parser" not in sys.modules
+
+    parser_class = registry.lookup("fake hospital")
+    assert parser_class.__name__ == "FakeHospitalChargeMasterParser"
+    assert "Fake Hospital" in registry
+    assert sorted(registry) == ["Fake Hospital", "Scripps"]
+
+    # Plugins can't shadow an existing parser
+    assert registry.lookup("scripps").__name__ == "ScrippsChargeMasterParser"
@@ -1,4 +1,11 @@
-from chargemaster_parsers.parsers import ChargeMasterEntry, ScrippsChargeMasterParser
+from chargemaster_parsers.parsers import (
+    ChargeMasterEntry,
+    ExactDedup,
+    FingerprintDedup,
+    GroupedDedup,
+    ScrippsChargeMasterParser,
+    StringPool,
+)
 
 import tempfile
 import json
@@ -153,3 +160,134 @@ def test_artifact_urls(parser):
         == ScrippsChargeMasterParser.ARTIFACT_URLS
     )
     assert parser.artifact_urls == ScrippsChargeMasterParser.ARTIFACT_URLS
+
+
+def test_string_pool():
+    rows = "\n".join(
+        [
+            "LOCATION|PROCEDURE CODE|PROCEDURE DESCRIPTION|PAYER|PLAN|GROSS CHARGES IP|IP_EXPECTED_REIMBURSMENT|GROSS CHARGES OP|OP_EXPECTED_REIMBURSMENT|IP_MIN|IP_MAX|OP_MIN|OP_MAX|CASH/SELF PAY",
+            "Scripps Green Hospital|MS940|O.R. Procedures With Diagnoses Of Other Contact With Health Services With Cc|AETNA MEDI-CAL [213]|AETNA MEDI-CAL HMO - HEALTH EXCEL IPA [21304]|105058.34||||9000.00|101685.89|||52529.17",
+            "Scripps Green Hospital|MS941|O.R. Procedures With Diagnoses Of Other Contact With Health Services Without Cc/Mcc|AETNA MEDI-CAL [213]|AETNA MEDI-CAL HMO - HEALTH EXCEL IPA [21304]|105058.34||||9000.00|101685.89|||52529.17",
+        ]
+    )
+
+    def artifacts():
+        return {
+            url: io.BytesIO(rows.encode("utf-8") if i == 0 else b"")
+            for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+        }
+
+    pool = StringPool()
+    expected_result = list(ScrippsChargeMasterParser().parse_artifacts(artifacts()))
+    actual_result = list(
+        ScrippsChargeMasterParser(string_pool=pool).parse_artifacts(artifacts())
+    )
+    assert actual_result == expected_result
+
+    locations = {id(entry.location) for entry in actual_result}
+    assert len(locations) == 1
+    stats = pool.stats()
+    assert stats.total > stats.unique
+
+
+def scripps_rows(procedures, payers):
+    # Every procedure is on a row per payer, each with the cash price - so the same
+    # cash entry turns up again in later byte ranges
+    lines = [
+        "LOCATION|PROCEDURE CODE|PROCEDURE DESCRIPTION|PAYER|PLAN|GROSS CHARGES IP|IP_EXPECTED_REIMBURSMENT|GROSS CHARGES OP|OP_EXPECTED_REIMBURSMENT|IP_MIN|IP_MAX|OP_MIN|OP_MAX|CASH/SELF PAY"
+    ]
+    for procedure in range(procedures):
+        for payer in range(payers):
+            cash = "" if procedure % 3 == 0 and payer == 0 else f"{procedure}.00"
+            lines.append(
+                f'Scripps Green Hospital|{50400000 + procedure}|"NEEDLE | {procedure}\nGAUGE"|PAYER {payer} [{payer}]|PLAN {payer}, OTHER [{payer}01]|{1000 + procedure}.00|{500 + payer}.00|||||||{cash}'
+            )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@pytest.mark.parametrize("range_size", [1, 300, 10**6])
+def test_parse_artifacts_ranged(parser, tmp_path, range_size):
+    data = {
+        url: scripps_rows(5 + i, 3) if i % 2 == 0 else b""
+        for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+    }
+    expected_result = list(
+        parser.parse_artifacts({url: io.BytesIO(d) for url, d in data.items()})
+    )
+    assert len([entry for entry in expected_result if entry.payer == "Cash"]) == 21
+
+    actual_result = list(
+        parser.parse_artifacts_ranged(
+            {url: io.BytesIO(d) for url, d in data.items()},
+            workers=2,
+            range_size=range_size,
+        )
+    )
+    assert actual_result == expected_result
+
+    # Files on disk are read by the workers themselves
+    paths = {}
+    for i, (url, d) in enumerate(data.items()):
+        paths[url] = tmp_path / f"{i}.csv"
+        paths[url].write_bytes(d)
+    files = {url: open(path, "rb") for url, path in paths.items()}
+    try:
+        actual_result = list(
+            parser.parse_artifacts_ranged(files, workers=2, range_size=range_size)
+        )
+    finally:
+        for f in files.values():
+            f.close()
+    assert actual_result == expected_result
+
+
+@pytest.mark.parametrize("dedup_class", [ExactDedup, FingerprintDedup, GroupedDedup])
+def test_cash_dedup(parser, dedup_class):
+    # The rows are grouped by procedure, so remembering just the last one is enough
+    data = {
+        url: scripps_rows(5 + i, 3) if i % 2 == 0 else b""
+        for i, url in enumerate(ScrippsChargeMasterParser.ARTIFACT_URLS)
+    }
+    expected_result = list(
+        parser.parse_artifacts({url: io.BytesIO(d) for url, d in data.items()})
+    )
+
+    dedup = dedup_class()
+    parser = ScrippsChargeMasterParser(cash_dedup=dedup)
+    actual_result = list(
+        parser.parse_artifacts({url: io.BytesIO(d) for url, d in data.items()})
+    )
+    assert actual_result == expected_result
+    stats = dedup.stats()
+    # Cash is only looked up on rows that have it
+    assert stats.unique == 21
+    assert stats.total == 3 * 21 - 8
+    assert stats.peak_memory > 0
+
+    actual_result = list(
+        parser.parse_artifacts_ranged(
+            {url: io.BytesIO(d) for url, d in data.items()}, workers=2, range_size=300
+        )
+    )
+    assert actual_result == expected_result
+
+
+def test_blank_and_short_rows(parser):
+    header = "LOCATION|PROCEDURE CODE|PROCEDURE DESCRIPTION|PAYER|PLAN|GROSS CHARGES IP|IP_EXPECTED_REIMBURSMENT|GROSS CHARGES OP|OP_EXPECTED_REIMBURSMENT|IP_MIN|IP_MAX|OP_MIN|OP_MAX|CASH/SELF PAY"
+    row = "Scripps Green Hospital|MS941|O.R. Procedures|AETNA MEDI-CAL [213]|AETNA MEDI-CAL HMO [21304]|105058.34||||9000.00"
+    expected_result = list(
+        parser.parse_artifact(
+            parser.ARTIFACT_URLS[0], io.BytesIO(f"{header}\n{row}||||\n".encode())
+        )
+    )
+    assert len(expected_result) == 1
+
+    # Blank lines are skipped and missing trailing cells read as empty
+    actual_result = list(
+        parser.parse_artifact(
+            parser.ARTIFACT_URLS[0], io.BytesIO(f"{header}\n\n{row}\n\n".encode())
+        )
+    )
+    assert actual_result == expected_result
+
+    assert list(parser.parse_artifact(parser.ARTIFACT_URLS[0], io.BytesIO())) == []
@@ -1,4 +1,5 @@
 from chargemaster_parsers.parsers import ChargeMasterEntry, StanfordChargeMasterParser
+from chargemaster_parsers.parsers import json_stream
 
 import tempfile
 import json
@@ -131,6 +132,141 @@ def test_ms_drg(parser):
     assert sorted(expected_result) == sorted(actual_result)
 
 
+def test_deidentified_min_max(parser):
+    test_input = {
+        "File Summary": [{"Prices Posted And Effective": "12/22/2022 12:00:00 AM"}],
+        "Inpatient De-identified Minimum Negotiated Charge": [
+            {
+                "De-Identified Minimum Negotiated Charge": 64864.0,
+                "Description": "Other Multiple Significant Trauma With Cc",
+                "MS-DRG": "964",
+            },
+            {
+                "De-Identified Minimum Negotiated Charge": 60000.0,
+                "Description": "Other Multiple Significant Trauma With Cc",
+                "MS-DRG": "964",
+            },
+            {},
+        ],
+        "Inpatient De-identified Maximum Negotiated Charge": [
+            {
+                "De-Identified Maximum Negotiated Charge": 315865.0,
+                "Description": "Other Multiple Significant Trauma With Cc",
+                "MS-DRG": "964",
+            }
+        ],
+        "Inpatient Payer Specific Charge - Commercial": [
+            {
+                "Description": "Other Multiple Significant Trauma With Cc",
+                "MS-DRG": "964",
+                "Payer": "HealthNet",
+                "Payer Specific Negotiated Charge": 159516.0,
+            },
+            {
+                "Description": "Other Multiple Significant Trauma Without Cc/Mcc",
+                "MS-DRG": "965",
+                "Payer": "HealthNet",
+                "Payer Specific Negotiated Charge": 100000.0,
+            },
+        ],
+        "Outpatient De-identified Minimum Negotiated Charge": [
+            {
+                "APC": "N902",
+                "De-Identified Minimum Negotiated Charge": 4.0,
+                "Description": "Packaged Services",
+            }
+        ],
+        "Outpatient De-identified Maximum Negotiated Charge": [
+            {
+                "APC": "N902",
+                "De-Identified Maximum Negotiated Charge": "N/A",
+                "Description": "Packaged Services",
+            }
+        ],
+        "Outpatient Payer Specific Charge": [
+            {
+                "APC": "N902",
+                "Description": "Packaged Services",
+                "Payer": "MultiPlan/PHCS/Beech Street",
+                "Payer Specific Negotiated Charge": 179.0,
+            }
+        ],
+    }
+
+    expected_result = [
+        ChargeMasterEntry(
+            expected_reimbursement=159516.0,
+            min_reimbursement=60000.0,
+            max_reimbursement=315865.0,
+            ms_drg_code="964",
+            procedure_identifier="964",
+            procedure_description="Other Multiple Significant Trauma With Cc",
+            payer="HealthNet",
+        ),
+        ChargeMasterEntry(
+            expected_reimbursement=100000.0,
+            ms_drg_code="965",
+            procedure_identifier="965",
+            procedure_description="Other Multiple Significant Trauma Without Cc/Mcc",
+            payer="HealthNet",
+        ),
+        ChargeMasterEntry(
+            expected_reimbursement=179.0,
+            min_reimbursement=4.0,
+            procedure_identifier="N902",
+            procedure_description="Packaged Services",
+            payer="MultiPlan/PHCS/Beech Street",
+        ),
+    ]
+
+    actual_result = list(
+        parser.parse_artifacts(
+            {
+                StanfordChargeMasterParser.ARTIFACT_URL: io.BytesIO(
+                    json.dumps(test_input).encode("utf-8")
+                )
+            }
+        )
+    )
+    assert actual_result == expected_result
+
+
+def test_skipped_sections(parser, monkeypatch):
+    # Sections the parser doesn't use are never decoded, so damage inside them
+    # that json.load would reject doesn't matter as long as the brackets balance
+    test_input = (
+        "\ufeff"
+        + '{"File Summary": [{"Prices Posted And Effective": "12/22/2022"}],'
+        + '"Professional Charges Exceptions": [{"Anesthesia": NaN, x}],'
+        + '"Gross Charges": [{"Procedure": 1, "Code": "CPT 10021", "Price": 2.0,'
+        + '"Quantity": "N/A", "Procedure Description": "A", "Discount Cash Price": 1.0}]}'
+    )
+
+    expected_result = [
+        ChargeMasterEntry(
+            procedure_identifier=1,
+            procedure_description="A",
+            gross_charge=1.0,
+            cpt_code="10021",
+            payer="Cash",
+            quantity="N/A",
+        )
+    ]
+
+    for size in (1, 7, 65536):
+        monkeypatch.setattr(json_stream, "CHUNK_SIZE", size)
+        actual_result = list(
+            parser.parse_artifacts(
+                {
+                    StanfordChargeMasterParser.ARTIFACT_URL: io.BytesIO(
+                        test_input.encode("utf-8")
+                    )
+                }
+            )
+        )
+        assert actual_result == expected_result
+
+
 def test_institution_name(parser):
     assert StanfordChargeMasterParser.institution_name == "Stanford"
     assert parser.institution_name == "Stanford"
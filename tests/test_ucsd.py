@@ -510,3 +510,76 @@ def test_institution_name(parser):
 def test_artifact_urls(parser):
     assert UCSDChargeMasterParser.artifact_urls == UCSDChargeMasterParser.ARTIFACT_URLS
     assert parser.artifact_urls == UCSDChargeMasterParser.ARTIFACT_URLS
+
+
+def test_rows_with_different_headers(parser):
+    rows = [
+        {
+            "PROCEDURE": "1",
+            "REIMB_MIN": "2",
+            "KAISER SOUTH ": "3",
+            "UHC PPO ; UHC WEST ": "4",
+        },
+        {"PROCEDURE": "2", "NDC": "00121-0657-11", " UHC PPO ; UHC WEST": "5"},
+        # Headers that normalize to the same name - the last one's value wins
+        {"PROCEDURE": "3", "Kaiser_South": "6", "KAISER SOUTH": "7", "procedure": "4"},
+        {
+            "PROCEDURE": "5",
+            "REIMB_MIN": "8",
+            "KAISER SOUTH ": "9",
+            "UHC PPO ; UHC WEST ": "",
+        },
+    ]
+
+    expected_result = [
+        ChargeMasterEntry(
+            procedure_identifier="1",
+            min_reimbursement=2,
+            plan="KAISER SOUTH",
+            expected_reimbursement=3,
+        ),
+        ChargeMasterEntry(
+            procedure_identifier="1",
+            min_reimbursement=2,
+            plan="UHC PPO",
+            expected_reimbursement=4,
+        ),
+        ChargeMasterEntry(
+            procedure_identifier="1",
+            min_reimbursement=2,
+            plan="UHC WEST",
+            expected_reimbursement=4,
+        ),
+        ChargeMasterEntry(
+            procedure_identifier="2",
+            ndc_code="00121-0657-11",
+            plan="UHC PPO",
+            expected_reimbursement=5,
+        ),
+        ChargeMasterEntry(
+            procedure_identifier="2",
+            ndc_code="00121-0657-11",
+            plan="UHC WEST",
+            expected_reimbursement=5,
+        ),
+        ChargeMasterEntry(
+            procedure_identifier="4", plan="KAISER SOUTH", expected_reimbursement=7
+        ),
+        ChargeMasterEntry(
+            procedure_identifier="5",
+            min_reimbursement=8,
+            plan="KAISER SOUTH",
+            expected_reimbursement=9,
+        ),
+    ]
+
+    actual_result = list(
+        parser.parse_artifacts(
+            {
+                UCSDChargeMasterParser.ARTIFACT_URL: io.BytesIO(
+                    json.dumps(rows).encode("utf-8")
+                )
+            }
+        )
+    )
+    assert actual_result == expected_result
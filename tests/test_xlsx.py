@@ -0,0 +1,247 @@
+from chargemaster_parsers.parsers import SharpChargeMasterParser
+from chargemaster_parsers.parsers import xlsx
+from chargemaster_parsers.parsers.xlsx import XlsxReader, XlsxRowCache, iter_rows
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+import datetime
+import io
+import os
+import pickle
+import zipfile
+import pytest
+
+
+def save(wb):
+    f = io.BytesIO()
+    wb.save(f)
+    return f.getvalue()
+
+
+def openpyxl_rows(data, **kwargs):
+    wb = load_workbook(io.BytesIO(data), **kwargs)
+    return [tuple(cell.value for cell in row) for row in wb.worksheets[0].iter_rows()]
+
+
+def sample_workbook():
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["ChargeCode", "ChargeCode Description", "Charge"])
+    ws.append([1001, "  OFFICE VISIT  ", 125.5])
+    ws.append(["A1002", "LAB", "$1,000.00"])
+    # A blank row, then one with a gap and a styled cell with no value
+    ws.cell(row=5, column=1, value=True)
+    ws.cell(row=5, column=3, value=datetime.datetime(2022, 7, 1, 12, 30))
+    ws.cell(row=5, column=5).font = Font(bold=True)
+    ws.cell(row=6, column=2, value="=SUM(A1:A2)")
+    ws.cell(row=6, column=3, value=12345678901234)
+    ws.cell(row=6, column=4, value=1e-7)
+    ws.cell(row=7, column=1, value="#N/A")
+    ws.cell(row=7, column=2, value=" padded ")
+    # Trailing rows without any cells aren't rows as far as openpyxl is concerned
+    ws.row_dimensions[9].height = 30
+    return wb
+
+
+def test_matches_openpyxl():
+    data = save(sample_workbook())
+    expected = openpyxl_rows(data)
+    assert len(expected) == 7
+    assert list(iter_rows(io.BytesIO(data))) == expected
+
+
+def test_data_only():
+    data = save(sample_workbook())
+    rows = list(iter_rows(io.BytesIO(data), data_only=True))
+    assert rows == openpyxl_rows(data, data_only=True)
+    # No cached result for the formula in a workbook openpyxl wrote
+    assert rows[5][1] is None
+
+
+def test_column_limits_and_min_row():
+    data = save(sample_workbook())
+    expected = openpyxl_rows(data)
+
+    assert list(iter_rows(io.BytesIO(data), max_col=2)) == [row[:2] for row in expected]
+    assert list(iter_rows(io.BytesIO(data), min_row=4, max_col=7)) == [
+        row + (None, None) for row in expected[3:]
+    ]
+    assert list(iter_rows(io.BytesIO(data), min_row=20)) == []
+
+
+def workbook_from_parts(sheet, shared_strings=None, workbook_properties=""):
+    # A minimal workbook written by hand, for the parts openpyxl never writes itself
+    parts = {
+        "[Content_Types].xml": '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>',
+        "_rels/.rels": '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/></Relationships>',
+        "xl/workbook.xml": f'<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">{workbook_properties}<sheets><sheet name="Charts" sheetId="2" r:id="rId2"/><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>',
+        "xl/_rels/workbook.xml.rels": '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/data.xml"/><Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/chartsheet" Target="chartsheets/sheet1.xml"/><Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="/xl/strings.xml"/></Relationships>',
+        "xl/worksheets/data.xml": f'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>{sheet}</sheetData></worksheet>',
+    }
+    if shared_strings is not None:
+        parts["xl/strings.xml"] = (
+            f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">{shared_strings}</sst>'
+        )
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, "w") as archive:
+        for name, text in parts.items():
+            archive.writestr(name, text)
+    return f.getvalue()
+
+
+def test_hand_written_parts():
+    data = workbook_from_parts(
+        '<row r="2"><c r="B2" t="inlineStr"><is><t xml:space="preserve"> inline </t></is></c>'
+        '<c t="s"><v>1</v></c><c t="s"><v>0</v></c><c t="e"><v>#DIV/0!</v></c></row>'
+        '<row><c t="b"><v>0</v></c><c><v>2.5E3</v></c><c t="str"><v>text</v></c>'
+        '<c><v></v></c><c t="d"><v>2022-07-01T00:00:00</v></c></row>',
+        shared_strings="<si><t>plain_x005F_x000D_</t></si><si><r><t>ri</t></r><r><t>ch</t></r><rPh><t>ignored</t></rPh></si>",
+    )
+    expected = [
+        (),
+        (None, " inline ", "rich", "plain_x000D_", "#DIV/0!"),
+        (False, 2500.0, "text", None, datetime.datetime(2022, 7, 1)),
+    ]
+    assert list(iter_rows(io.BytesIO(data))) == expected
+
+
+def test_date_1904():
+    data = workbook_from_parts(
+        '<row r="1"><c r="A1" s="1"><v>1</v></c><c r="B1"><v>1</v></c></row>',
+        workbook_properties='<workbookPr date1904="1"/>',
+    )
+    f = io.BytesIO(data)
+    with zipfile.ZipFile(f, "a") as archive:
+        archive.writestr(
+            "xl/styles.xml",
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<cellXfs count="2"><xf numFmtId="0"/><xf numFmtId="14"/></cellXfs></styleSheet>',
+        )
+    assert list(iter_rows(io.BytesIO(f.getvalue()))) == [
+        (datetime.datetime(1904, 1, 2), 1)
+    ]
+
+
+def test_no_worksheets():
+    data = workbook_from_parts("")
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        parts = {name: archive.read(name) for name in archive.namelist()}
+    del parts["xl/worksheets/data.xml"]
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, "w") as archive:
+        for name, text in parts.items():
+            archive.writestr(name, text)
+
+    with pytest.raises(ValueError):
+        XlsxReader(io.BytesIO(f.getvalue()))
+
+
+def reader_rows(data, *args):
+    with XlsxReader(io.BytesIO(data)) as reader:
+        return list(reader.iter_rows(*args))
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_row_cache(tmp_path, compress):
+    data = save(sample_workbook())
+    cache = XlsxRowCache(tmp_path, compress=compress)
+
+    assert list(cache.iter_rows(io.BytesIO(data))) == reader_rows(data)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(os.listdir(tmp_path)) == 1
+
+    # One transcoded file serves every limit
+    for limits in [(1, None), (4, 7), (1, 2), (20, None)]:
+        rows = list(cache.iter_rows(io.BytesIO(data), *limits))
+        assert rows == reader_rows(data, *limits)
+    assert (cache.hits, cache.misses) == (4, 1)
+
+    # Formulas read as their cached values are a different transcoding
+    rows = list(cache.iter_rows(io.BytesIO(data), data_only=True))
+    assert rows == reader_rows(data, 1, None, True)
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_row_cache_incomplete_not_saved(tmp_path):
+    cache = XlsxRowCache(tmp_path)
+    rows = cache.iter_rows(io.BytesIO(save(sample_workbook())))
+    next(rows)
+    rows.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_parser_row_cache(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Radiology-Ultrasound"])
+    ws.append(["ChargeCode", "ChargeCode Description", "Charge"])
+    for i in range(100):
+        ws.append([str(414300000 + i), f"PROCEDURE {i}", f"${i},000.00"])
+    data = save(wb)
+    urls = SharpChargeMasterParser.ARTIFACT_URLS[:2]
+
+    expected_result = list(
+        SharpChargeMasterParser().parse_artifacts(
+            {url: io.BytesIO(data) for url in urls}
+        )
+    )
+    cache = XlsxRowCache(tmp_path)
+    parser = SharpChargeMasterParser(row_cache=cache)
+    for _ in range(2):
+        actual_result = list(
+            parser.parse_artifacts({url: io.BytesIO(data) for url in urls})
+        )
+        assert actual_result == expected_result
+    # Both locations share the workbook
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_row_file_values():
+    from openpyxl.worksheet.formula import ArrayFormula
+
+    rows = [
+        ("text", 1, 2.5, True, None),
+        (
+            datetime.datetime(2022, 7, 1, 12, 30, 15, 250),
+            datetime.datetime(2022, 7, 1, tzinfo=datetime.timezone.utc),
+            datetime.date(2022, 7, 1),
+            datetime.time(12, 30),
+            datetime.timedelta(days=5, seconds=3, microseconds=7),
+        ),
+        (ArrayFormula(ref="A1:A2", text="=B1:B2*2"), "=B1"),
+    ]
+    decoded = xlsx._decode_batch(xlsx._encode_batch(rows))
+    assert decoded[:2] == rows[:2]
+    assert [type(value) for row in decoded for value in row] == [
+        type(value) for row in rows for value in row
+    ]
+    formula, text = decoded[2]
+    assert (formula.ref, formula.text, text) == ("A1:A2", "=B1:B2*2", "=B1")
+
+    with pytest.raises(TypeError):
+        xlsx._encode_batch([(object(),)])
+
+
+class CreatesFile:
+    # Unpickling this creates the file at path
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return (open, (self.path, "w"))
+
+
+def test_row_file_is_not_pickle(tmp_path):
+    data = save(sample_workbook())
+    root = tmp_path / "rows"
+    cache = XlsxRowCache(root)
+    list(cache.iter_rows(io.BytesIO(data)))
+    (path,) = root.iterdir()
+
+    # Swap in a pickle that would run code if it were loaded
+    marker = tmp_path / "unpickled"
+    payload = pickle.dumps([CreatesFile(str(marker))])
+    path.write_bytes(xlsx._RECORD_HEADER.pack(len(payload), False) + payload)
+    with pytest.raises((ValueError, EOFError, TypeError)):
+        list(cache.iter_rows(io.BytesIO(data)))
+    assert not marker.exists()